@@ -0,0 +1,188 @@
+"""
+Latency and query-count benchmark for the games API.
+
+Usage:
+    python bench/api.py --sizes 1000 10000 100000 --output bench_results.json
+
+For every catalog size a deterministic catalog (games, reviews and image
+rows) is seeded into its own SQLite file. Every scenario is then requested
+through the Django test client, and p50/p95/p99 latency and the number of
+SQL queries are recorded. Runs are fully offline. Pass --db-dir to keep
+the seeded databases and reuse them on the next run.
+
+Results are written as JSON, so two runs can be diffed with
+`python bench/api.py --compare old.json new.json`.
+
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from random import Random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.catalog import BASE_DIR, seed_catalog, setup_django, use_database  # noqa: E402
+
+
+def scenarios(rng: Random):
+    """
+    Return scenario name -> callable producing the next URL to request.
+    Detail scenarios rotate over random games so they don't hit one row.
+
+    """
+    from games.models import DifficultyLevel, Game, Genre
+
+    game_ids = list(Game.objects.values_list("id", flat=True))
+    difficulty = DifficultyLevel.objects.order_by("id").values_list("id", flat=True).first()
+    genres = list(Genre.objects.order_by("id").values_list("id", flat=True)[:2])
+    middle_page = max(1, len(game_ids) // 16 // 2)
+
+    return {
+        "list": lambda: "/api/games/",
+        "list deep page": lambda: f"/api/games/?page={middle_page}",
+        "list cursor": lambda: "/api/games/?pagination=cursor",
+        "filter fk + price": lambda: f"/api/games/?difficulty={difficulty}&min_price=1000&max_price=2000",
+        "filter m2m": lambda: f"/api/games/?genre={','.join(map(str, genres))}",
+        "search": lambda: "/api/games/?search=drag",
+        "ordering rating": lambda: "/api/games/?ordering=-rating",
+        "ordering discount_price": lambda: "/api/games/?ordering=discount_price",
+        "retrieve": lambda: f"/api/games/{rng.choice(game_ids)}/",
+        "images": lambda: f"/api/games/{rng.choice(game_ids)}/images/",
+        "all_categories": lambda: "/api/games/all_categories/",
+        "facets": lambda: f"/api/games/facets/?difficulty={difficulty}",
+    }
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 3)
+
+
+def run_scenario(client, next_url, requests: int, warmup: int) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        client.get(next_url())
+
+    timings, query_counts, statuses = [], [], set()
+    for _ in range(requests):
+        url = next_url()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries.captured_queries))
+        statuses.add(response.status_code)
+
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": max(query_counts),
+        "status": sorted(statuses),
+    }
+
+
+def prepare_catalog(size: int, seed: int, db_dir: str) -> str:
+    from django.core.management import call_command
+
+    db_path = os.path.join(db_dir, f"catalog-{size}-{seed}.sqlite3")
+    exists = os.path.exists(db_path)
+    use_database(db_path)
+    call_command("migrate", verbosity=0)
+    if not exists:
+        started = time.perf_counter()
+        seed_catalog(size, seed=seed)
+        print(f"  seeded {size} games in {time.perf_counter() - started:.1f}s")
+    return db_path
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    for size, results in new["results"].items():
+        print(f"\n== {size} games")
+        for name, result in results.items():
+            before = old["results"].get(size, {}).get(name)
+            if before is None:
+                print(f"  {name:25} p95 {result['p95_ms']:9.3f} ms   queries {result['queries']:3}   (new)")
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            print(f"  {name:25} p95 {before['p95_ms']:9.3f} -> {result['p95_ms']:9.3f} ms ({change:+6.1f}%)   "
+                  f"queries {before['queries']:3} -> {result['queries']:3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Catalog sizes")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for catalogs and detail ids")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+    parser.add_argument("--db-dir", help="Keep seeded databases here and reuse them on later runs")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write results to")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    db_path = setup_django(os.path.join(args.db_dir, "bootstrap.sqlite3") if args.db_dir else None)
+    db_dir = args.db_dir or os.path.dirname(db_path)
+    os.makedirs(db_dir, exist_ok=True)
+
+    import django
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"== {size} games")
+        prepare_catalog(size, args.seed, db_dir)
+        cache.clear()
+        client = Client()
+        results = {}
+        for name, next_url in scenarios(Random(args.seed)).items():
+            if args.scenario and name not in args.scenario:
+                continue
+            results[name] = run_scenario(client, next_url, args.requests, args.warmup)
+            result = results[name]
+            print(f"  {name:25} p50 {result['p50_ms']:8.3f}  p95 {result['p95_ms']:8.3f}  "
+                  f"p99 {result['p99_ms']:8.3f} ms   queries {result['queries']:3}   status {result['status']}")
+        report["results"][str(size)] = results
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Concurrent load benchmark of the catalog reads: WSGI vs ASGI.
+
+Usage:
+    python bench/asgi_load.py --size 10000 --concurrency 50 100 250 500 --output asgi_load.json
+
+Requests are fed straight into the Django application objects, in process
+and without sockets, by N concurrent "connections" that each issue one
+request after another:
+
+    wsgi        sync views through the WSGI handler, one thread per connection
+                (a threaded WSGI server)
+    asgi-sync   the same sync views through the ASGI handler, on one event loop;
+                every request takes the thread hop into the sync view
+    asgi-async  the async-native variants under /api/async/ through the ASGI
+                handler, on one event loop
+
+Throughput and p50/p95/p99 latency are recorded per scenario, mode and
+concurrency level. The client runs in the same process (and under the
+same GIL) as the application, so compare the modes with each other rather
+than reading the numbers as absolute server capacity. The cache is warmed
+before each run, so the numbers describe hot catalog pages.
+
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from random import Random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.api import git_revision, prepare_catalog  # noqa: E402
+from bench.catalog import setup_django  # noqa: E402
+
+MODES = ("wsgi", "asgi-sync", "asgi-async")
+HOST = "testserver"
+
+
+def scenarios(rng: Random):
+    """
+    Return scenario name -> callable producing the next (sync path, async path, query).
+
+    """
+    from games.models import Game
+
+    game_ids = list(Game.objects.values_list("id", flat=True))
+
+    def detail(suffix=""):
+        game_id = rng.choice(game_ids)
+        return f"/api/games/{game_id}/{suffix}", f"/api/async/games/{game_id}/{suffix}", ""
+
+    return {
+        "list": lambda: ("/api/games/", "/api/async/games/", ""),
+        "list expanded": lambda: ("/api/games/", "/api/async/games/", "expand=genre,publisher"),
+        "retrieve": detail,
+        "images": lambda: detail("images/"),
+        "all_categories": lambda: ("/api/games/all_categories/", "/api/async/games/all_categories/", ""),
+    }
+
+
+def wsgi_request(application, path: str, query: str) -> int:
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": HOST,
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+    body = application(environ, lambda response_status, headers, exc_info=None: status.append(response_status))
+    try:
+        for _chunk in body:
+            pass
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return int(status[0].split(" ", 1)[0])
+
+
+async def asgi_request(application, path: str, query: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", HOST.encode()), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": (HOST, 80),
+    }
+    finished = asyncio.Event()
+    sent_request = False
+    status = None
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+
+    await application(scope, receive, send)
+    return status
+
+
+def run_wsgi(application, next_request, requests: int, concurrency: int):
+    timings, statuses, lock = [], set(), threading.Lock()
+    remaining = iter(range(requests))
+
+    def connection():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+                path, query = next_request()
+            started = time.perf_counter()
+            status = wsgi_request(application, path, query)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                timings.append(elapsed)
+                statuses.add(status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(connection) for _ in range(concurrency)]:
+            future.result()
+    return timings, statuses, time.perf_counter() - started
+
+
+def run_asgi(application, next_request, requests: int, concurrency: int):
+    async def main():
+        timings, statuses = [], set()
+        remaining = iter(range(requests))
+
+        async def connection():
+            while next(remaining, None) is not None:
+                path, query = next_request()
+                started = time.perf_counter()
+                statuses.add(await asgi_request(application, path, query))
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(concurrency)))
+        return timings, statuses, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def summarize(timings: list, statuses: set, elapsed: float) -> dict:
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "requests_per_s": round(len(timings) / elapsed, 1),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "p99_ms": round(quantiles[98], 3),
+        "max_ms": round(max(timings), 3),
+        "status": sorted(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10_000, help="Catalog size")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 250, 500],
+                        help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per run")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured sequential requests per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the catalog and detail ids")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Only run these modes (repeatable)")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+    parser.add_argument("--db-dir", help="Keep the seeded database here and reuse it on later runs")
+    parser.add_argument("--output", default="asgi_load.json", help="JSON file to write results to")
+    args = parser.parse_args()
+
+    db_path = setup_django(os.path.join(args.db_dir, "bootstrap.sqlite3") if args.db_dir else None)
+    db_dir = args.db_dir or os.path.dirname(db_path)
+    os.makedirs(db_dir, exist_ok=True)
+
+    import django
+    from django.core.asgi import get_asgi_application
+    from django.core.cache import cache
+    from django.core.wsgi import get_wsgi_application
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    prepare_catalog(args.size, args.seed, db_dir)
+    cache.clear()
+    applications = {"wsgi": get_wsgi_application(), "asgi": get_asgi_application()}
+    modes = args.mode or MODES
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "size": args.size,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for name, next_urls in scenarios(Random(args.seed)).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        print(f"== {name}")
+        results = report["results"][name] = {}
+        for mode in modes:
+            if mode == "wsgi":
+                def next_request():
+                    path, _async_path, query = next_urls()
+                    return path, query
+            else:
+                def next_request(use_async=mode == "asgi-async"):
+                    path, async_path, query = next_urls()
+                    return (async_path if use_async else path), query
+
+            for _ in range(args.warmup):
+                wsgi_request(applications["wsgi"], *next_request())
+            results[mode] = {}
+            for concurrency in args.concurrency:
+                if mode == "wsgi":
+                    run = run_wsgi(applications["wsgi"], next_request, args.requests, concurrency)
+                else:
+                    run = run_asgi(applications["asgi"], next_request, args.requests, concurrency)
+                result = results[mode][str(concurrency)] = summarize(*run)
+                print(f"  {mode:10} c={concurrency:<4} {result['requests_per_s']:8.1f} req/s   "
+                      f"p50 {result['p50_ms']:9.3f}  p95 {result['p95_ms']:9.3f}  p99 {result['p99_ms']:9.3f} ms   "
+                      f"status {result['status']}")
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
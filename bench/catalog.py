@@ -0,0 +1,141 @@
+"""
+Deterministic catalog generation for the benchmarks.
+
+The same size and seed always produce the same games, so results from
+different runs (and different branches) can be compared directly.
+
+"""
+import os
+import sys
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from random import Random
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TYPES = ["Strategy", "Cooperative", "Economic", "War", "Detective", "Party", "Family", "Abstract"]
+PLAYER_COUNTS = ["1 player", "2 players", "3-4 players", "5+ players"]
+AGE_GROUPS = ["3-6 years", "7-12 years", "12+"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+GENRES = ["Fantasy", "Science fiction", "Horror", "Mystery", "Cyberpunk", "Historical", "Pirates", "Trains"]
+MECHANICS = ["Dice rolling", "Deck building", "Area control", "Bluffing", "Deduction", "Worker placement",
+             "Tile placement", "Set collection", "Drafting", "Auction"]
+DURATIONS = ["15-30 minutes", "30-60 minutes", "1-2 hours", "2+ hours"]
+PUBLISHER_COUNT = 50
+USER_COUNT = 200
+RATINGS = [Decimal(n) / 2 for n in range(0, 11)]
+WORDS = ["dragon", "castle", "empire", "quest", "galaxy", "dungeon", "island", "kingdom", "station",
+         "harbor", "forest", "crown", "legend", "colony", "railway", "shadow", "mystery", "ocean"]
+
+BATCH_SIZE = 1000
+
+
+def setup_django(db_path: str = None, database: dict = None) -> str:
+    """
+    Point the project at a throwaway SQLite file and initialise Django.
+    `database` overrides other keys of the default database settings.
+    Must be called before any model is imported.
+
+    """
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("SECRET_KEY", "bench")
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="games-bench-"), "bench.sqlite3")
+
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"].update(database or {})
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DEBUG = False
+    django.setup()
+    return db_path
+
+
+def use_database(db_path: str) -> None:
+    """
+    Switch the default connection to another SQLite file.
+
+    """
+    from django.db import connections
+
+    connection = connections["default"]
+    connection.close()
+    connection.settings_dict["NAME"] = db_path
+
+
+def seed_catalog(size: int, seed: int = 42, max_reviews: int = 6, max_images: int = 4) -> None:
+    """
+    Create `size` games with their taxonomy, publishers, M2M rows, up to
+    `max_reviews` reviews and up to `max_images` image rows per game,
+    using bulk inserts only. Image rows point at file names only; no
+    files are written.
+
+    """
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from games.models import (
+        AgeGroup, DifficultyLevel, Duration, Game, Genre, Image, Mechanic, PlayerCount, Publisher, Review, Type,
+    )
+
+    rng = Random(seed)
+    with transaction.atomic():
+        taxonomy = {}
+        for model, names in [
+            (Type, TYPES), (PlayerCount, PLAYER_COUNTS), (AgeGroup, AGE_GROUPS),
+            (DifficultyLevel, DIFFICULTIES), (Genre, GENRES), (Mechanic, MECHANICS), (Duration, DURATIONS),
+        ]:
+            model.objects.bulk_create([model(name=name) for name in names])
+            taxonomy[model] = list(model.objects.order_by("id").values_list("id", flat=True))
+        Publisher.objects.bulk_create([Publisher(name=f"Publisher {i}") for i in range(PUBLISHER_COUNT)])
+        publishers = list(Publisher.objects.order_by("id").values_list("id", flat=True))
+        User.objects.bulk_create([User(username=f"bench-user-{i}") for i in range(USER_COUNT)])
+        users = list(User.objects.order_by("id").values_list("id", flat=True))
+
+        next_id = (Game.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        for start in range(0, size, BATCH_SIZE):
+            games, genre_rows, type_rows, mechanic_rows, reviews, images = [], [], [], [], [], []
+            for game_id in range(next_id + start, next_id + min(start + BATCH_SIZE, size)):
+                price = Decimal(rng.randrange(200, 5000)).quantize(Decimal("0.01"))
+                title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 3)))
+                games.append(Game(
+                    id=game_id,
+                    title=f"{title} {game_id}",
+                    description=" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))),
+                    rules_summary=" ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 30))),
+                    release_year=rng.randint(1990, 2025),
+                    price=price,
+                    discount_price=price if rng.random() < 0.7 else (price * Decimal("0.8")).quantize(Decimal("0.01")),
+                    stock=rng.randint(0, 100),
+                    publisher_id=rng.choice(publishers),
+                    player_count_id=rng.choice(taxonomy[PlayerCount]),
+                    age_group_id=rng.choice(taxonomy[AgeGroup]),
+                    difficulty_id=rng.choice(taxonomy[DifficultyLevel]),
+                    duration_id=rng.choice(taxonomy[Duration]),
+                ))
+                genre_rows += [Game.genre.through(game_id=game_id, genre_id=pk)
+                               for pk in rng.sample(taxonomy[Genre], rng.randint(1, 3))]
+                type_rows += [Game.type.through(game_id=game_id, type_id=pk)
+                              for pk in rng.sample(taxonomy[Type], rng.randint(1, 2))]
+                mechanic_rows += [Game.mechanic.through(game_id=game_id, mechanic_id=pk)
+                                  for pk in rng.sample(taxonomy[Mechanic], rng.randint(1, 3))]
+                # One review per user and game (review_game_user_unique)
+                reviews += [Review(game_id=game_id, user_id=user_id, rating=rng.choice(RATINGS),
+                                   comment=" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 25))))
+                            for user_id in rng.sample(users, min(rng.randint(0, max_reviews), len(users)))]
+                images += [Image(game_id=game_id, path=f"games/{game_id}/{index}.jpg")
+                           for index in range(rng.randint(0, max_images))]
+            Game.objects.bulk_create(games)
+            Game.genre.through.objects.bulk_create(genre_rows)
+            Game.type.through.objects.bulk_create(type_rows)
+            Game.mechanic.through.objects.bulk_create(mechanic_rows)
+            Review.objects.bulk_create(reviews)
+            Image.objects.bulk_create(images)
+
+        # bulk_create skips the review signals, so build the rating aggregates in one pass
+        call_command("recompute_ratings", stdout=StringIO())
@@ -0,0 +1,116 @@
+"""
+Compare query plans and latencies of the GameFilter access paths before
+and after the composite indexes of games.0005_game_filter_indexes.
+
+Usage:
+    python bench/index_plans.py --games 100000 --output index_plans.json
+
+The script seeds a throwaway SQLite database at the schema state just
+before the index migration, measures every access path, applies the
+migration and measures again.
+
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.catalog import seed_catalog, setup_django  # noqa: E402
+
+BEFORE_MIGRATION = "0004_game_search_index"
+AFTER_MIGRATION = "0005_game_filter_indexes"
+PAGE_SIZE = 16
+
+
+def access_paths():
+    """
+    Querysets as built by GameModelViewSet.list for the filter and
+    ordering combinations the storefront uses.
+
+    """
+    from games.models import AgeGroup, DifficultyLevel, Duration, Game, PlayerCount
+
+    games = Game.objects.all()
+    difficulty = DifficultyLevel.objects.order_by("id").first()
+    player_count = PlayerCount.objects.order_by("id").first()
+    age_group = AgeGroup.objects.order_by("id").first()
+    duration = Duration.objects.order_by("id").first()
+    price_range = {"price__gte": 1000, "price__lte": 1500}
+
+    return {
+        "default ordering": games.order_by("-created_at"),
+        "difficulty": games.filter(difficulty=difficulty).order_by("-created_at"),
+        "player_count": games.filter(player_count=player_count).order_by("-created_at"),
+        "age_group": games.filter(age_group=age_group).order_by("-created_at"),
+        "duration": games.filter(duration=duration).order_by("-created_at"),
+        "price range": games.filter(**price_range).order_by("-created_at"),
+        "price range by discount_price": games.filter(**price_range).order_by("discount_price", "id"),
+        "difficulty + price range": games.filter(difficulty=difficulty, **price_range).order_by("-created_at"),
+    }
+
+
+def measure(queryset, repeat: int) -> dict:
+    page_timings, count_timings = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset[:PAGE_SIZE])
+        page_timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        queryset.count()
+        count_timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "plan": queryset[:PAGE_SIZE].explain(),
+        "count_plan": queryset.order_by().explain(),
+        "page_ms": round(statistics.median(page_timings), 3),
+        "count_ms": round(statistics.median(count_timings), 3),
+    }
+
+
+def run_phase(repeat: int) -> dict:
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return {name: measure(queryset, repeat) for name, queryset in access_paths().items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000, help="Number of games to seed")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per access path")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the catalog")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from django.core.management import call_command
+
+    call_command("migrate", "auth", verbosity=0)
+    call_command("migrate", "games", BEFORE_MIGRATION, verbosity=0)
+    started = time.perf_counter()
+    seed_catalog(args.games, seed=args.seed)
+    print(f"Seeded {args.games} games in {time.perf_counter() - started:.1f}s ({db_path})")
+
+    before = run_phase(args.repeat)
+    call_command("migrate", "games", AFTER_MIGRATION, verbosity=0)
+    after = run_phase(args.repeat)
+
+    report = {"games": args.games, "repeat": args.repeat, "before": before, "after": after}
+    for name in before:
+        print(f"\n== {name}")
+        for phase, results in (("before", before), ("after", after)):
+            result = results[name]
+            print(f"  {phase:6} page {result['page_ms']:9.3f} ms   count {result['count_ms']:9.3f} ms")
+            print("         " + result["plan"].replace("\n", "\n         "))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Concurrency benchmark of the SQLite configuration: stock vs tuned.
+
+Usage:
+    python bench/sqlite_concurrency.py --size 10000 --readers 16 --writers 4 --seconds 10
+
+Reader threads run catalog reads (a list page with its count and a game
+detail) while writer threads run admin-style transactions that read a
+game and then update it. Every iteration is wrapped like a request:
+close_old_connections() before and after, so CONN_MAX_AGE applies.
+
+Profiles:
+
+    stock   django.db.backends.sqlite3 without options, CONN_MAX_AGE=0:
+            rollback journal, deferred transactions, a new connection per request
+    tuned   DATABASES from the project settings (config.db: WAL, PRAGMAs,
+            BEGIN IMMEDIATE, persistent connections)
+
+Each profile runs in its own process on its own copy of the same seeded
+database (WAL mode is persistent, so files can't be shared between
+profiles). Reported per profile: reads and writes per second, read
+latency percentiles and the number of "database is locked" errors.
+
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from random import Random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.catalog import setup_django  # noqa: E402
+
+PROFILES = {
+    "stock": {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 0, "OPTIONS": {}},
+    "tuned": {},
+}
+
+
+class Worker(threading.Thread):
+    def __init__(self, action, deadline: float, seed: int):
+        super().__init__(daemon=True)
+        self.action = action
+        self.deadline = deadline
+        self.rng = Random(seed)
+        self.timings = []
+        self.locked = 0
+
+    def run(self):
+        from django.db import OperationalError, close_old_connections
+
+        while time.perf_counter() < self.deadline:
+            close_old_connections()
+            started = time.perf_counter()
+            try:
+                self.action(self.rng)
+            except OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                self.locked += 1
+            else:
+                self.timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                close_old_connections()
+
+
+def run_profile(profile: str, db_path: str, readers: int, writers: int, seconds: float, write_interval: float):
+    setup_django(db_path, PROFILES[profile])
+
+    from django.db import connection, transaction
+    from django.db.models import F
+    from django.utils import timezone
+
+    from games.models import Game
+
+    game_ids = list(Game.objects.values_list("id", flat=True))
+    page_count = max(1, len(game_ids) // 16)
+    connection.close()
+
+    def read(rng):
+        offset = rng.randrange(page_count) * 16
+        list(Game.objects.order_by("-created_at")[offset:offset + 16])
+        Game.objects.count()
+        Game.objects.select_related("publisher").get(pk=rng.choice(game_ids))
+
+    def write(rng):
+        with transaction.atomic():
+            game = Game.objects.get(pk=rng.choice(game_ids))
+            Game.objects.filter(pk=game.pk).update(stock=F("stock") + 1, updated_at=timezone.now())
+        time.sleep(write_interval)
+
+    deadline = time.perf_counter() + seconds
+    workers = [Worker(read, deadline, seed) for seed in range(readers)]
+    workers += [Worker(write, deadline, 1000 + seed) for seed in range(writers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    read_timings = sorted(timing for worker in workers[:readers] for timing in worker.timings)
+    quantiles = statistics.quantiles(read_timings, n=100, method="inclusive") if len(read_timings) > 1 else [0.0] * 99
+    return {
+        "reads_per_s": round(len(read_timings) / seconds, 1),
+        "writes_per_s": round(sum(len(worker.timings) for worker in workers[readers:]) / seconds, 1),
+        "read_p50_ms": round(quantiles[49], 3),
+        "read_p95_ms": round(quantiles[94], 3),
+        "read_p99_ms": round(quantiles[98], 3),
+        "read_locked": sum(worker.locked for worker in workers[:readers]),
+        "write_locked": sum(worker.locked for worker in workers[readers:]),
+    }
+
+
+def seed_template(size: int, seed: int, db_dir: str) -> str:
+    """
+    Seed the shared catalog with the stock profile, so it stays in rollback journal mode.
+
+    """
+    db_path = os.path.join(db_dir, f"concurrency-{size}-{seed}.sqlite3")
+    if os.path.exists(db_path):
+        return db_path
+    subprocess.run(
+        [sys.executable, __file__, "--seed-only", db_path, "--size", str(size), "--seed", str(seed)], check=True
+    )
+    return db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10_000, help="Catalog size")
+    parser.add_argument("--readers", type=int, default=16, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=4, help="Writer threads")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each profile run")
+    parser.add_argument("--write-interval", type=float, default=0.005, help="Pause after each write, seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the catalog")
+    parser.add_argument("--profile", action="append", choices=PROFILES, help="Only run these profiles (repeatable)")
+    parser.add_argument("--db-dir", help="Keep the seeded database here and reuse it on later runs")
+    parser.add_argument("--output", default="sqlite_concurrency.json", help="JSON file to write results to")
+    parser.add_argument("--seed-only", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument("--run", nargs=2, metavar=("PROFILE", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_only:
+        setup_django(args.seed_only, PROFILES["stock"])
+        from bench.api import prepare_catalog
+        prepare_catalog(args.size, args.seed, os.path.dirname(args.seed_only))
+        os.replace(os.path.join(os.path.dirname(args.seed_only), f"catalog-{args.size}-{args.seed}.sqlite3"),
+                   args.seed_only)
+        return
+    if args.run:
+        result = run_profile(args.run[0], args.run[1], args.readers, args.writers, args.seconds, args.write_interval)
+        print(json.dumps(result))
+        return
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="games-bench-")
+    os.makedirs(db_dir, exist_ok=True)
+    template = seed_template(args.size, args.seed, db_dir)
+
+    report = {
+        "meta": {
+            "size": args.size, "readers": args.readers, "writers": args.writers,
+            "seconds": args.seconds, "write_interval": args.write_interval,
+        },
+        "results": {},
+    }
+    for profile in args.profile or PROFILES:
+        db_path = os.path.join(db_dir, f"{profile}.sqlite3")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        shutil.copyfile(template, db_path)
+        child = subprocess.run(
+            [sys.executable, __file__, "--run", profile, db_path, "--readers", str(args.readers),
+             "--writers", str(args.writers), "--seconds", str(args.seconds),
+             "--write-interval", str(args.write_interval)],
+            check=True, capture_output=True, text=True,
+        )
+        result = report["results"][profile] = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"  {profile:6} reads {result['reads_per_s']:8.1f}/s  writes {result['writes_per_s']:7.1f}/s   "
+              f"read p50 {result['read_p50_ms']:8.3f}  p95 {result['read_p95_ms']:8.3f}  "
+              f"p99 {result['read_p99_ms']:8.3f} ms   locked: reads {result['read_locked']}, "
+              f"writes {result['write_locked']}")
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Carts of anonymous shoppers, kept out of the database.
+
+The lines of an anonymous cart, {game id: quantity}, live either in a
+signed cookie ("12.3-45.1" for 3 of game 12 and 1 of game 45) or in the
+cache under a random key kept in a signed cookie, as ANONYMOUS_CART_STORE
+says. Browsing and filling the cart only reads games; the first
+authenticated cart request after logging in folds the lines into the
+user's database cart through Cart.update_items(), which reserves their
+stock, and drops the anonymous cart.
+
+"""
+import secrets
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+from games.models import Game
+
+from .models import MAX_LINE_QUANTITY, Cart, CartItem
+
+COOKIE_NAME = "cart"
+COOKIE_SALT = "carts.anonymous"
+
+
+class AnonymousCart:
+    """
+    An anonymous cart, serializable with CartSerializer like a Cart
+    loaded with its totals. The lines and totals take one query for the
+    games.
+
+    """
+    id = pk = created_at = None
+
+    def __init__(self, quantities=None, key=None):
+        self.quantities = dict(quantities or {})
+        self.key = key
+        self.changed = False
+        self._lines = None
+
+    def update_items(self, quantities: dict, add: bool = False) -> dict:
+        """
+        Like Cart.update_items: set the quantities, or with `add` increase
+        them; a resulting quantity of 0 removes the line. Anonymous carts
+        reserve no stock, so no line is ever short of it.
+
+        """
+        for game_id, quantity in quantities.items():
+            if add:
+                quantity = min(quantity + self.quantities.get(game_id, 0), MAX_LINE_QUANTITY)
+            if quantity:
+                self.quantities[game_id] = quantity
+            else:
+                self.quantities.pop(game_id, None)
+        if len(self.quantities) > settings.ANONYMOUS_CART_MAX_LINES:
+            raise ValidationError(
+                {"items": _("A cart holds at most %d lines.") % settings.ANONYMOUS_CART_MAX_LINES}
+            )
+        self.changed = True
+        self._lines = None
+        return {}
+
+    def clear(self) -> None:
+        self.quantities = {}
+        self.changed = True
+        self._lines = None
+
+    def get_lines(self) -> list:
+        if self._lines is None:
+            games = Game.objects.only("title", "discount_price").in_bulk(list(self.quantities))
+            self._lines = []
+            # Games deleted in the meantime drop out
+            for game_id, quantity in self.quantities.items():
+                if game_id in games:
+                    line = CartItem(game=games[game_id], quantity=quantity)
+                    line.unit_price = games[game_id].discount_price
+                    line.line_total = line.unit_price * quantity
+                    self._lines.append(line)
+        return self._lines
+
+    def get_totals(self) -> dict:
+        lines = self.get_lines()
+        return {
+            "total": sum((line.line_total for line in lines), Decimal("0.00")),
+            "quantity": sum(line.quantity for line in lines),
+            "line_count": len(lines),
+        }
+
+    @property
+    def get_cart_total(self):
+        return self.get_totals()["total"]
+
+    @property
+    def get_cart_quantity_items(self):
+        return self.get_totals()["quantity"]
+
+
+def encode_lines(quantities: dict) -> str:
+    return "-".join(f"{game_id}.{quantity}" for game_id, quantity in quantities.items())
+
+
+def decode_lines(value: str) -> dict:
+    quantities = {}
+    for line in filter(None, value.split("-")):
+        game_id, quantity = map(int, line.split("."))
+        if game_id > 0 and 0 < quantity <= MAX_LINE_QUANTITY:
+            quantities[game_id] = quantity
+    return quantities
+
+
+class CookieCartStore:
+    """
+    The lines themselves in a signed cookie, so no server side state at all.
+
+    """
+
+    def get_cookie(self, request):
+        return request.get_signed_cookie(
+            COOKIE_NAME, default=None, salt=COOKIE_SALT, max_age=settings.ANONYMOUS_CART_AGE
+        )
+
+    def set_cookie(self, response, value: str) -> None:
+        response.set_signed_cookie(
+            COOKIE_NAME, value, salt=COOKIE_SALT, max_age=settings.ANONYMOUS_CART_AGE,
+            httponly=True, samesite="Lax",
+        )
+
+    def load(self, request) -> AnonymousCart:
+        try:
+            return AnonymousCart(decode_lines(self.get_cookie(request) or ""))
+        except ValueError:
+            return AnonymousCart()
+
+    def save(self, cart: AnonymousCart, response) -> None:
+        if cart.quantities:
+            self.set_cookie(response, encode_lines(cart.quantities))
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite="Lax")
+
+
+class CacheCartStore(CookieCartStore):
+    """
+    The lines in the cache, under a random key kept in a signed cookie.
+
+    """
+
+    @staticmethod
+    def cache_key(key: str) -> str:
+        return f"carts:anonymous:{key}"
+
+    def load(self, request) -> AnonymousCart:
+        key = self.get_cookie(request)
+        if not key:
+            return AnonymousCart()
+        return AnonymousCart(cache.get(self.cache_key(key)), key=key)
+
+    def save(self, cart: AnonymousCart, response) -> None:
+        if cart.quantities:
+            cart.key = cart.key or secrets.token_urlsafe(16)
+            cache.set(self.cache_key(cart.key), cart.quantities, settings.ANONYMOUS_CART_AGE)
+            self.set_cookie(response, cart.key)
+        else:
+            if cart.key:
+                cache.delete(self.cache_key(cart.key))
+            response.delete_cookie(COOKIE_NAME, samesite="Lax")
+
+
+STORES = {"cookie": CookieCartStore, "cache": CacheCartStore}
+
+
+def get_anonymous_cart_store():
+    return STORES[settings.ANONYMOUS_CART_STORE]()
+
+
+def merge_anonymous_cart(anonymous: AnonymousCart, cart: Cart) -> None:
+    """
+    Add the lines of the anonymous cart to `cart` in one batch of
+    Cart.update_items(), so they get their stock reserved; lines short of
+    stock are cut down to what is available. Empties the anonymous cart.
+
+    """
+    if not anonymous.quantities:
+        return
+    # Games deleted in the meantime drop out
+    games = Game.objects.filter(pk__in=anonymous.quantities).values_list("pk", flat=True)
+    cart.update_items({game_id: anonymous.quantities[game_id] for game_id in games}, add=True, fit_stock=True)
+    anonymous.clear()
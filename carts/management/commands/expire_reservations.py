@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from carts.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Delete expired cart stock reservations and give their units back, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Reservations expired per transaction"
+        )
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS, help="Database to sweep"
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_reservations(batch_size=options["batch_size"], using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} stock reservations"))
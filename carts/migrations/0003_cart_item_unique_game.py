@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    CartItem = apps.get_model("carts", "CartItem")
+    duplicates = (
+        CartItem.objects.order_by()
+        .values("cart", "game")
+        .annotate(first=Min("id"), quantity=Sum("quantity"), lines=Count("id"))
+        .filter(lines__gt=1)
+    )
+    for duplicate in duplicates:
+        CartItem.objects.filter(pk=duplicate["first"]).update(quantity=duplicate["quantity"])
+        CartItem.objects.filter(cart=duplicate["cart"], game=duplicate["game"]).exclude(
+            pk=duplicate["first"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carts", "0002_stock_reservations"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("cart", "game"), name="cart_item_cart_game_unique"
+            ),
+        ),
+    ]
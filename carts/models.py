@@ -1,24 +1,152 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 from games.models import Game
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+MAX_LINE_QUANTITY = 1000
+
+
+def line_total(prefix: str = "") -> ExpressionWrapper:
+    """
+    Quantity times the game's selling price (`discount_price`, which equals
+    `price` when the game isn't discounted) of the cart items at `prefix`.
+
+    """
+    return ExpressionWrapper(F(f"{prefix}quantity") * F(f"{prefix}game__discount_price"), output_field=MONEY)
+
+
+def cart_totals(prefix: str = "") -> dict:
+    """
+    Aggregates of the cart items at `prefix`: total, quantity and line count.
+
+    """
+    return {
+        "total": Coalesce(Sum(line_total(prefix)), Value(Decimal("0.00")), output_field=MONEY),
+        "quantity": Coalesce(Sum(f"{prefix}quantity"), 0),
+        "line_count": Count(f"{prefix}id"),
+    }
+
+
+class CartQuerySet(models.QuerySet):
+    def current(self, user) -> "Cart":
+        """
+        The user's most recent cart, created if the user has none.
+
+        """
+        cart = self.filter(user=user).order_by("-created_at", "-id").first()
+        return cart if cart is not None else self.create(user=user)
+
+    def with_totals(self):
+        """
+        Annotate every cart with `total`, `quantity` and `line_count`,
+        computed in the same query with a join to its items and games.
+
+        """
+        return self.annotate(**cart_totals("cart_items__"))
+
+    def abandoned(self, created_before):
+        """
+        Non-empty carts created before `created_before` with their totals,
+        the most valuable first.
+
+        """
+        return self.with_totals().filter(created_at__lt=created_before, line_count__gt=0).order_by("-total", "id")
+
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="carts")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+    def get_totals(self) -> dict:
+        """
+        Return the total, quantity and line count of the cart, from the
+        with_totals() annotations when present, else with one aggregate query.
+
+        """
+        if hasattr(self, "total"):
+            return {"total": self.total, "quantity": self.quantity, "line_count": self.line_count}
+        return self.cart_items.aggregate(**cart_totals())
+
+    def get_lines(self):
+        """
+        The cart items with their games, `unit_price` and `line_total`, in one query.
+
+        """
+        return self.cart_items.with_totals().select_related("game").order_by("id")
+
+    def update_items(self, quantities: dict, add: bool = False, fit_stock: bool = False) -> dict:
+        """
+        Set the quantities of the lines of the given games, {game id:
+        quantity}, or with `add` increase them; a resulting quantity of 0
+        removes the line. Runs in one transaction with at most one INSERT,
+        one UPDATE and one DELETE however many lines change, which also
+        holds the new quantities in stock reservations.
+
+        Returns {game id: available units} of the lines short of stock, and
+        then changes nothing; with `fit_stock` those lines are cut down to
+        the available units instead.
+
+        """
+        # carts.reservations imports the models
+        from .reservations import hold_lines
+
+        using = self._state.db or DEFAULT_DB_ALIAS
+        with transaction.atomic(using=using):
+            if connections[using].features.has_select_for_update:
+                # Serialize batches on the same cart, so two can't insert the same game
+                list(Cart.objects.using(using).select_for_update().filter(pk=self.pk).values_list("pk"))
+            existing = {item.game_id: item for item in self.cart_items.using(using).filter(game__in=quantities)}
+            changed = {}
+            for game_id, quantity in quantities.items():
+                item = existing.get(game_id)
+                if add and item is not None:
+                    quantity = min(quantity + item.quantity, MAX_LINE_QUANTITY)
+                if quantity != (item.quantity if item is not None else 0):
+                    changed[game_id] = quantity
+
+            short = hold_lines(self, changed, fit=fit_stock, using=using)
+            if short and not fit_stock:
+                return short
+            changed.update(short)
+
+            created, updated, deleted = [], [], []
+            for game_id, quantity in changed.items():
+                item = existing.get(game_id)
+                if item is None:
+                    if quantity:
+                        created.append(CartItem(cart=self, game_id=game_id, quantity=quantity))
+                elif quantity:
+                    item.quantity = quantity
+                    updated.append(item)
+                else:
+                    deleted.append(item.pk)
+            if created:
+                CartItem.objects.using(using).bulk_create(created)
+            if updated:
+                CartItem.objects.using(using).bulk_update(updated, ["quantity"])
+            if deleted:
+                CartItem.objects.using(using).filter(pk__in=deleted).delete()
+        return short
+
     @property
     def get_cart_total(self):
-        items = self.cart_items.all()
-        total = sum([item.get_total for item in items])
-        return total
+        return self.get_totals()["total"]
 
     @property
     def get_cart_quantity_items(self):
-        items = self.cart_items.all()
-        total = sum([item.quantity for item in items])
-        return total
+        return self.get_totals()["quantity"]
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        return self.annotate(unit_price=F("game__discount_price"), line_total=line_total())
 
 
 class CartItem(models.Model):
@@ -26,6 +154,39 @@ class CartItem(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="cart_items")
     quantity = models.IntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # One line per game: batch updates and merges address lines by game
+            models.UniqueConstraint(fields=["cart", "game"], name="cart_item_cart_game_unique"),
+        ]
+
     @property
     def get_total(self):
-        return self.game.price * self.quantity
+        if hasattr(self, "line_total"):
+            return self.line_total
+        return self.game.discount_price * self.quantity
+
+
+class StockReservation(models.Model):
+    """
+    Units of a game held for a cart until `expires_at`. The quantities of
+    all reservations of a game add up to its `reserved_stock`; create,
+    change and delete them through carts.reservations, which keeps the two
+    in step.
+
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservations")
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "game"], name="reservation_cart_game_unique"),
+        ]
+        indexes = [
+            # The sweeper's scan for expired reservations
+            models.Index(fields=["expires_at"], name="reservation_expires_idx"),
+        ]
@@ -0,0 +1,179 @@
+"""
+Soft stock reservations of carts.
+
+A cart holds the units of its items for CART_RESERVATION_TTL seconds
+(StockReservation); Cart.update_items() reserves the changed lines in the
+transaction that writes them. Game.reserved_stock is the sum of the game's
+reservations and is kept up to date incrementally, in the same transaction as
+the reservations, so the stock available to everyone else
+(Game.available_stock: stock minus reserved_stock) is read straight from
+the game row.
+
+Reservations don't bump Game.updated_at: the list representations and
+validators don't include reserved stock, and the game detail reads
+available_stock from the row on every request (GameModelViewSet), so
+reserving never invalidates a cached game.
+
+Reservations are locked before games, and games in primary key order, as
+in orders.checkout. Expired reservations keep their units reserved until
+expire_reservations() (the expire_reservations command) sweeps them.
+
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from games.models import Game
+
+from .models import Cart, StockReservation
+
+
+def adjust_reserved(deltas: dict, using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Add `deltas` ({game id: units}) to the games' reserved_stock. Call
+    inside the transaction that changes the reservations.
+
+    """
+    deltas = {game_id: delta for game_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    for game_id in sorted(deltas):
+        Game.objects.using(using).filter(pk=game_id).update(reserved_stock=F("reserved_stock") + deltas[game_id])
+
+
+def hold_lines(cart: Cart, quantities: dict, fit: bool = False, using: str = DEFAULT_DB_ALIAS) -> dict:
+    """
+    Hold `quantities` ({game id: units}, 0 to let them go) of the games for
+    the cart and restart the TTL of those reservations, with a fixed number
+    of queries however many lines change.
+
+    Lines needing more units than are available to the cart are returned
+    as {game id: available units}, and then nothing changes; with `fit`
+    they hold what is available instead and are still returned.
+
+    """
+    if not quantities:
+        return {}
+    can_lock = connections[using].features.has_select_for_update
+    with transaction.atomic(using=using):
+        reservations = StockReservation.objects.using(using).filter(cart=cart, game__in=quantities)
+        if can_lock:
+            reservations = reservations.select_for_update()
+        existing = {reservation.game_id: reservation for reservation in reservations}
+        held = {game_id: reservation.quantity for game_id, reservation in existing.items()}
+
+        games = Game.objects.using(using).filter(
+            pk__in=[game_id for game_id, quantity in quantities.items() if quantity != held.get(game_id, 0)]
+        ).only("stock", "reserved_stock")
+        if can_lock:
+            games = games.select_for_update()
+        short = {}
+        for game in games.order_by("pk"):
+            available = game.available_stock + held.get(game.pk, 0)
+            if quantities[game.pk] > available:
+                short[game.pk] = available
+        if short and not fit:
+            return short
+
+        quantities = {**quantities, **short}
+        deltas = {game_id: quantity - held.get(game_id, 0) for game_id, quantity in quantities.items()}
+        deltas = {game_id: delta for game_id, delta in deltas.items() if delta}
+        if deltas:
+            Game.objects.using(using).filter(pk__in=deltas).update(
+                reserved_stock=F("reserved_stock") + Case(
+                    *[When(pk=game_id, then=Value(delta)) for game_id, delta in deltas.items()],
+                    default=Value(0), output_field=IntegerField(),
+                )
+            )
+
+        expires_at = timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL)
+        created, updated, deleted = [], [], []
+        for game_id, quantity in quantities.items():
+            reservation = existing.get(game_id)
+            if reservation is None:
+                if quantity:
+                    created.append(
+                        StockReservation(cart=cart, game_id=game_id, quantity=quantity, expires_at=expires_at)
+                    )
+            elif quantity:
+                reservation.quantity, reservation.expires_at = quantity, expires_at
+                updated.append(reservation)
+            else:
+                deleted.append(reservation.pk)
+        if created:
+            StockReservation.objects.using(using).bulk_create(created)
+        if updated:
+            StockReservation.objects.using(using).bulk_update(updated, ["quantity", "expires_at"])
+        if deleted:
+            StockReservation.objects.using(using).filter(pk__in=deleted).delete()
+    return short
+
+
+def reserve(cart: Cart, game_id: int, quantity: int, using: str = DEFAULT_DB_ALIAS) -> bool:
+    """
+    Hold `quantity` units of the game for the cart (0 to let them go) and
+    restart the reservation's TTL. Returns False, changing nothing, when
+    fewer units are available.
+
+    """
+    return not hold_lines(cart, {game_id: quantity}, using=using)
+
+
+def held_quantities(cart: Cart, using: str = DEFAULT_DB_ALIAS) -> dict:
+    """
+    {game id: units} held by the cart's reservations, locked for the rest
+    of the transaction where the backend supports it.
+
+    """
+    reservations = StockReservation.objects.using(using).filter(cart=cart)
+    if connections[using].features.has_select_for_update:
+        reservations = reservations.select_for_update()
+    return dict(reservations.values_list("game", "quantity"))
+
+
+def release(cart: Cart, using: str = DEFAULT_DB_ALIAS) -> int:
+    """
+    Drop all reservations of the cart and give their units back. Returns
+    the number of reservations dropped.
+
+    """
+    with transaction.atomic(using=using):
+        held = held_quantities(cart, using)
+        if held:
+            StockReservation.objects.using(using).filter(cart=cart).delete()
+            adjust_reserved({game_id: -quantity for game_id, quantity in held.items()}, using)
+    return len(held)
+
+
+def expire_reservations(now=None, batch_size: int = 500, using: str = DEFAULT_DB_ALIAS) -> int:
+    """
+    Delete the reservations that expired by `now` and give their units
+    back, `batch_size` reservations per transaction, oldest first. Returns
+    the number of reservations expired.
+
+    """
+    now = now or timezone.now()
+    features = connections[using].features
+    expired = 0
+    while True:
+        with transaction.atomic(using=using):
+            batch = StockReservation.objects.using(using).filter(expires_at__lte=now).order_by("expires_at")
+            if features.has_select_for_update_skip_locked:
+                # Reservations being checked out or changed are left for the next run
+                batch = batch.select_for_update(skip_locked=True)
+            rows = list(batch.values_list("pk", "game", "quantity")[:batch_size])
+            if not rows:
+                break
+            StockReservation.objects.using(using).filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            released = Counter()
+            for _, game_id, quantity in rows:
+                released[game_id] -= quantity
+            adjust_reserved(released, using)
+        expired += len(rows)
+        if len(rows) < batch_size:
+            break
+    return expired
@@ -0,0 +1,73 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from games.models import Game
+
+from .models import MAX_LINE_QUANTITY, Cart, CartItem
+
+
+class CartLineSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='game.title', read_only=True)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, source='get_total', read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'game', 'title', 'quantity', 'unit_price', 'line_total']
+
+
+class CartSerializer(serializers.ModelSerializer):
+    """
+    A cart with its lines and totals. Serialize carts loaded with
+    `Cart.objects.with_totals()`, so that the totals need no extra query,
+    or anonymous carts (carts.anonymous.AnonymousCart).
+
+    """
+    items = CartLineSerializer(many=True, read_only=True, source='get_lines')
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, source='get_cart_total', read_only=True)
+    quantity = serializers.IntegerField(source='get_cart_quantity_items', read_only=True)
+    line_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cart
+        fields = ['id', 'items', 'total', 'quantity', 'line_count', 'created_at']
+
+    def get_line_count(self, obj):
+        return obj.get_totals()['line_count']
+
+
+class CartLineInputSerializer(serializers.Serializer):
+    game = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=MAX_LINE_QUANTITY)
+
+
+class CartItemsSerializer(serializers.Serializer):
+    """
+    A batch of cart lines, validated into {game id: quantity} with a
+    single query for the games.
+
+    """
+    max_lines = 100
+
+    items = CartLineInputSerializer(many=True, allow_empty=False)
+
+    def __init__(self, *args, add=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.add = add
+
+    def validate_items(self, items):
+        if len(items) > self.max_lines:
+            raise serializers.ValidationError(_('At most %d lines per request.') % self.max_lines)
+        quantities = {}
+        for line in items:
+            if line['game'] in quantities:
+                raise serializers.ValidationError(_('Game %d is listed more than once.') % line['game'])
+            if self.add and line['quantity'] < 1:
+                raise serializers.ValidationError(_('Quantities to add must be at least 1.'))
+            quantities[line['game']] = line['quantity']
+        unknown = set(quantities) - set(Game.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+        if unknown:
+            raise serializers.ValidationError(
+                _('Unknown games: %s') % ', '.join(str(pk) for pk in sorted(unknown))
+            )
+        return quantities
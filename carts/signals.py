@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Cart
+from .reservations import release
+
+
+@receiver(pre_delete, sender=Cart)
+def release_reservations(sender, instance: Cart, using: str, **kwargs) -> None:
+    # The cascade would delete the reservations without giving their units back
+    release(instance, using)
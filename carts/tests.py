@@ -1,3 +1,428 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from ddf import G
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from carts.anonymous import COOKIE_NAME
+from carts.models import Cart, CartItem, StockReservation
+from carts.reservations import expire_reservations, release, reserve
+from games.models import Game
+
+
+class CartTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.full_price = G(Game, price=Decimal('40.00'), discount_price=Decimal('40.00'))
+        cls.discounted = G(Game, price=Decimal('30.00'), discount_price=Decimal('19.99'))
+        cls.cart = G(Cart, user=cls.user)
+        G(CartItem, cart=cls.cart, game=cls.full_price, quantity=2)
+        G(CartItem, cart=cls.cart, game=cls.discounted, quantity=3)
+        cls.empty_cart = G(Cart, user=cls.user)
+
+    def test_totals_use_the_discount_price_in_one_query(self):
+        with self.assertNumQueries(1):
+            totals = self.cart.get_totals()
+        self.assertEqual(totals, {'total': Decimal('139.97'), 'quantity': 5, 'line_count': 2})
+        self.assertEqual(self.cart.get_cart_total, Decimal('139.97'))
+        self.assertEqual(self.cart.get_cart_quantity_items, 5)
+
+    def test_empty_cart(self):
+        self.assertEqual(self.empty_cart.get_totals(), {'total': Decimal('0.00'), 'quantity': 0, 'line_count': 0})
+
+    def test_lines_in_one_query(self):
+        with self.assertNumQueries(1):
+            lines = [(line.game.pk, line.unit_price, line.line_total, line.get_total) for line in self.cart.get_lines()]
+        self.assertEqual(lines, [
+            (self.full_price.pk, Decimal('40.00'), Decimal('80.00'), Decimal('80.00')),
+            (self.discounted.pk, Decimal('19.99'), Decimal('59.97'), Decimal('59.97')),
+        ])
+
+    def test_many_carts_with_totals_in_one_query(self):
+        other = G(Cart, user=G(User))
+        G(CartItem, cart=other, game=self.discounted, quantity=1)
+
+        with self.assertNumQueries(1):
+            carts = {cart.pk: (cart.total, cart.quantity, cart.get_cart_total) for cart in Cart.objects.with_totals()}
+        self.assertEqual(carts, {
+            self.cart.pk: (Decimal('139.97'), 5, Decimal('139.97')),
+            self.empty_cart.pk: (Decimal('0.00'), 0, Decimal('0.00')),
+            other.pk: (Decimal('19.99'), 1, Decimal('19.99')),
+        })
+
+    def test_abandoned_carts(self):
+        Cart.objects.filter(pk__in=[self.cart.pk, self.empty_cart.pk]).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+        G(CartItem, cart=G(Cart, user=self.user), game=self.full_price)
+
+        abandoned = Cart.objects.abandoned(timezone.now() - timedelta(days=1))
+        self.assertEqual([(cart.pk, cart.total) for cart in abandoned], [(self.cart.pk, Decimal('139.97'))])
+
+
+@override_settings(CART_RESERVATION_TTL=600)
+class StockReservationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.game = G(Game, stock=5)
+        cls.cart = G(Cart, user=cls.user)
+        cls.other_cart = G(Cart, user=G(User))
+
+    def game_stock(self):
+        game = Game.objects.get(pk=self.game.pk)
+        return game.reserved_stock, game.available_stock
+
+    def test_reservations_hold_stock(self):
+        self.assertTrue(reserve(self.cart, self.game.pk, 3))
+        self.assertEqual(self.game_stock(), (3, 2))
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.cart, reservation.quantity), (self.cart, 3))
+        self.assertAlmostEqual(
+            reservation.expires_at, timezone.now() + timedelta(seconds=600), delta=timedelta(seconds=5)
+        )
+
+        self.assertFalse(reserve(self.other_cart, self.game.pk, 3))
+        self.assertTrue(reserve(self.other_cart, self.game.pk, 2))
+        self.assertEqual(self.game_stock(), (5, 0))
+
+    def test_changing_a_reservation_applies_the_difference(self):
+        reserve(self.cart, self.game.pk, 2)
+        reserve(self.other_cart, self.game.pk, 2)
+        self.assertFalse(reserve(self.cart, self.game.pk, 4))
+        self.assertTrue(reserve(self.cart, self.game.pk, 3))
+        self.assertEqual(self.game_stock(), (5, 0))
+
+        self.assertTrue(reserve(self.cart, self.game.pk, 1))
+        self.assertEqual(self.game_stock(), (3, 2))
+        self.assertTrue(reserve(self.cart, self.game.pk, 0))
+        self.assertEqual(self.game_stock(), (2, 3))
+        self.assertFalse(StockReservation.objects.filter(cart=self.cart).exists())
+
+    def test_release_and_cart_deletion_give_the_units_back(self):
+        reserve(self.cart, self.game.pk, 2)
+        reserve(self.other_cart, self.game.pk, 1)
+        self.assertEqual(release(self.cart), 1)
+        self.assertEqual(self.game_stock(), (1, 4))
+
+        self.other_cart.delete()
+        self.assertEqual(self.game_stock(), (0, 5))
+
+    def test_expired_reservations_are_swept_in_batches(self):
+        other_game = G(Game, stock=10)
+        carts = [G(Cart, user=self.user) for _ in range(5)]
+        for cart in carts:
+            reserve(cart, self.game.pk, 1)
+            reserve(cart, other_game.pk, 2)
+        StockReservation.objects.filter(cart__in=carts[:4]).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        # Three batches: select, delete and one update per game, each in a savepoint
+        with self.assertNumQueries(3 * 6):
+            self.assertEqual(expire_reservations(batch_size=3), 8)
+        self.assertEqual(self.game_stock(), (1, 4))
+        self.assertEqual(Game.objects.get(pk=other_game.pk).reserved_stock, 2)
+        self.assertEqual(set(StockReservation.objects.values_list('cart', flat=True)), {carts[4].pk})
+
+    def test_sweeper_command(self):
+        reserve(self.cart, self.game.pk, 2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('expire_reservations', '--batch-size', '10', stdout=out)
+        self.assertIn('Expired 1 stock reservations', out.getvalue())
+        self.assertEqual(self.game_stock(), (0, 5))
+
+    def test_available_stock_in_the_game_detail(self):
+        reserve(self.cart, self.game.pk, 2)
+        response = self.client.get(reverse('games:game-detail', kwargs={'pk': self.game.pk}))
+        self.assertEqual(
+            (response.data['stock'], response.data['reserved_stock'], response.data['available_stock']), (5, 2, 3)
+        )
+
+    def test_reservations_leave_updated_at_and_the_list_caches_alone(self):
+        list_url = reverse('games:game-list')
+        detail_url = reverse('games:game-detail', kwargs={'pk': self.game.pk})
+        updated_at = Game.objects.get(pk=self.game.pk).updated_at
+        list_etag = self.client.get(list_url)['ETag']
+        detail_etag = self.client.get(detail_url)['ETag']
+
+        reserve(self.cart, self.game.pk, 2)
+        self.assertEqual(Game.objects.get(pk=self.game.pk).updated_at, updated_at)
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 304)
+        # The cached detail is served with the current available stock and a new ETag
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['reserved_stock'], response.data['available_stock']), (2, 3))
+
+        release(self.cart)
+        response = self.client.get(detail_url)
+        self.assertEqual((response.data['reserved_stock'], response.data['available_stock']), (0, 5))
+
+
+class CartAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.games = [G(Game, price=Decimal('10.00'), discount_price=Decimal('8.00'), stock=50) for _ in range(40)]
+        cls.url = reverse('carts:cart-list')
+        cls.items_url = reverse('carts:cart-items')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def lines(self, cart):
+        return dict(cart.cart_items.values_list('game', 'quantity'))
+
+    def test_anonymous_users_cannot_check_out(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(reverse('carts:cart-checkout')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_get_creates_the_cart(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['items'], response.data['total'], response.data['quantity'], response.data['line_count']),
+            ([], '0.00', 0, 0),
+        )
+        self.assertEqual(Cart.objects.get(user=self.user).pk, response.data['id'])
+
+    def test_get_the_latest_cart_in_two_queries(self):
+        G(Cart, user=self.user)
+        cart = G(Cart, user=self.user)
+        for game in self.games[:10]:
+            G(CartItem, cart=cart, game=game, quantity=2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['id'], cart.pk)
+        self.assertEqual(len(response.data['items']), 10)
+        self.assertEqual((response.data['total'], response.data['quantity']), ('160.00', 20))
+        self.assertEqual(response.data['items'][0], {
+            'id': cart.cart_items.order_by('id')[0].pk, 'game': self.games[0].pk, 'title': self.games[0].title,
+            'quantity': 2, 'unit_price': '8.00', 'line_total': '16.00',
+        })
+
+    def test_add_a_batch(self):
+        cart = G(Cart, user=self.user)
+        G(CartItem, cart=cart, game=self.games[0], quantity=1)
+
+        response = self.client.post(self.items_url, {'items': [
+            {'game': self.games[0].pk, 'quantity': 2}, {'game': self.games[1].pk, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.lines(cart), {self.games[0].pk: 3, self.games[1].pk: 1})
+        self.assertEqual((response.data['total'], response.data['quantity'], response.data['line_count']),
+                         ('32.00', 4, 2))
+
+    def test_set_and_remove_in_one_batch(self):
+        cart = G(Cart, user=self.user)
+        G(CartItem, cart=cart, game=self.games[0], quantity=1)
+        G(CartItem, cart=cart, game=self.games[1], quantity=5)
+
+        response = self.client.patch(self.items_url, {'items': [
+            {'game': self.games[0].pk, 'quantity': 4},
+            {'game': self.games[1].pk, 'quantity': 0},
+            {'game': self.games[2].pk, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.lines(cart), {self.games[0].pk: 4, self.games[2].pk: 1})
+        self.assertEqual((response.data['total'], response.data['line_count']), ('40.00', 2))
+
+    def test_batches_run_a_constant_number_of_queries(self):
+        self.client.post(self.items_url, {'items': [{'game': game.pk, 'quantity': 1} for game in self.games[:20]]},
+                         format='json')
+
+        def batch(games):
+            # A third of the lines each: created, updated and removed
+            return {'items': [
+                {'game': game.pk, 'quantity': index % 3} for index, game in enumerate(games)
+            ]}
+
+        # Cart, games check, savepoint, existing lines, then in a savepoint
+        # the reservations, the games' stock, reserved_stock and insert,
+        # update and delete of the reservations, then those of the lines,
+        # release, then the cart with its totals and the lines
+        with self.assertNumQueries(18):
+            self.client.patch(self.items_url, batch(self.games[17:23]), format='json')
+        with self.assertNumQueries(18):
+            response = self.client.patch(self.items_url, batch(self.games[:40]), format='json')
+        self.assertEqual(response.data['line_count'], 26)
+
+    def reservations(self, cart):
+        return dict(cart.reservations.values_list('game', 'quantity'))
+
+    def test_batches_reserve_the_stock_of_changed_lines(self):
+        cart = G(Cart, user=self.user)
+        self.client.post(self.items_url, {'items': [
+            {'game': self.games[0].pk, 'quantity': 3}, {'game': self.games[1].pk, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(self.reservations(cart), {self.games[0].pk: 3, self.games[1].pk: 1})
+
+        self.client.patch(self.items_url, {'items': [
+            {'game': self.games[0].pk, 'quantity': 1}, {'game': self.games[1].pk, 'quantity': 0},
+        ]}, format='json')
+        self.assertEqual(self.reservations(cart), {self.games[0].pk: 1})
+        self.assertEqual(
+            dict(Game.objects.filter(pk__in=[self.games[0].pk, self.games[1].pk]).values_list('pk', 'reserved_stock')),
+            {self.games[0].pk: 1, self.games[1].pk: 0},
+        )
+
+    def test_lines_short_of_stock_fail_the_batch(self):
+        cart = G(Cart, user=self.user)
+        scarce = G(Game, stock=1)
+        reserve(G(Cart, user=G(User)), self.games[1].pk, 48)
+
+        response = self.client.post(self.items_url, {'items': [
+            {'game': self.games[0].pk, 'quantity': 2},
+            {'game': scarce.pk, 'quantity': 5},
+            {'game': self.games[1].pk, 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'items': [
+            {}, {'quantity': ['Only 1 available.']}, {'quantity': ['Only 2 available.']},
+        ]})
+        self.assertEqual((self.lines(cart), self.reservations(cart)), ({}, {}))
+        self.assertEqual(Game.objects.get(pk=scarce.pk).reserved_stock, 0)
+        self.assertEqual(Game.objects.get(pk=self.games[0].pk).reserved_stock, 0)
+
+        # The cart's own reservation counts as available to it
+        self.client.post(self.items_url, {'items': [{'game': scarce.pk, 'quantity': 1}]}, format='json')
+        response = self.client.patch(self.items_url, {'items': [{'game': scarce.pk, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.reservations(cart), {scarce.pk: 1})
+
+    def test_invalid_batches(self):
+        game = self.games[0].pk
+        for items, method in [
+            ([], 'patch'),
+            ([{'game': game, 'quantity': 1}, {'game': game, 'quantity': 2}], 'patch'),
+            ([{'game': 0, 'quantity': 1}], 'patch'),
+            ([{'game': game, 'quantity': -1}], 'patch'),
+            ([{'game': game, 'quantity': 0}], 'post'),
+            ([{'game': game, 'quantity': 1}] * 101, 'post'),
+        ]:
+            with self.subTest(items=items[:2], method=method):
+                response = getattr(self.client, method)(self.items_url, {'items': items}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_checkout(self):
+        cart = G(Cart, user=self.user)
+        G(CartItem, cart=cart, game=self.games[0], quantity=2)
+
+        response = self.client.post(reverse('carts:cart-checkout'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['total'], response.data['item_count']), ('16.00', 2))
+        self.assertEqual(response.data['items'][0]['game'], self.games[0].pk)
+        self.assertEqual(self.lines(cart), {})
+
+    def test_checkout_short_of_stock(self):
+        cart = G(Cart, user=self.user)
+        G(CartItem, cart=cart, game=self.games[0], quantity=51)
+
+        response = self.client.post(reverse('carts:cart-checkout'))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['failures'], [
+            {'game_id': self.games[0].pk, 'title': self.games[0].title, 'requested': 51, 'available': 50},
+        ])
+
+
+@override_settings(ANONYMOUS_CART_STORE='cookie', ANONYMOUS_CART_MAX_LINES=5)
+class AnonymousCartTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.games = [G(Game, price=Decimal('10.00'), discount_price=Decimal('8.00'), stock=10) for _ in range(6)]
+        cls.url = reverse('carts:cart-list')
+        cls.items_url = reverse('carts:cart-items')
+
+    def setUp(self):
+        cache.clear()
+
+    def add(self, *lines, method='post'):
+        return getattr(self.client, method)(self.items_url, {'items': [
+            {'game': game.pk, 'quantity': quantity} for game, quantity in lines
+        ]}, format='json')
+
+    def test_anonymous_cart_never_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.add((self.games[0], 2), (self.games[1], 1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The games check and the lines
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        self.assertEqual(
+            (response.data['id'], response.data['total'], response.data['quantity'], response.data['line_count']),
+            (None, '24.00', 3, 2),
+        )
+        self.assertEqual(response.data['items'][0], {
+            'id': None, 'game': self.games[0].pk, 'title': self.games[0].title,
+            'quantity': 2, 'unit_price': '8.00', 'line_total': '16.00',
+        })
+        self.assertFalse(Cart.objects.exists())
+
+        self.add((self.games[0], 1))
+        self.add((self.games[1], 0), (self.games[2], 4), method='patch')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual([(line['game'], line['quantity']) for line in response.data['items']],
+                         [(self.games[0].pk, 3), (self.games[2].pk, 4)])
+
+    def test_the_cookie_is_signed_and_compact(self):
+        self.add((self.games[0], 2), (self.games[1], 1))
+        value = self.client.cookies[COOKIE_NAME].value
+        self.assertTrue(value.startswith(f'{self.games[0].pk}.2-{self.games[1].pk}.1:'))
+
+        self.client.cookies[COOKIE_NAME] = value.replace(f'{self.games[0].pk}.2', f'{self.games[0].pk}.9')
+        self.assertEqual(self.client.get(self.url).data['items'], [])
+
+    def test_emptied_cart_drops_the_cookie(self):
+        self.add((self.games[0], 2))
+        response = self.add((self.games[0], 0), method='patch')
+        self.assertEqual(response.cookies[COOKIE_NAME].value, '')
+
+    def test_line_limit(self):
+        self.add(*[(game, 1) for game in self.games[:5]])
+        response = self.add((self.games[5], 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).data['line_count'], 5)
+
+    @override_settings(ANONYMOUS_CART_STORE='cache')
+    def test_cache_store(self):
+        self.add((self.games[0], 2))
+        key = self.client.cookies[COOKIE_NAME].value.split(':')[0]
+        self.assertEqual(cache.get(f'carts:anonymous:{key}'), {self.games[0].pk: 2})
+        self.assertEqual(self.client.get(self.url).data['quantity'], 2)
+
+        self.client.force_authenticate(self.user)
+        self.client.get(self.url)
+        self.assertIsNone(cache.get(f'carts:anonymous:{key}'))
+
+    def test_merge_on_login_reserves_the_lines(self):
+        cart = G(Cart, user=self.user)
+        G(CartItem, cart=cart, game=self.games[0], quantity=1)
+        self.add((self.games[0], 2), (self.games[1], 1), (self.games[3], 12))
+        Game.objects.filter(pk=self.games[1].pk).delete()
+        self.add((self.games[2], 3))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        # Lines short of stock are cut down to what is available
+        lines = {self.games[0].pk: 3, self.games[2].pk: 3, self.games[3].pk: 10}
+        self.assertEqual(dict(cart.cart_items.values_list('game', 'quantity')), lines)
+        self.assertEqual(dict(cart.reservations.values_list('game', 'quantity')), lines)
+        self.assertEqual((response.data['id'], response.data['quantity']), (cart.pk, 16))
+        self.assertEqual(response.cookies[COOKIE_NAME].value, '')
+
+        # Merged once only
+        self.assertEqual(self.client.get(self.url).data['quantity'], 16)
@@ -0,0 +1,9 @@
+from rest_framework import routers
+
+from .views import CartViewSet
+
+app_name = "carts"
+router = routers.SimpleRouter()
+router.register(r'cart', CartViewSet, basename='cart')
+
+urlpatterns = router.urls
@@ -1,3 +1,85 @@
-from django.shortcuts import render
+from dataclasses import asdict
 
-# Create your views here.
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from orders.checkout import checkout as checkout_cart
+from orders.models import Order
+from orders.serializers import OrderSerializer
+
+from .anonymous import get_anonymous_cart_store, merge_anonymous_cart
+from .models import Cart
+from .serializers import CartItemsSerializer, CartSerializer
+
+
+class CartViewSet(viewsets.ViewSet):
+    """
+    The current user's cart.
+
+    GET cart/ returns it with its lines and totals. POST cart/items/ adds
+    to the quantities of a batch of lines and PATCH cart/items/ sets them
+    (0 removes a line), both with bulk writes in one transaction that also
+    reserves the stock of the changed lines, and answered with the
+    recomputed cart; a batch with lines short of stock changes nothing.
+    POST cart/checkout/ turns the cart into an order.
+
+    Anonymous shoppers get a cart kept in a cookie or the cache
+    (carts.anonymous) instead, merged into their database cart by their
+    first cart request after logging in.
+
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.anonymous_store = get_anonymous_cart_store()
+        self.anonymous_cart = self.anonymous_store.load(request)
+
+    def get_cart(self):
+        if not self.request.user.is_authenticated:
+            return self.anonymous_cart
+        cart = Cart.objects.with_totals().current(self.request.user)
+        if self.anonymous_cart.quantities:
+            merge_anonymous_cart(self.anonymous_cart, cart)
+            cart = Cart.objects.with_totals().get(pk=cart.pk)
+        return cart
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        anonymous_cart = getattr(self, 'anonymous_cart', None)
+        if anonymous_cart is not None and anonymous_cart.changed:
+            self.anonymous_store.save(anonymous_cart, response)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def list(self, request):
+        return Response(CartSerializer(self.get_cart()).data)
+
+    @action(detail=False, methods=['post', 'patch'])
+    def items(self, request):
+        serializer = CartItemsSerializer(data=request.data, add=request.method == 'POST')
+        serializer.is_valid(raise_exception=True)
+        quantities = serializer.validated_data['items']
+        cart = self.get_cart()
+        short = cart.update_items(quantities, add=serializer.add)
+        if short:
+            # One entry per requested line, as for the other line errors
+            raise ValidationError({'items': [
+                {'quantity': [_('Only %d available.') % short[game_id]]} if game_id in short else {}
+                for game_id in quantities
+            ]})
+        if isinstance(cart, Cart):
+            # Re-read with the totals, which the annotations loaded before the changes don't reflect
+            cart = Cart.objects.with_totals().get(pk=cart.pk)
+        return Response(CartSerializer(cart).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def checkout(self, request):
+        result = checkout_cart(self.get_cart())
+        if not result.ok:
+            return Response(
+                {'failures': [asdict(failure) for failure in result.failures]}, status=status.HTTP_409_CONFLICT
+            )
+        order = Order.objects.with_items().get(pk=result.order.pk)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,41 @@
+"""
+SQLite backend tuned for serving the shop from a single database file.
+
+Every new connection applies the PRAGMAs in OPTIONS["pragmas"], e.g. WAL
+journaling (readers no longer block on a writer and vice versa),
+synchronous=NORMAL (safe with WAL, fsyncs on checkpoint only), a larger
+page cache, memory-mapped reads and a busy timeout, so that a connection
+waits for the write lock instead of failing with "database is locked".
+
+OPTIONS["transaction_mode"] sets how atomic blocks begin. With IMMEDIATE
+the write lock is taken at BEGIN. A deferred transaction that reads first
+and writes later can't wait for the lock once another connection has
+written in between, and fails with "database is locked" whatever the busy
+timeout is.
+
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        self.pragmas = conn_params.pop("pragmas", {})
+        self.transaction_mode = conn_params.pop("transaction_mode", "DEFERRED").upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}, not {self.transaction_mode!r}."
+            )
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -43,12 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "games.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "games.replicas.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -79,11 +81,97 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "config.db",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Persistent connections per worker thread. ASGI runs every request
+        # in a new thread, so set DB_CONN_MAX_AGE=0 when serving over ASGI.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "busy_timeout": 5000,  # ms
+                "cache_size": -32000,  # KiB, i.e. 32 MB per connection
+                "mmap_size": 256 * 1024 * 1024,
+                "temp_store": "MEMORY",
+            },
+        },
+    }
+}
+
+# Read replicas of the default database, as a comma separated list of
+# SQLite files kept up to date by external replication. Safe catalog reads
+# are routed to them by games.replicas.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, replica_name in enumerate(filter(None, os.getenv("DATABASE_REPLICA_NAMES", "").split(",")), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {**DATABASES["default"], "NAME": replica_name, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["games.replicas.ReplicaRouter"]
+
+# Seconds a client reads from the primary after writing, so it sees its own writes
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
+GAMES_CACHE_ALIAS = "default"
+CATEGORIES_CACHE_TIMEOUT = 60 * 60 * 24
+GAME_CACHE_TIMEOUT = 60 * 60
+
+# list and retrieve send ETags (and list a Last-Modified), so clients revalidate cheaply.
+# list and retrieve send ETag / Last-Modified, so clients revalidate cheaply.
+GAMES_CACHE_CONTROL = {
+    "list": "public, no-cache",
+    "retrieve": "public, no-cache",
+    "all_categories": "public, max-age=300",
+    "facets": "public, max-age=60",
+    "rating_summary": "public, max-age=60",
+}
+
+# Seconds a cart holds the stock of its items, see carts.reservations
+CART_RESERVATION_TTL = int(os.getenv("CART_RESERVATION_TTL", 15 * 60))
+
+# Anonymous carts, see carts.anonymous: "cookie" keeps the lines in a signed
+# cookie, "cache" in the cache under a key kept in a signed cookie
+ANONYMOUS_CART_STORE = os.getenv("ANONYMOUS_CART_STORE", "cookie")
+ANONYMOUS_CART_AGE = 60 * 60 * 24 * 14
+ANONYMOUS_CART_MAX_LINES = 50
+
+
+# Request metrics: Server-Timing headers, per-request log lines and
+# rolling per-endpoint percentiles at /api/stats/requests/
+
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "False") == "True"
+REQUEST_METRICS_WINDOW = 1000
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # The per-request lines are logged at INFO, only wanted while metrics are on
+        "games.instrumentation": {
+            "handlers": ["console"],
+            "level": "INFO" if REQUEST_METRICS_ENABLED else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -148,6 +236,16 @@ MEDIA_ROOT = BASE_DIR / "media"
 ALLOWED_IMAGE_FILE_EXTENSIONS = ['png', 'jpg', 'bmp']
 MAX_IMAGE_FILE_SIZE = 30 * 1024 * 1024
 
+# Resized copies of uploaded images: rendition name -> bounding box in px,
+# and output format -> encoder quality. They are built by a background
+# worker pool after the upload commits (synchronously if IMAGE_RENDITIONS_SYNC).
+IMAGE_RENDITION_SIZES = {"thumbnail": 160, "card": 480, "detail": 1200}
+IMAGE_RENDITION_FORMATS = {"webp": 80, "jpeg": 85}
+IMAGE_RENDITION_WORKERS = 2
+IMAGE_RENDITIONS_SYNC = False
+# Rendition (name, format) GameListSerializer returns as the card thumbnail
+GAME_LIST_THUMBNAIL = ("thumbnail", "webp")
+
 # Add security headers
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = "DENY"
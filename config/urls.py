@@ -8,6 +8,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView, TokenVerifyView
 
+from games.instrumentation import RequestStatsView
+
 class PingView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
@@ -17,7 +19,10 @@ class PingView(APIView):
 urlpatterns = [
     path("ping/", PingView.as_view(), name="ping"),
     path("admin/", admin.site.urls),
+    path("api/stats/requests/", RequestStatsView.as_view(), name="request-stats"),
     path("api/", include('games.urls', namespace="games")),
+    path("api/", include('carts.urls', namespace="carts")),
+    path("api/", include('orders.urls', namespace="orders")),
                   path("schema/", SpectacularAPIView.as_view(), name="schema"),  # JSON схема API
     path("swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),  # Swagger UI
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),  # Redoc UI
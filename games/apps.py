@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class GamesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "games"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(signals.ensure_search_index_after_migrate, sender=self)
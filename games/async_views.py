@@ -0,0 +1,222 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from django_filters import ModelChoiceFilter
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .cache import aget_cached_games, aget_taxonomy_version, all_categories_key, get_games_cache
+from .models import Game, Image
+from .pagination import KeysetPagination
+from .replicas import choose_replica, is_pinned, read_from, reset_reads
+from .serializers import ImageSerializer
+from .views import GameModelViewSet
+
+
+class AsyncGameView(View):
+    """
+    Base of the async-native variants of the read-only catalog endpoints.
+    Subclasses implement `respond(viewset, **kwargs)`, returning a Response.
+
+    Under ASGI every sync DRF view is run in a worker thread. These views
+    run on the event loop instead and read through the async ORM and cache
+    APIs. Querysets, filters, pagination, validators and serializers are
+    taken from a GameModelViewSet instance, so responses match the sync
+    endpoints, and so do the viewset's permission and throttle checks and
+    its replica routing (see check_request). Work without an async
+    counterpart is handed to a thread: authentication when those checks
+    need the user, throttling, rendering cache misses (prefetch +
+    serialize) and validating model choice filters. Responses are always
+    rendered as JSON.
+
+    Note that RequestMetricsMiddleware is sync-only, so while
+    REQUEST_METRICS_ENABLED is set Django runs these views in a thread too.
+
+    """
+    action = None
+    renderer_class = JSONRenderer
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.get_viewset(request, *args, **kwargs)
+        replica_token = None
+        try:
+            replica_token = await self.check_request(viewset)
+            response = await self.respond(viewset, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            # As in the sync views: 401 with WWW-Authenticate, or 403 without an authenticator header
+            response = viewset.handle_exception(exc)
+        finally:
+            if replica_token is not None:
+                reset_reads(replica_token)
+        return self.finalize_response(response)
+
+    def get_viewset(self, request, *args, **kwargs):
+        viewset = GameModelViewSet(
+            action_map={'get': self.action, 'head': self.action}, args=args, kwargs=kwargs, format_kwarg=None
+        )
+        viewset.request = viewset.initialize_request(request, *args, **kwargs)
+        # Part of the weak ETags, which then match the JSON ones of the sync endpoints
+        viewset.request.accepted_renderer = self.renderer_class()
+        return viewset
+
+    @staticmethod
+    async def check_request(viewset):
+        """
+        The checks of the viewset's initial(): permissions, throttles and
+        ReplicaReadMixin's routing of the reads to a replica. Returns the
+        replica routing token to reset once the response is built, if any.
+
+        The user is only authenticated (in a thread, as authenticators and
+        the session are sync-only) when a check needs it: the catalog's
+        read actions allow anyone, so without throttles or replicas none
+        does.
+
+        """
+        request = viewset.request
+        permissions = viewset.get_permissions()
+        throttles = viewset.get_throttles()
+        if throttles or settings.DATABASE_REPLICAS or not all(
+            isinstance(permission, AllowAny) for permission in permissions
+        ):
+            await sync_to_async(viewset.perform_authentication)(request)
+        viewset.check_permissions(request)
+        if throttles:
+            await sync_to_async(viewset.check_throttles)(request)
+        if (
+            settings.DATABASE_REPLICAS
+            and viewset.action in viewset.replica_actions
+            and not await sync_to_async(is_pinned)(request)
+        ):
+            return read_from(choose_replica())
+        return None
+
+    def finalize_response(self, response):
+        if isinstance(response, Response):
+            renderer = self.renderer_class()
+            rendered = HttpResponse(
+                renderer.render(response.data), status=response.status_code, content_type=renderer.media_type
+            )
+            for header, value in response.items():
+                if header != 'Content-Type':
+                    rendered[header] = value
+            response = rendered
+        cache_control = settings.GAMES_CACHE_CONTROL.get(self.action)
+        if cache_control and response.status_code in (200, 304):
+            response.setdefault('Cache-Control', cache_control)
+        return response
+
+    @staticmethod
+    async def filter_queryset(viewset, queryset):
+        """
+        Apply the viewset's filter backends. They only build the queryset,
+        except that model choice filters look their value up while the
+        filterset is validated, so then they run in a thread.
+
+        """
+        filters = viewset.filterset_class.base_filters
+        if any(isinstance(filters.get(name), ModelChoiceFilter) for name in viewset.request.query_params):
+            return await sync_to_async(viewset.filter_queryset)(queryset)
+        return viewset.filter_queryset(queryset)
+
+    @staticmethod
+    async def serialize_games(viewset, games, version):
+        """
+        Async counterpart of GameModelViewSet._serialize_games: hits are read
+        with one multi-get and only the misses are rendered in a thread.
+
+        """
+        variant = viewset.get_cache_variant()
+        data = await aget_cached_games(games, version, variant)
+        misses = [game for game in games if game.pk not in data]
+        if misses:
+            data.update(await sync_to_async(viewset._render_games)(misses, version, variant))
+        return viewset._add_live_fields(games, [data[game.pk] for game in games])
+
+
+class AsyncGameListView(AsyncGameView):
+    action = 'list'
+
+    async def respond(self, viewset):
+        request = viewset.request
+        queryset = await self.filter_queryset(viewset, viewset.get_queryset())
+        version = await aget_taxonomy_version()
+        paginator = viewset.paginator
+        if isinstance(paginator, KeysetPagination):
+            page = await paginator.apaginate_queryset(queryset, request, viewset)
+            last_modified, state = viewset._page_validator_state(page)
+        else:
+            page = None
+            aggregate = await queryset.order_by().aaggregate(**viewset._validator_aggregates(queryset))
+            last_modified, state = aggregate['last_modified'], aggregate['count']
+
+        etag = viewset._weak_etag(request.build_absolute_uri(), last_modified, state, version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=viewset._timestamp(last_modified))
+        if not_modified is not None:
+            return not_modified
+
+        if page is None:
+            paginator.known_count = state
+            page = await paginator.apaginate_queryset(queryset, request, viewset)
+        response = paginator.get_paginated_response(await self.serialize_games(viewset, page, version))
+        return viewset._set_validators(response, etag, last_modified)
+
+
+class AsyncGameDetailView(AsyncGameView):
+    action = 'retrieve'
+
+    async def respond(self, viewset, pk):
+        instance = await viewset.get_queryset().filter(pk=pk).afirst()
+        if instance is None:
+            raise Http404
+        version = await aget_taxonomy_version()
+        etag = viewset._detail_etag(instance, version)
+        # ETag only, as in GameModelViewSet.retrieve
+        not_modified = get_conditional_response(viewset.request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = Response((await self.serialize_games(viewset, [instance], version))[0])
+        return viewset._set_validators(response, etag, None)
+
+
+class AsyncGameImagesView(AsyncGameView):
+    action = 'images'
+
+    async def respond(self, viewset, pk):
+        # The game is only looked up when it has no images, to tell an empty list from a 404
+        images = [image async for image in Image.objects.filter(game_id=pk).prefetch_related('renditions')]
+        if not images and not await Game.objects.filter(pk=pk).aexists():
+            raise Http404
+        serializer = ImageSerializer(images, many=True, context={'request': viewset.request})
+        return Response(serializer.data)
+
+
+class AsyncCategoriesView(AsyncGameView):
+    action = 'all_categories'
+
+    async def respond(self, viewset):
+        version = await aget_taxonomy_version()
+        etag, last_modified = viewset._categories_validators(version)
+        not_modified = get_conditional_response(viewset.request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache = get_games_cache()
+        cache_key = all_categories_key(version)
+        categories = await cache.aget(cache_key)
+        if categories is None:
+            values = {}
+            for name, _display_name, serializer_class in viewset.category_serializers:
+                values[name] = [value async for value in serializer_class.Meta.model.objects.aiterator()]
+            categories = viewset._build_categories(values)
+            await cache.aset(cache_key, categories, settings.CATEGORIES_CACHE_TIMEOUT)
+
+        response = Response(categories)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,123 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.utils.translation import get_language
+
+TAXONOMY_VERSION_KEY = "games:taxonomy_version"
+
+
+def get_games_cache():
+    """
+    Return the cache backend configured for the games app via GAMES_CACHE_ALIAS.
+
+    """
+    return caches[settings.GAMES_CACHE_ALIAS]
+
+
+def get_taxonomy_version() -> float:
+    """
+    Return the current taxonomy version, a timestamp of the last write to
+    any taxonomy model. A cold cache starts a new version at the current time.
+
+    """
+    cache = get_games_cache()
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        cache.add(TAXONOMY_VERSION_KEY, time.time(), None)
+        version = cache.get(TAXONOMY_VERSION_KEY)
+    return version
+
+
+async def aget_taxonomy_version() -> float:
+    cache = get_games_cache()
+    version = await cache.aget(TAXONOMY_VERSION_KEY)
+    if version is None:
+        await cache.aadd(TAXONOMY_VERSION_KEY, time.time(), None)
+        version = await cache.aget(TAXONOMY_VERSION_KEY)
+    return version
+
+
+def bump_taxonomy_version() -> float:
+    """
+    Start a new taxonomy version, invalidating everything keyed on the old one.
+
+    """
+    cache = get_games_cache()
+    previous = cache.get(TAXONOMY_VERSION_KEY) or 0.0
+    version = max(time.time(), previous + 0.001)
+    cache.set(TAXONOMY_VERSION_KEY, version, None)
+    return version
+
+
+def all_categories_key(version: float) -> str:
+    return f"games:all_categories:{get_language()}:{version}"
+
+
+# Representation variants invalidated eagerly; the others expire or are
+# rejected on read when updated_at or the taxonomy version has moved on.
+EAGER_GAME_VARIANTS = ("detail", "list")
+
+
+def game_key(pk, variant: str = "detail") -> str:
+    return f"games:game:{variant}:{pk}"
+
+
+def game_list_variant(fields, expand) -> str:
+    """
+    Cache variant of a GameListSerializer field selection.
+
+    """
+    if not fields and not expand:
+        return "list"
+    selection = f"{','.join(fields)}|{','.join(expand)}"
+    return f"list-{hashlib.md5(selection.encode(), usedforsecurity=False).hexdigest()}"
+
+
+def get_cached_games(games, version: float, variant: str = "detail") -> dict:
+    """
+    Return pk -> cached representation for `games` with one multi-get.
+    An entry only counts as a hit if it was rendered from the same
+    updated_at and taxonomy version as the current game row.
+
+    """
+    keys = {game.pk: game_key(game.pk, variant) for game in games}
+    entries = get_games_cache().get_many(list(keys.values()))
+    return _valid_entries(games, keys, entries, version)
+
+
+async def aget_cached_games(games, version: float, variant: str = "detail") -> dict:
+    keys = {game.pk: game_key(game.pk, variant) for game in games}
+    entries = await _aget_many(get_games_cache(), list(keys.values()))
+    return _valid_entries(games, keys, entries, version)
+
+
+async def _aget_many(cache, keys: list) -> dict:
+    # BaseCache.aget_many awaits aget() key by key, which for backends without
+    # native async support is one thread hop per key; fetch the batch in one.
+    if type(cache).aget_many is BaseCache.aget_many:
+        return await sync_to_async(cache.get_many, thread_sensitive=True)(keys)
+    return await cache.aget_many(keys)
+
+
+def _valid_entries(games, keys: dict, entries: dict, version: float) -> dict:
+    cached = {}
+    for game in games:
+        entry = entries.get(keys[game.pk])
+        if entry is not None and entry[0] == game.updated_at and entry[1] == version:
+            cached[game.pk] = entry[2]
+    return cached
+
+
+def cache_games(games, data: dict, version: float, variant: str = "detail") -> None:
+    get_games_cache().set_many(
+        {game_key(game.pk, variant): (game.updated_at, version, data[game.pk]) for game in games},
+        settings.GAME_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_games(pks) -> None:
+    get_games_cache().delete_many([game_key(pk, variant) for pk in pks for variant in EAGER_GAME_VARIANTS])
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.db.models import Count, F, Value
+from django.db.models.functions import Floor
+from django_filters import FilterSet
+
+# Facet name -> GameFilter filters that belong to the facet itself and are
+# therefore left out when counting that facet (standard drill-down).
+FACET_FILTERS = {
+    'type': ('type',),
+    'genre': ('genre',),
+    'mechanic': ('mechanic',),
+    'player_count': ('player_count',),
+    'age_group': ('age_group',),
+    'difficulty': ('difficulty',),
+    'duration': ('duration',),
+}
+PRICE_FILTERS = ('min_price', 'max_price')
+
+
+def filter_queryset_excluding(filterset: FilterSet, queryset, excluded=()):
+    """
+    Apply the validated filters of `filterset` to `queryset`, skipping the
+    filters named in `excluded`. The filterset must already be valid.
+
+    """
+    for name, value in filterset.form.cleaned_data.items():
+        if name not in excluded:
+            queryset = filterset.filters[name].filter(queryset, value)
+    return queryset
+
+
+def facet_counts(queryset, field: str) -> list:
+    """
+    Count the distinct games per value of `field` in a single GROUP BY query.
+
+    """
+    rows = (
+        queryset.order_by()
+        .filter(**{f'{field}__isnull': False})
+        .values(field)
+        .annotate(count=Count('id', distinct=True))
+        .order_by(field)
+    )
+    return [{'id': row[field], 'count': row['count']} for row in rows]
+
+
+def price_histogram(queryset, bucket_size: Decimal) -> list:
+    """
+    Count the games per price bucket of `bucket_size` in a single GROUP BY query.
+
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(bucket=Floor(F('price') / Value(bucket_size)))
+        .values('bucket')
+        .annotate(count=Count('id', distinct=True))
+        .order_by('bucket')
+    )
+    histogram = []
+    for row in rows:
+        low = Decimal(int(row['bucket'])) * bucket_size
+        histogram.append({'min': low, 'max': low + bucket_size, 'count': row['count']})
+    return histogram
+
+
+def compute_facets(filterset: FilterSet, queryset, price_bucket_size: Decimal) -> dict:
+    """
+    Return per-value counts for every facet plus a price histogram for the
+    games matching `filterset`, each facet ignoring its own filter.
+
+    """
+    facets = {
+        name: facet_counts(filter_queryset_excluding(filterset, queryset, excluded), name)
+        for name, excluded in FACET_FILTERS.items()
+    }
+    facets['price'] = price_histogram(
+        filter_queryset_excluding(filterset, queryset, PRICE_FILTERS), price_bucket_size
+    )
+    return facets
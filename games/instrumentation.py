@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current_metrics: ContextVar = ContextVar("request_metrics", default=None)
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    view_started: float = None
+    queries: int = 0
+    db_time: float = 0.0
+    serializer_time: float = 0.0
+    serializer_depth: int = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class SerializerTimingMixin:
+    """
+    Add the time spent in to_representation to the current request metrics.
+    Only the outermost serializer is timed, so nested and list serializers
+    are not counted twice.
+
+    """
+
+    def to_representation(self, instance):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+
+
+def percentile(values: list, p: float) -> float:
+    """
+    Nearest-rank percentile of already sorted `values`.
+
+    """
+    if not values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class EndpointStats:
+    """
+    Rolling window of the last REQUEST_METRICS_WINDOW requests per endpoint,
+    kept in process memory. Each worker process keeps its own window.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def add(self, endpoint: str, total_ms: float, db_ms: float, queries: int) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+            samples.append((total_ms, db_ms, queries))
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def summary(self) -> list:
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = []
+        for endpoint, samples in sorted(snapshot.items()):
+            totals = sorted(sample[0] for sample in samples)
+            db_times = sorted(sample[1] for sample in samples)
+            summary.append({
+                "endpoint": endpoint,
+                "count": counts[endpoint],
+                "window": len(samples),
+                "p50_ms": round(percentile(totals, 50), 3),
+                "p95_ms": round(percentile(totals, 95), 3),
+                "p99_ms": round(percentile(totals, 99), 3),
+                "db_p95_ms": round(percentile(db_times, 95), 3),
+                "max_queries": max(sample[2] for sample in samples),
+            })
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, DB time, serializer time and view time per request.
+
+    The timings are returned in a Server-Timing header, logged as one
+    structured line per request and added to the rolling per-endpoint
+    stats served by RequestStatsView. Enabled by REQUEST_METRICS_ENABLED.
+
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        finished = time.perf_counter()
+        total_ms = (finished - metrics.started) * 1000
+        view_ms = (finished - metrics.view_started) * 1000 if metrics.view_started else 0.0
+        db_ms = metrics.db_time * 1000
+        serializer_ms = metrics.serializer_time * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.3f};desc="{metrics.queries} queries"',
+            f"serializer;dur={serializer_ms:.3f}",
+            f"view;dur={view_ms:.3f}",
+            f"total;dur={total_ms:.3f}",
+        ])
+
+        match = request.resolver_match
+        endpoint = f"{request.method} {match.view_name}" if match else None
+        if endpoint:
+            endpoint_stats.add(endpoint, total_ms, db_ms, metrics.queries)
+        logger.info(
+            "request method=%s path=%s endpoint=%s status=%s queries=%d db_ms=%.3f serializer_ms=%.3f "
+            "view_ms=%.3f total_ms=%.3f",
+            request.method, request.path, endpoint, response.status_code, metrics.queries, db_ms,
+            serializer_ms, view_ms, total_ms,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "endpoint": endpoint,
+                "status": response.status_code,
+                "queries": metrics.queries,
+                "db_ms": round(db_ms, 3),
+                "serializer_ms": round(serializer_ms, 3),
+                "view_ms": round(view_ms, 3),
+                "total_ms": round(total_ms, 3),
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+        return None
+
+
+class RequestStatsView(APIView):
+    """
+    Rolling per-endpoint latency percentiles recorded by RequestMetricsMiddleware.
+
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "enabled": settings.REQUEST_METRICS_ENABLED,
+            "endpoints": endpoint_stats.summary(),
+        })
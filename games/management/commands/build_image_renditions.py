@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from games.models import Image
+from games.renditions import build_renditions_for, run_in_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resized renditions of game images. By default only images with missing renditions "
+        "are processed, e.g. uploads made before renditions existed or lost to a worker restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild the renditions of every image")
+        parser.add_argument("--game", type=int, action="append", dest="game_ids", help="Only images of this game")
+        parser.add_argument(
+            "--workers", type=int, default=settings.IMAGE_RENDITION_WORKERS,
+            help="Images processed in parallel (Pillow releases the GIL while resizing and encoding)",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be positive")
+
+        images = Image.objects.order_by("pk")
+        if options["game_ids"]:
+            images = images.filter(game_id__in=options["game_ids"])
+        if not options["all"]:
+            expected = len(settings.IMAGE_RENDITION_SIZES) * len(settings.IMAGE_RENDITION_FORMATS)
+            images = images.annotate(rendition_count=Count("renditions")).filter(~Q(rendition_count=expected))
+        image_ids = list(images.values_list("pk", flat=True))
+
+        if options["workers"] == 1:
+            built = sum(map(build_renditions_for, image_ids))
+        else:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                built = sum(executor.map(run_in_worker, image_ids))
+
+        failed = len(image_ids) - built
+        self.stdout.write(self.style.SUCCESS(f"Built renditions for {built} images ({failed} failed)"))
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.importer import GameImporter, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        "Import games from a CSV or JSON Lines file in bulk. Columns: title, publisher, description, "
+        "rules_summary, release_year, price, discount_price, stock, player_count, age_group, difficulty, "
+        "duration, genres, types, mechanics (taxonomy values are names)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' for stdin")
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"], help="Input format (default: guessed from the file extension)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows written per transaction")
+        parser.add_argument(
+            "--upsert", action="store_true",
+            help="Update games that already exist with the same title and publisher instead of adding duplicates",
+        )
+        parser.add_argument(
+            "--list-separator", default="|", help="Separator of names in the CSV genres/types/mechanics columns"
+        )
+
+    def handle(self, *args, **options):
+        input_format = options["format"] or self._guess_format(options["path"])
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        stream = sys.stdin if options["path"] == "-" else self._open(options["path"])
+        try:
+            rows = read_csv(stream, options["list_separator"]) if input_format == "csv" else read_jsonl(stream)
+            importer = GameImporter(chunk_size=options["chunk_size"], upsert=options["upsert"])
+            started = time.perf_counter()
+            stats = importer.run(rows)
+            elapsed = time.perf_counter() - started
+        except ValueError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in stats.errors:
+            self.stderr.write(error)
+        throughput = stats.processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.processed} games ({stats.created} created, {stats.updated} updated, "
+            f"{len(stats.errors)} skipped) in {elapsed:.2f}s, {throughput:.0f} games/s"
+        ))
+
+    @staticmethod
+    def _guess_format(path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+        raise CommandError("Cannot guess the input format, pass --format csv or --format jsonl")
+
+    @staticmethod
+    def _open(path):
+        try:
+            return open(path, newline="", encoding="utf-8")
+        except OSError as error:
+            raise CommandError(f"Cannot open {path}: {error}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from games.search import ensure_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Create the games full-text search index if missing and rebuild it from the games table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS, help="Database to rebuild the index on"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        ensure_search_index(connection)
+        rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt games search index on '{options['database']}'"))
@@ -0,0 +1,48 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from games.models import Game, RatingBucket, Review, rating_bucket
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized rating_avg, review_count and rating histograms of games from their reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "game_ids", nargs="*", type=int, help="Only recompute these games (default: all games)"
+        )
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(game=OuterRef("pk")).order_by().values("game")
+        games = Game.objects.all()
+        all_reviews = Review.objects.all()
+        buckets = RatingBucket.objects.all()
+        if options["game_ids"]:
+            games = games.filter(pk__in=options["game_ids"])
+            all_reviews = all_reviews.filter(game__in=options["game_ids"])
+            buckets = buckets.filter(game__in=options["game_ids"])
+
+        with transaction.atomic():
+            updated = games.update(
+                rating_avg=Coalesce(
+                    Subquery(reviews.annotate(avg=Avg("rating")).values("avg"), output_field=FloatField()),
+                    Value(0.0),
+                ),
+                review_count=Coalesce(
+                    Subquery(reviews.annotate(count=Count("pk")).values("count"), output_field=IntegerField()),
+                    Value(0),
+                ),
+            )
+            counts = Counter(
+                (game_id, rating_bucket(rating)) for game_id, rating in all_reviews.values_list("game", "rating").iterator()
+            )
+            buckets.delete()
+            RatingBucket.objects.bulk_create(
+                [RatingBucket(game_id=game_id, bucket=bucket, count=count) for (game_id, bucket), count in counts.items()],
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings for {updated} games"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:51
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Game = apps.get_model("games", "Game")
+    Review = apps.get_model("games", "Review")
+    reviews = Review.objects.filter(game=OuterRef("pk")).order_by().values("game")
+    Game.objects.update(
+        rating_avg=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg"), output_field=FloatField()),
+            Value(0.0),
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("pk")).values("count"), output_field=IntegerField()),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="rating_avg",
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
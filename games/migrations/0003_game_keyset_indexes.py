@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0002_game_rating_aggregate"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="game",
+            name="rating_avg",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="game_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["discount_price", "id"], name="game_discount_price_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(fields=["rating_avg", "id"], name="game_rating_id_idx"),
+        ),
+    ]
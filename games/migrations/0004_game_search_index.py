@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from games.search import drop_search_index, ensure_search_index
+
+
+def create_search_index(apps, schema_editor):
+    ensure_search_index(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0003_game_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0004_game_search_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="game",
+            name="game_created_id_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="game",
+            name="game_discount_price_id_idx",
+        ),
+        migrations.AlterField(
+            model_name="game",
+            name="age_group",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="games",
+                to="games.agegroup",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="game",
+            name="difficulty",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="games",
+                to="games.difficultylevel",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="game",
+            name="duration",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="games",
+                to="games.duration",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="game",
+            name="player_count",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="games",
+                to="games.playercount",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["-created_at", "-id", "price"], name="game_created_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["discount_price", "id", "price"], name="game_discount_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["player_count", "-created_at", "price"],
+                name="game_player_count_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["age_group", "-created_at", "price"],
+                name="game_age_group_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["difficulty", "-created_at", "price"],
+                name="game_difficulty_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["duration", "-created_at", "price"],
+                name="game_duration_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0005_game_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=20)),
+                ("format", models.CharField(max_length=10)),
+                ("file", models.ImageField(max_length=255, upload_to="")),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                (
+                    "image",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="games.image",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="imagerendition",
+            constraint=models.UniqueConstraint(
+                fields=("image", "name", "format"), name="unique_image_rendition"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0006_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="reserved_stock",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:48
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def drop_duplicate_reviews(apps, schema_editor):
+    """
+    Keep the latest review of every user for a game, and recompute the
+    rating aggregates of the games that lost reviews.
+
+    """
+    Game = apps.get_model("games", "Game")
+    Review = apps.get_model("games", "Review")
+    duplicates = list(
+        Review.objects.order_by()
+        .values("game", "user")
+        .annotate(latest=Max("id"), reviews=Count("id"))
+        .filter(reviews__gt=1)
+    )
+    for duplicate in duplicates:
+        Review.objects.filter(game=duplicate["game"], user=duplicate["user"]).exclude(
+            pk=duplicate["latest"]
+        ).delete()
+    if not duplicates:
+        return
+    reviews = Review.objects.filter(game=OuterRef("pk")).order_by().values("game")
+    Game.objects.filter(pk__in={duplicate["game"] for duplicate in duplicates}).update(
+        rating_avg=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg"), output_field=FloatField()),
+            Value(0.0),
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("pk")).values("count"), output_field=IntegerField()),
+            Value(0),
+        ),
+    )
+
+
+# Copied from games.models, as models can't be imported by migrations
+RATING_BUCKETS = tuple((Decimal(step) / 2).quantize(Decimal("0.1")) for step in range(11))
+
+
+def rating_bucket(rating) -> Decimal:
+    return RATING_BUCKETS[min(max(int(Decimal(str(rating)) * 2), 0), len(RATING_BUCKETS) - 1)]
+
+
+def backfill_rating_buckets(apps, schema_editor):
+    Review = apps.get_model("games", "Review")
+    RatingBucket = apps.get_model("games", "RatingBucket")
+    counts = Counter(
+        (game_id, rating_bucket(rating))
+        for game_id, rating in Review.objects.values_list("game", "rating").iterator()
+    )
+    RatingBucket.objects.bulk_create(
+        [RatingBucket(game_id=game_id, bucket=bucket, count=count) for (game_id, bucket), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0007_game_reserved_stock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RatingBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DecimalField(decimal_places=1, max_digits=2)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="ratingbucket",
+            name="game",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rating_buckets",
+                to="games.game",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ratingbucket",
+            constraint=models.UniqueConstraint(
+                fields=("game", "bucket"), name="rating_bucket_game_unique"
+            ),
+        ),
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.RunPython(backfill_rating_buckets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["game", "-created_at", "-id"], name="review_game_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("game", "user"), name="review_game_user_unique"
+            ),
+        ),
+    ]
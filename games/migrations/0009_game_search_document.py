@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("games", "0008_review_constraints_rating_buckets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GameSearchDocument",
+            fields=[
+                (
+                    "game",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="games.game",
+                    ),
+                ),
+                ("document", models.TextField(db_column="games_game_fts")),
+            ],
+            options={
+                "db_table": "games_game_fts",
+                "managed": False,
+            },
+        ),
+    ]
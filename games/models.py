@@ -13,6 +13,7 @@ from django.core.validators import (
     FileExtensionValidator,
 )
 from django.db import models
+from django.utils import timezone
 from django.utils.deconstruct import deconstructible
 
 
@@ -27,7 +28,9 @@ class FileSizeValidator:
         self.max_size = max_size
 
     def __call__(self, value: UploadedFile) -> None:
-        filesize = value.size
+        self.validate_size(value.size)
+
+    def validate_size(self, filesize: int) -> None:
         if filesize > self.max_size:
             raise ValidationError(
                 _(f"The maximum file size must be less than {self.max_size / (1024 * 1024)} MB")
@@ -53,6 +56,45 @@ class Review(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "user"], name="review_game_user_unique"),
+        ]
+        indexes = [
+            # A game's reviews newest first, keyset paginated
+            models.Index(fields=["game", "-created_at", "-id"], name="review_game_created_idx"),
+        ]
+
+
+# Lower bounds of the rating histogram buckets: 0.0, 0.5, ..., 5.0
+RATING_BUCKETS = tuple((Decimal(step) / 2).quantize(Decimal("0.1")) for step in range(11))
+
+
+def rating_bucket(rating) -> Decimal:
+    """
+    The histogram bucket of a rating: its lower bound in steps of 0.5,
+    clamped to the valid range (ratings are only validated by full_clean()).
+
+    """
+    return RATING_BUCKETS[min(max(int(Decimal(str(rating)) * 2), 0), len(RATING_BUCKETS) - 1)]
+
+
+class RatingBucket(models.Model):
+    """
+    Number of reviews of a game with a rating in [bucket, bucket + 0.5).
+    Maintained incrementally by the Review signals; buckets without
+    reviews may have no row.
+
+    """
+    game = models.ForeignKey("Game", on_delete=models.CASCADE, related_name="rating_buckets")
+    bucket = models.DecimalField(max_digits=2, decimal_places=1)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["game", "bucket"], name="rating_bucket_game_unique"),
+        ]
+
 
 class Publisher(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -67,6 +109,11 @@ class Game(models.Model):
     discount_price = models.DecimalField(
         decimal_places=2, max_digits=10, blank=True)
     stock = models.IntegerField(default=0)
+    # Units held by active cart reservations (carts.StockReservation),
+    # maintained incrementally by carts.reservations
+    reserved_stock = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0.0)
+    review_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     publisher = models.ForeignKey(
@@ -74,22 +121,38 @@ class Game(models.Model):
     )
     type = models.ManyToManyField("Type", related_name="games")
     player_count = models.ForeignKey(
-        "PlayerCount", on_delete=models.PROTECT, related_name="games"
+        "PlayerCount", on_delete=models.PROTECT, related_name="games", db_index=False
     )
     age_group = models.ForeignKey(
-        "AgeGroup", on_delete=models.PROTECT, related_name="games"
+        "AgeGroup", on_delete=models.PROTECT, related_name="games", db_index=False
     )
     difficulty = models.ForeignKey(
-        "DifficultyLevel", on_delete=models.PROTECT, related_name="games"
+        "DifficultyLevel", on_delete=models.PROTECT, related_name="games", db_index=False
     )
     genre = models.ManyToManyField("Genre", related_name="games")
     mechanic = models.ManyToManyField(
         "Mechanic", related_name="games"
     )
     duration = models.ForeignKey(
-        "Duration", on_delete=models.PROTECT, related_name="games"
+        "Duration", on_delete=models.PROTECT, related_name="games", db_index=False
     )
 
+    class Meta:
+        indexes = [
+            # Default ordering and keyset pagination over it; the trailing price
+            # lets min_price / max_price be checked without visiting the table.
+            models.Index(fields=["-created_at", "-id", "price"], name="game_created_price_idx"),
+            # Keyset pagination over the other supported orderings
+            models.Index(fields=["discount_price", "id", "price"], name="game_discount_price_idx"),
+            models.Index(fields=["rating_avg", "id"], name="game_rating_id_idx"),
+            # GameFilter FK filters combined with the default ordering and the price
+            # range. They lead with the FK column, so the FKs need no index of their own.
+            models.Index(fields=["player_count", "-created_at", "price"], name="game_player_count_created_idx"),
+            models.Index(fields=["age_group", "-created_at", "price"], name="game_age_group_created_idx"),
+            models.Index(fields=["difficulty", "-created_at", "price"], name="game_difficulty_created_idx"),
+            models.Index(fields=["duration", "-created_at", "price"], name="game_duration_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -98,10 +161,62 @@ class Game(models.Model):
             self.discount_price = self.price
         super().save(*args, **kwargs)
 
+    @property
+    def available_stock(self) -> int:
+        return max(self.stock - self.reserved_stock, 0)
+
     @property
     def get_average_rating(self) -> float:
-        all_ratings = [review.rating for review in self.reviews.all()]
-        return sum(all_ratings) / len(all_ratings) if all_ratings else 0.0
+        return self.rating_avg
+
+
+def touch_games(**lookup):
+    """
+    Bump updated_at of the games matching `lookup`, for changes that alter
+    their representation without saving the game row itself. updated_at
+    drives the validators of the game endpoints.
+
+    """
+    now = timezone.now()
+    Game.objects.filter(**lookup).update(updated_at=now)
+    return now
+
+
+class FullTextMatch(models.Lookup):
+    """
+    `document__match=query`: FTS5's `MATCH` on the hidden column of the table.
+
+    """
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+class GameSearchDocument(models.Model):
+    """
+    A game's row in the SQLite FTS5 index (games.search.FTS_TABLE), so
+    that searches join it like any relation. Unmanaged: the table and the
+    triggers keeping it in sync are created by games.search.
+
+    """
+
+    game = models.OneToOneField(
+        Game, primary_key=True, db_column="rowid", db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name="search_document",
+    )
+    # FTS5's hidden column named after the table: the operand of MATCH and of bm25()
+    document = models.TextField(db_column="games_game_fts")
+
+    class Meta:
+        managed = False
+        db_table = "games_game_fts"
+
+
+GameSearchDocument._meta.get_field("document").register_lookup(FullTextMatch)
 
 
 class Image(models.Model):
@@ -118,6 +233,29 @@ class Image(models.Model):
         return str(self.path)
 
 
+class ImageRendition(models.Model):
+    """
+    A resized copy of an Image in one of the IMAGE_RENDITION_SIZES and
+    IMAGE_RENDITION_FORMATS, built off the request path by games.renditions.
+
+    """
+
+    image = models.ForeignKey(Image, related_name="renditions", on_delete=models.CASCADE)
+    name = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    file = models.ImageField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["image", "name", "format"], name="unique_image_rendition"),
+        ]
+
+    def __str__(self):
+        return str(self.file)
+
+
 class Type(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
@@ -0,0 +1,216 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that takes the row count from `known_count`
+    when the view has already computed it, instead of issuing a COUNT(*).
+
+    """
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = DjangoPaginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views: the count is awaited when it is
+        not known yet and the page rows are fetched with aiterator().
+
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        if self.known_count is None:
+            paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        self.page.object_list = [obj async for obj in self.page.object_list.aiterator()]
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the ordering chosen by the view's
+    OrderingFilter, with `id` appended as a tie-breaker.
+
+    The cursor stores the ordering values of the row at the page boundary,
+    so every page is fetched with a `WHERE (ordering) > (boundary)` range
+    predicate and a LIMIT, and costs the same no matter how deep it is.
+    No COUNT(*) is issued.
+
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    default_ordering = ('-created_at',)
+    tie_breaker = 'id'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.get_page_queryset(queryset, request, view)
+        return self.set_page([obj async for obj in queryset.aiterator()], cursor)
+
+    def get_page_queryset(self, queryset, request, view):
+        """
+        Return the queryset of the requested page, with one row more than
+        the page size to tell whether there is another page, and the cursor.
+
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor['r'] if cursor else False
+        order_by = [self._flip(term) for term in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*order_by)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(order_by, cursor['v']))
+            except (DjangoValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.page_size + 1], cursor
+
+    def set_page(self, results, cursor):
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+        self.has_next = self.has_more if not self.reverse else True
+        self.has_previous = self.has_more if self.reverse else cursor is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Resolve the ordering from the view's OrderingFilter and make it
+        total by appending the tie-breaker in the direction of the first term.
+
+        """
+        ordering = None
+        for filter_cls in getattr(view, 'filter_backends', []):
+            if issubclass(filter_cls, OrderingFilter):
+                ordering = filter_cls().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or self.default_ordering)
+        ordering = [term for term in ordering if term.lstrip('-') not in (self.tie_breaker, 'pk')]
+        descending = ordering[0].startswith('-') if ordering else False
+        ordering.append(f"-{self.tie_breaker}" if descending else self.tie_breaker)
+        return ordering
+
+    def get_keyset_filter(self, ordering, values):
+        """
+        Build `(a, b, id) > (x, y, z)` as
+        `a >= x AND (a > x OR (a = x AND (b > y OR (b = y AND id > z))))`,
+        honouring the direction of every term. The leading bound lets the
+        database turn the predicate into an index range scan.
+
+        """
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keyset = Q()
+        for term, value in reversed(list(zip(ordering, values))):
+            field = term.lstrip('-')
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            strict = Q(**{f"{field}__{lookup}": value})
+            keyset = strict if not keyset else strict | (Q(**{field: value}) & keyset)
+
+        first_field = ordering[0].lstrip('-')
+        bound = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f"{first_field}__{bound}": values[0]}) & keyset
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        values = [self._position_value(instance, term.lstrip('-')) for term in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(cursor.get('v'), list) or not isinstance(cursor.get('r'), bool):
+                raise ValueError
+        except (ValueError, UnicodeError, BinasciiError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': str(_('The pagination cursor value.')),
+            'schema': {'type': 'string'},
+        }]
+
+    @staticmethod
+    def _flip(term):
+        return term[1:] if term.startswith('-') else f"-{term}"
+
+    @staticmethod
+    def _position_value(instance, field):
+        value = getattr(instance, field)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str)) or value is None:
+            return value
+        return str(value)
@@ -0,0 +1,144 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image as PILImage, ImageOps
+
+from .cache import invalidate_games
+from .models import Image, ImageRendition, touch_games
+
+logger = logging.getLogger(__name__)
+
+# Pillow format names for the IMAGE_RENDITION_FORMATS keys
+PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_path(image: Image, name: str, image_format: str) -> str:
+    stem = os.path.splitext(image.path.name)[0]
+    return f"{stem}_{name}.{EXTENSIONS[image_format]}"
+
+
+def _prepare(original: PILImage.Image, image_format: str) -> PILImage.Image:
+    """
+    Convert to a mode the target encoder accepts. JPEG has no alpha
+    channel, so transparent images are flattened onto white.
+
+    """
+    has_alpha = original.mode in ("RGBA", "LA") or "transparency" in original.info
+    if image_format == "jpeg":
+        if has_alpha:
+            rgba = original.convert("RGBA")
+            flattened = PILImage.new("RGB", rgba.size, "white")
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+            return flattened
+        return original if original.mode == "RGB" else original.convert("RGB")
+    if has_alpha:
+        return original if original.mode == "RGBA" else original.convert("RGBA")
+    return original if original.mode == "RGB" else original.convert("RGB")
+
+
+def build_renditions(image: Image) -> list:
+    """
+    Build every configured rendition of `image` and replace its existing
+    rendition rows with a single bulk insert.
+
+    The original is decoded once (with JPEG draft mode, which lets libjpeg
+    decode straight to a reduced scale) and each size is resized from the
+    next larger one, largest first. Images smaller than a bounding box are
+    not upscaled. The game is touched, as its thumbnail changes.
+
+    """
+    sizes = sorted(settings.IMAGE_RENDITION_SIZES.items(), key=lambda item: item[1], reverse=True)
+    largest = sizes[0][1]
+
+    with image.path.open("rb") as original_file:
+        with PILImage.open(original_file) as opened:
+            opened.draft("RGB", (largest, largest))
+            source = ImageOps.exif_transpose(opened)
+            source.load()
+
+    storage = ImageRendition._meta.get_field("file").storage
+    renditions = []
+    for name, size in sizes:
+        source.thumbnail((size, size), PILImage.LANCZOS)
+        for image_format, quality in settings.IMAGE_RENDITION_FORMATS.items():
+            buffer = io.BytesIO()
+            _prepare(source, image_format).save(
+                buffer, format=PIL_FORMATS[image_format], quality=quality, optimize=True
+            )
+            path = rendition_path(image, name, image_format)
+            if storage.exists(path):
+                storage.delete(path)
+            renditions.append(ImageRendition(
+                image=image,
+                name=name,
+                format=image_format,
+                file=storage.save(path, ContentFile(buffer.getvalue())),
+                width=source.width,
+                height=source.height,
+            ))
+
+    with transaction.atomic():
+        ImageRendition.objects.filter(image=image).delete()
+        ImageRendition.objects.bulk_create(renditions)
+        # The game's thumbnail comes from the renditions
+        touch_games(pk=image.game_id)
+    invalidate_games([image.game_id])
+    return renditions
+
+
+def build_renditions_for(image_id: int) -> bool:
+    """
+    Build the renditions of the image with `image_id`, logging instead of
+    raising on unreadable originals. Returns whether renditions were built.
+
+    """
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None:
+        return False
+    try:
+        build_renditions(image)
+    except Exception:
+        logger.exception("Cannot build renditions for image %s", image_id)
+        return False
+    return True
+
+
+def run_in_worker(image_id: int) -> bool:
+    close_old_connections()
+    try:
+        return build_renditions_for(image_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_RENDITION_WORKERS, thread_name_prefix="image-renditions"
+            )
+    return _executor
+
+
+def schedule_renditions(image_id: int) -> None:
+    """
+    Build the renditions of an image once the current transaction commits:
+    in the background worker pool, or inline when IMAGE_RENDITIONS_SYNC is set.
+    Renditions lost to a worker restart can be rebuilt with build_image_renditions.
+
+    """
+    if settings.IMAGE_RENDITIONS_SYNC:
+        transaction.on_commit(lambda: build_renditions_for(image_id))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run_in_worker, image_id))
@@ -0,0 +1,182 @@
+"""
+Read replica routing for the catalog.
+
+Safe catalog reads (GameModelViewSet's read actions, all_categories
+included) are sent to one of the DATABASE_REPLICAS aliases; everything
+else, and every write, goes to the primary `default` database.
+
+Replicas lag behind the primary, so a client that has just written is
+pinned to the primary for REPLICA_STICKY_SECONDS (read-your-writes):
+ReplicaRoutingMiddleware notices the writes made while serving a request
+(through the router's db_for_write) and pins the user, or an anonymous
+client through a cookie. Pinned clients read from the primary as well.
+
+"""
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import get_games_cache
+
+PIN_COOKIE = "primary_pin"
+
+# The alias reads of the current request are routed to, None for the primary
+_read_alias: ContextVar = ContextVar("replica_read_alias", default=None)
+_routing_state: ContextVar = ContextVar("replica_routing_state", default=None)
+
+
+@dataclass
+class RoutingState:
+    wrote: bool = False
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+def read_from(alias):
+    """
+    Route the reads of the current context to `alias` (None for the primary).
+    Returns a token for reset_reads().
+
+    """
+    return _read_alias.set(alias)
+
+
+def reset_reads(token) -> None:
+    _read_alias.reset(token)
+
+
+def pin_key(user_id) -> str:
+    return f"games:primary_pin:{user_id}"
+
+
+def is_pinned(request) -> bool:
+    """
+    Whether `request` comes from a client that wrote within the last
+    REPLICA_STICKY_SECONDS, either as the same user or with the pin cookie.
+
+    """
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return bool(get_games_cache().get(pin_key(user.pk)))
+    return False
+
+
+def pin_to_primary(request, response) -> None:
+    window = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(PIN_COOKIE, f"{time.time() + window:.3f}", max_age=window, httponly=True, samesite="Lax")
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        get_games_cache().set(pin_key(user.pk), True, window)
+
+
+class ReplicaRouter:
+    """
+    Send reads to the alias chosen for the current request and all writes
+    to the primary. Migrations only run on the primary; the replicas get
+    their schema through replication.
+
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+        # Explicitly, so instances read from a replica are saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin clients to the primary for REPLICA_STICKY_SECONDS after a request
+    that wrote to the database. Has to come after AuthenticationMiddleware.
+
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.process_writes(request, response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self.process_writes(request, response, state)
+
+    @staticmethod
+    def process_writes(request, response, state: RoutingState):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            pin_to_primary(request, response)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Serve the safe requests of `replica_actions` from a replica, unless
+    the client is pinned to the primary. Authentication runs first, so
+    JWT users are recognised too.
+
+    """
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not is_pinned(request)
+        ):
+            self._replica_token = read_from(choose_replica())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            reset_reads(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
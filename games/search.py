@@ -0,0 +1,158 @@
+import re
+
+from django.db import connection as default_connection, connections
+from django.db.models import BooleanField, F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import GameSearchDocument
+
+FTS_TABLE = "games_game_fts"
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_RANK = "search_rank"
+
+# Column weights for ranking: a title hit counts ten times a description hit
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON games_game BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON games_game BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON games_game BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+
+def ensure_search_index(connection=default_connection) -> None:
+    """
+    Create the full-text index for games if it is missing.
+
+    On SQLite this is an external-content FTS5 table kept in sync with
+    games_game by triggers. SQLite drops triggers whenever Django remakes
+    games_game during a migration, so this runs after every migrate and
+    rebuilds the index when the triggers had to be recreated.
+    On PostgreSQL it is a generated, GIN-indexed tsvector column.
+
+    """
+    if "games_game" not in connection.introspection.table_names():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, description, content='games_game', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'games_game'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = set(SQLITE_TRIGGERS) - existing
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            if missing:
+                rebuild_search_index(connection)
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"ALTER TABLE games_game ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('simple', coalesce(description, '')), 'D')"
+                f") STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS games_game_search_vector_idx "
+                f"ON games_game USING GIN ({SEARCH_VECTOR_COLUMN})"
+            )
+
+
+def drop_search_index(connection=default_connection) -> None:
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"ALTER TABLE games_game DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}")
+
+
+def rebuild_search_index(connection=default_connection) -> None:
+    """
+    Rebuild the full-text index from the current contents of games_game.
+    PostgreSQL keeps its generated column current, so there is nothing to do.
+
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_terms(query: str) -> list:
+    return re.findall(r"\w+", query)
+
+
+class GameSearchFilter(SearchFilter):
+    """
+    Full-text search over title and description with prefix matching.
+
+    Matching games are annotated with `search_rank` (lower is more relevant:
+    bm25 on SQLite, negated ts_rank_cd on PostgreSQL), which the ordering
+    filter uses when no explicit ordering is requested; on SQLite, querysets
+    with aggregate annotations are filtered without it. Other database
+    backends fall back to DRF's LIKE-based SearchFilter.
+
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(" ".join(self.get_search_terms(request)))
+        if not terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor == "sqlite":
+            match = " AND ".join(f'"{term}"*' for term in terms)
+            if queryset.query.group_by is not None:
+                # FTS5 can't evaluate bm25() in a grouped query, so aggregated
+                # querysets are only filtered, through a single full-text subquery
+                return queryset.filter(
+                    pk__in=GameSearchDocument.objects.filter(document__match=match).values("game")
+                )
+            # Join the FTS table (GameSearchDocument) instead of filtering on a
+            # subquery, so bm25() is computed once per match within a single
+            # full-text query.
+            rank = Func(
+                F("search_document__document"), Value(TITLE_WEIGHT), Value(DESCRIPTION_WEIGHT),
+                function="bm25", output_field=FloatField(),
+            )
+            return queryset.filter(search_document__document__match=match).annotate(**{SEARCH_RANK: rank})
+
+        if vendor == "postgresql":
+            tsquery = " & ".join(f"{term}:*" for term in terms)
+            matches = RawSQL(
+                f"games_game.{SEARCH_VECTOR_COLUMN} @@ to_tsquery('simple', %s)",
+                (tsquery,),
+                output_field=BooleanField(),
+            )
+            rank = RawSQL(
+                f"-ts_rank_cd(games_game.{SEARCH_VECTOR_COLUMN}, to_tsquery('simple', %s))",
+                (tsquery,),
+                output_field=FloatField(),
+            )
+            return queryset.filter(matches).annotate(**{SEARCH_RANK: rank})
+
+        return super().filter_queryset(request, queryset, view)
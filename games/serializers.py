@@ -1,24 +1,42 @@
+import copy
 from datetime import datetime
 
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
 from django.core.files import images
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 
-from .models import Game, Image, Genre, DifficultyLevel, Type, Mechanic, Duration, AgeGroup, PlayerCount, Publisher
+from .instrumentation import SerializerTimingMixin
+from .models import Game, Image, ImageRendition, Review, Genre, DifficultyLevel, Type, Mechanic, Duration, AgeGroup, PlayerCount, Publisher
 from rest_framework import serializers
 
 
-class ImageSerializer(serializers.ModelSerializer):
+class ImageRenditionSerializer(serializers.ModelSerializer):
+    url = serializers.ImageField(source='file', read_only=True)
+
+    class Meta:
+        model = ImageRendition
+        fields = ['name', 'format', 'url', 'width', 'height']
+
+
+class ImageSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     # absolute_url = serializers.SerializerMethodField()
+    # Renditions ordered by width, empty until the background worker has built them
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Image
-        fields = ['path']
+        fields = ['path', 'srcset']
+
+    def get_srcset(self, obj):
+        renditions = sorted(obj.renditions.all(), key=lambda rendition: (rendition.width, rendition.format))
+        return ImageRenditionSerializer(renditions, many=True, context=self.context).data
 
     def get_absolute_url(self, obj):
         request = self.context.get('request')
-        print(request)
         if request is not None:
-            print("Request is not none")
             return request.build_absolute_uri(obj.path.url)
         return obj.path.url
 
@@ -69,7 +87,104 @@ class DurationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class GameSerializer(serializers.ModelSerializer):
+class GameListSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    """
+    Compact game representation for catalog cards.
+
+    `fields` limits the output to the given names out of `default_fields`
+    and `optional_fields` (`id` is always included), and `expand` adds the
+    nested relations of `expandable_fields`. setup_queryset() loads only the
+    columns and relations such a selection needs.
+
+    """
+    default_fields = ('id', 'title', 'price', 'discount_price', 'rating_avg', 'review_count', 'thumbnail')
+    optional_fields = ('release_year', 'stock', 'created_at', 'updated_at', 'description', 'rules_summary')
+    expandable_fields = {
+        'publisher': PublisherSerializer(read_only=True),
+        'difficulty': DifficultyLevelSerializer(read_only=True),
+        'player_count': PlayerCountSerializer(read_only=True),
+        'age_group': AgeGroupSerializer(read_only=True),
+        'duration': DurationSerializer(read_only=True),
+        'genre': GenreSerializer(many=True, read_only=True),
+        'type': TypeSerializer(many=True, read_only=True),
+        'mechanic': MechanicSerializer(many=True, read_only=True),
+    }
+    # Columns the view itself reads from every row: ETag and cache validation,
+    # and the ordering values keyset pagination puts into its cursors.
+    required_columns = ('id', 'updated_at', 'created_at', 'discount_price', 'rating_avg')
+
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Game
+        fields = ['id', 'title', 'price', 'discount_price', 'rating_avg', 'review_count', 'thumbnail',
+                  'release_year', 'stock', 'created_at', 'updated_at', 'description', 'rules_summary']
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = copy.deepcopy(self.expandable_fields[name])
+        keep = {'id', *(fields or self.default_fields), *expand}
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_selection(cls, fields_param=None, expand_param=None):
+        """
+        Validate comma separated `fields` / `expand` query values and return
+        them as a (fields, expand) pair of sorted tuples.
+
+        """
+        fields = tuple(sorted({name for name in (fields_param or '').split(',') if name}))
+        expand = tuple(sorted({name for name in (expand_param or '').split(',') if name}))
+        errors = {}
+        unknown = set(fields) - set(cls.default_fields) - set(cls.optional_fields)
+        if unknown:
+            errors['fields'] = _('Unknown fields: %s') % ', '.join(sorted(unknown))
+        unknown = set(expand) - set(cls.expandable_fields)
+        if unknown:
+            errors['expand'] = _('Unknown relations: %s') % ', '.join(sorted(unknown))
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    @classmethod
+    def setup_queryset(cls, queryset, fields=(), expand=()):
+        """
+        Restrict `queryset` to the columns the selection renders with
+        `.only()`, join the expanded FKs and annotate the thumbnail path
+        with a subquery, so no unused column or relation is fetched.
+
+        """
+        fields = fields or cls.default_fields
+        model_fields = {field.name: field for field in Game._meta.get_fields()}
+        foreign_keys = [name for name in expand if not model_fields[name].many_to_many]
+        columns = {*cls.required_columns, *(name for name in fields if name in model_fields), *foreign_keys}
+        queryset = queryset.only(*columns)
+        if foreign_keys:
+            queryset = queryset.select_related(*foreign_keys)
+        if 'thumbnail' in fields:
+            rendition_name, rendition_format = settings.GAME_LIST_THUMBNAIL
+            thumbnails = ImageRendition.objects.filter(
+                image__game=OuterRef('pk'), name=rendition_name, format=rendition_format
+            ).order_by('image_id')
+            queryset = queryset.annotate(thumbnail_file=Subquery(thumbnails.values('file')[:1]))
+        return queryset
+
+    @classmethod
+    def prefetch_relations(cls, expand=()):
+        return [name for name in expand if isinstance(cls.expandable_fields[name], serializers.ListSerializer)]
+
+    def get_thumbnail(self, obj):
+        name = getattr(obj, 'thumbnail_file', None)
+        if not name:
+            return None
+        # Kept relative to the host, so cached list entries can be shared between hosts
+        return ImageRendition._meta.get_field('file').storage.url(name)
+
+
+class GameSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     genre = GenreSerializer(many=True, read_only=True)  # При GET-запросах отдаём полные объекты
     genre_ids = serializers.PrimaryKeyRelatedField(
         queryset=Genre.objects.all(), many=True, write_only=True  # При POST/PATCH принимаем список id
@@ -95,6 +210,8 @@ class GameSerializer(serializers.ModelSerializer):
                                                        write_only=True)
     publisher = PublisherSerializer(many=False, read_only=True)
     publisher_name = serializers.CharField(write_only=True)
+    # Stock minus the active cart reservations, from the game row itself
+    available_stock = serializers.IntegerField(read_only=True)
 
     images = serializers.ListField(
         child=serializers.ImageField(
@@ -109,7 +226,7 @@ class GameSerializer(serializers.ModelSerializer):
     class Meta:
         model = Game
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at', 'rating_avg', 'review_count', 'reserved_stock')
 
     def create(self, validated_data):
         genres = validated_data.pop('genre_ids', [])
@@ -173,4 +290,20 @@ class GameSerializer(serializers.ModelSerializer):
             if not data.get('type_ids'):
                 raise serializers.ValidationError({"type_ids": _("This field cannot be empty.")})
 
-        return data
\ No newline at end of file
+        return data
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'game', 'user', 'rating', 'comment', 'created_at']
+        read_only_fields = ('game', 'created_at')
+
+    def validate(self, data):
+        if self.instance is None and Review.objects.filter(
+            game_id=self.context['game_id'], user=self.context['request'].user
+        ).exists():
+            raise serializers.ValidationError(_('You have already reviewed this game.'))
+        return data
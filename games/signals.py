@@ -0,0 +1,141 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_taxonomy_version, invalidate_games
+from .renditions import schedule_renditions
+from .search import ensure_search_index
+from .models import Game, Image, Publisher, RatingBucket, Review, rating_bucket, touch_games, Type, PlayerCount, AgeGroup, DifficultyLevel, Genre, Mechanic, Duration
+
+TAXONOMY_MODELS = (Type, PlayerCount, AgeGroup, DifficultyLevel, Genre, Mechanic, Duration)
+
+
+def apply_rating_delta(review: Review, count_delta: int, rating_delta: Decimal) -> None:
+    """
+    Incrementally update the denormalized rating_avg and review_count
+    of the review's game with a single UPDATE statement.
+
+    """
+    new_count = F("review_count") + count_delta
+    Game.objects.filter(pk=review.game_id).update(
+        updated_at=timezone.now(),
+        review_count=new_count,
+        rating_avg=Case(
+            When(review_count__lte=-count_delta, then=Value(0.0)),
+            default=(F("rating_avg") * F("review_count") + float(rating_delta)) / new_count,
+            output_field=FloatField(),
+        ),
+    )
+    invalidate_games([review.game_id])
+    # Keep an already loaded game instance in sync with the database
+    if Review.game.is_cached(review):
+        review.game.refresh_from_db(fields=["rating_avg", "review_count", "updated_at"])
+
+
+def apply_histogram_delta(game_id: int, deltas: dict) -> None:
+    """
+    Add `deltas` ({bucket: count}) to the game's rating histogram with one
+    UPDATE per bucket, so concurrent reviews never lose a count. Missing
+    rows of the incremented buckets are created first; decremented ones
+    always exist, unless the game itself is being deleted.
+
+    """
+    deltas = {bucket: delta for bucket, delta in deltas.items() if delta}
+    created = [RatingBucket(game_id=game_id, bucket=bucket) for bucket, delta in deltas.items() if delta > 0]
+    if created:
+        RatingBucket.objects.bulk_create(created, ignore_conflicts=True)
+    for bucket, delta in sorted(deltas.items()):
+        RatingBucket.objects.filter(game_id=game_id, bucket=bucket).update(count=F("count") + delta)
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance: Review, **kwargs) -> None:
+    instance._previous_rating = None
+    if instance.pk is not None:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list("rating", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance: Review, created: bool, **kwargs) -> None:
+    rating = Decimal(str(instance.rating))
+    previous_rating = getattr(instance, "_previous_rating", None)
+    if created or previous_rating is None:
+        apply_rating_delta(instance, 1, rating)
+        apply_histogram_delta(instance.game_id, {rating_bucket(rating): 1})
+    elif rating != previous_rating:
+        apply_rating_delta(instance, 0, rating - previous_rating)
+        deltas = Counter({rating_bucket(rating): 1})
+        deltas[rating_bucket(previous_rating)] -= 1
+        apply_histogram_delta(instance.game_id, deltas)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance: Review, **kwargs) -> None:
+    apply_rating_delta(instance, -1, -Decimal(str(instance.rating)))
+    apply_histogram_delta(instance.game_id, {rating_bucket(instance.rating): -1})
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_game_cache(sender, instance: Game, **kwargs) -> None:
+    invalidate_games([instance.pk])
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def touch_game_on_image_change(sender, instance: Image, **kwargs) -> None:
+    # The list's thumbnail is annotated from the images, so the game's
+    # cached representations and validators have to move on
+    touch_games(pk=instance.game_id)
+    invalidate_games([instance.game_id])
+
+
+@receiver(post_save, sender=Image)
+def build_renditions_on_upload(sender, instance: Image, created: bool, update_fields=None, **kwargs) -> None:
+    if created or update_fields is None or "path" in update_fields:
+        schedule_renditions(instance.pk)
+
+
+def touch_games_on_m2m_change(sender, instance, action: str, reverse: bool, pk_set=None, **kwargs) -> None:
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.updated_at = touch_games(pk=instance.pk)
+            invalidate_games([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        touch_games(pk__in=pk_set)
+        invalidate_games(pk_set)
+    elif action == "pre_clear":
+        # Genre/Type/Mechanic.games still holds the games before they are cleared
+        pks = list(instance.games.values_list("pk", flat=True))
+        touch_games(pk__in=pks)
+        invalidate_games(pks)
+
+
+for game_relation in (Game.genre, Game.type, Game.mechanic):
+    m2m_changed.connect(touch_games_on_m2m_change, sender=game_relation.through)
+
+
+@receiver(post_save, sender=Publisher)
+def touch_games_on_publisher_change(sender, instance: Publisher, created: bool, **kwargs) -> None:
+    if not created:
+        touch_games(publisher=instance)
+
+
+def invalidate_taxonomy_cache(sender, **kwargs) -> None:
+    bump_taxonomy_version()
+
+
+for taxonomy_model in TAXONOMY_MODELS:
+    post_save.connect(invalidate_taxonomy_cache, sender=taxonomy_model)
+    post_delete.connect(invalidate_taxonomy_cache, sender=taxonomy_model)
+
+
+def ensure_search_index_after_migrate(sender, using: str = "default", **kwargs) -> None:
+    ensure_search_index(connections[using])
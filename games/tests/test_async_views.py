@@ -0,0 +1,171 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from ddf import G
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APITestCase
+from rest_framework.throttling import BaseThrottle
+
+from games.models import DifficultyLevel, Game, Genre, Image, ImageRendition, Mechanic, Type
+from games.views import GameModelViewSet
+
+
+class AsyncGameViewTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = G(Genre, name='strategy')
+        cls.mechanic = G(Mechanic, name='dice rolling')
+        cls.type = G(Type, name='board')
+        cls.difficulty = G(DifficultyLevel, name='easy')
+        cls.games = [G(Game, genre=[cls.genre], mechanic=[cls.mechanic], difficulty=cls.difficulty) for _ in range(20)]
+        cls.game = cls.games[0]
+        cls.image = G(Image, game=cls.game, path='games/1/cover.png')
+        G(ImageRendition, image=cls.image, name='thumbnail', format='webp', file='games/1/cover_thumbnail.webp',
+          width=160, height=120)
+
+    def setUp(self):
+        cache.clear()
+
+    def aget(self, url, headers=None):
+        async def get():
+            return await self.async_client.get(url, headers=headers)
+        return async_to_sync(get)()
+
+    def assertSameAsSync(self, async_url, sync_url):
+        response = self.aget(async_url)
+        expected = self.client.get(sync_url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.get('Cache-Control'), expected.get('Cache-Control'))
+        return response.json(), expected.json()
+
+    def test_list_matches_sync_list(self):
+        for query in ['', '?page=2', '?expand=genre,publisher&fields=title,stock', '?ordering=discount_price']:
+            with self.subTest(query=query):
+                data, expected = self.assertSameAsSync(
+                    reverse('games:async-game-list') + query, reverse('games:game-list') + query
+                )
+                self.assertEqual(data['count'], expected['count'])
+                self.assertEqual(data['results'], expected['results'])
+
+    def test_list_with_model_choice_filter(self):
+        query = f'?difficulty={self.difficulty.pk}&genre={self.genre.pk}'
+        data, expected = self.assertSameAsSync(
+            reverse('games:async-game-list') + query, reverse('games:game-list') + query
+        )
+        self.assertEqual(data['count'], 20)
+        self.assertEqual(data['results'], expected['results'])
+
+        response = self.aget(reverse('games:async-game-list') + '?difficulty=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('difficulty', response.json())
+
+    def test_list_cursor_pagination(self):
+        url = reverse('games:async-game-list') + '?pagination=cursor'
+        first = self.aget(url).json()
+        second = self.aget(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 20)
+        self.assertIsNone(second['next'])
+
+    def test_list_rejects_invalid_page_and_selection(self):
+        self.assertEqual(self.aget(reverse('games:async-game-list') + '?page=9').status_code, 404)
+        self.assertEqual(self.aget(reverse('games:async-game-list') + '?fields=password').status_code, 400)
+
+    def test_list_answers_conditional_requests(self):
+        url = reverse('games:async-game-list')
+        response = self.aget(url)
+        not_modified = self.aget(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['Cache-Control'], 'public, no-cache')
+
+    def test_hot_list_page_is_read_from_cache(self):
+        url = reverse('games:async-game-list') + '?expand=genre'
+        first = self.aget(url)
+        # validator aggregate + page, every game served from one multi-get
+        with self.assertNumQueries(2):
+            second = self.aget(url)
+        self.assertEqual(first.json(), second.json())
+
+    def test_retrieve_matches_sync_retrieve(self):
+        data, expected = self.assertSameAsSync(
+            reverse('games:async-game-detail', kwargs={'pk': self.game.pk}),
+            reverse('games:game-detail', kwargs={'pk': self.game.pk}),
+        )
+        self.assertEqual(data, expected)
+        # served from the entry the sync endpoint cached
+        with self.assertNumQueries(1):
+            self.aget(reverse('games:async-game-detail', kwargs={'pk': self.game.pk}))
+
+    def test_retrieve_shares_validators_with_sync_endpoint(self):
+        response = self.client.get(reverse('games:game-detail', kwargs={'pk': self.game.pk}), format='json')
+        not_modified = self.aget(
+            reverse('games:async-game-detail', kwargs={'pk': self.game.pk}), headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotIn('Last-Modified', not_modified)
+
+    def test_retrieve_missing_game(self):
+        response = self.aget(reverse('games:async-game-detail', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('detail', response.json())
+
+    def test_images_match_sync_images(self):
+        data, expected = self.assertSameAsSync(
+            reverse('games:async-game-images', kwargs={'pk': self.game.pk}),
+            reverse('games:game-images', kwargs={'pk': self.game.pk}),
+        )
+        self.assertEqual(data, expected)
+        self.assertEqual(len(data[0]['srcset']), 1)
+
+    def test_images_of_game_without_images_and_missing_game(self):
+        response = self.aget(reverse('games:async-game-images', kwargs={'pk': self.games[1].pk}))
+        self.assertEqual(response.json(), [])
+        response = self.aget(reverse('games:async-game-images', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_all_categories_match_sync_categories(self):
+        data, expected = self.assertSameAsSync(
+            reverse('games:async-game-all-categories'), reverse('games:game-all-categories')
+        )
+        self.assertEqual(data, expected)
+
+    def test_all_categories_are_cached(self):
+        url = reverse('games:async-game-all-categories')
+        response = self.aget(url)
+        with self.assertNumQueries(0):
+            cached = self.aget(url)
+        self.assertEqual(response.json(), cached.json())
+        not_modified = self.aget(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_viewset_permissions_apply(self):
+        url = reverse('games:async-game-list')
+        with mock.patch.object(GameModelViewSet, 'get_permissions', lambda viewset: [IsAuthenticated()]):
+            response = self.aget(url)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertIn('WWW-Authenticate', response)
+
+            self.async_client.force_login(G(User))
+            self.assertEqual(self.aget(url).status_code, status.HTTP_200_OK)
+
+    def test_viewset_throttles_apply(self):
+        class Exhausted(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        with mock.patch.object(GameModelViewSet, 'throttle_classes', [Exhausted]):
+            for name, kwargs in [('async-game-list', {}), ('async-game-detail', {'pk': self.game.pk})]:
+                with self.subTest(name=name):
+                    response = self.aget(reverse(f'games:{name}', kwargs=kwargs))
+                    self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_public_reads_without_replicas_need_no_authentication(self):
+        # No throttles, no replicas and AllowAny: the session is never loaded
+        with mock.patch.object(GameModelViewSet, 'perform_authentication') as perform_authentication:
+            self.assertEqual(self.aget(reverse('games:async-game-list')).status_code, status.HTTP_200_OK)
+        perform_authentication.assert_not_called()
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from ddf import G
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from games.cache import get_taxonomy_version
+from games.models import Game, Genre, RatingBucket, Review
+
+
+class RecomputeRatingsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.game = G(Game)
+        cls.unrated_game = G(Game)
+        G(Review, game=cls.game, user=cls.user, rating=Decimal("2.0"))
+        G(Review, game=cls.game, user=G(User), rating=Decimal("5.0"))
+
+    def test_it_recomputes_drifted_aggregates(self):
+        Game.objects.update(rating_avg=1.0, review_count=7)
+        out = StringIO()
+        call_command("recompute_ratings", stdout=out)
+
+        self.game.refresh_from_db()
+        self.unrated_game.refresh_from_db()
+        self.assertAlmostEqual(self.game.rating_avg, 3.5)
+        self.assertEqual(self.game.review_count, 2)
+        self.assertEqual(self.unrated_game.rating_avg, 0.0)
+        self.assertEqual(self.unrated_game.review_count, 0)
+        self.assertIn("Recomputed ratings for 2 games", out.getvalue())
+
+    def test_it_rebuilds_the_rating_histograms(self):
+        RatingBucket.objects.update(count=9)
+        RatingBucket.objects.create(game=self.unrated_game, bucket=Decimal("1.0"), count=3)
+        call_command("recompute_ratings", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(RatingBucket.objects.values_list("game", "bucket", "count")),
+            [(self.game.pk, Decimal("2.0"), 1), (self.game.pk, Decimal("5.0"), 1)],
+        )
+
+    def test_it_recomputes_only_given_games(self):
+        Game.objects.update(rating_avg=1.0, review_count=7)
+        call_command("recompute_ratings", str(self.game.pk), stdout=StringIO())
+
+        self.unrated_game.refresh_from_db()
+        self.assertEqual(self.unrated_game.review_count, 7)
+
+
+class ImportGamesCommandTest(TestCase):
+    CSV_HEADER = (
+        "title,publisher,description,rules_summary,release_year,price,discount_price,stock,"
+        "player_count,age_group,difficulty,duration,genres,types,mechanics\n"
+    )
+
+    def write_file(self, content, suffix):
+        handle = tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8")
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def csv_rows(self, count, price=500, start=0):
+        return "".join(
+            f"Game {i},Hobby World,Description {i},Rules,2020,{price},,5,2-4,12+,Easy,30 min,Fantasy|Horror,Strategy,Dice\n"
+            for i in range(start, start + count)
+        )
+
+    def import_games(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_games", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_it_imports_csv_with_taxonomy_and_m2m(self):
+        out, _ = self.import_games(self.write_file(self.CSV_HEADER + self.csv_rows(3), ".csv"))
+
+        self.assertIn("Imported 3 games (3 created, 0 updated, 0 skipped)", out)
+        game = Game.objects.get(title="Game 1")
+        self.assertEqual(game.publisher.name, "Hobby World")
+        self.assertEqual(game.difficulty.name, "Easy")
+        self.assertEqual(game.discount_price, Decimal("500"))
+        self.assertCountEqual(game.genre.values_list("name", flat=True), ["Fantasy", "Horror"])
+        self.assertCountEqual(game.type.values_list("name", flat=True), ["Strategy"])
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_it_imports_jsonl(self):
+        row = {
+            "title": "Dune", "publisher": "Gale Force", "release_year": 2019, "price": "1200.50", "stock": 2,
+            "player_count": "2-6", "age_group": "14+", "difficulty": "Hard", "duration": "2 h",
+            "genres": ["Sci-fi"], "mechanics": ["Bluff", "Area control"],
+        }
+        self.import_games(self.write_file(json.dumps(row) + "\n\n", ".jsonl"))
+
+        game = Game.objects.get(title="Dune")
+        self.assertEqual(game.price, Decimal("1200.50"))
+        self.assertEqual(game.mechanic.count(), 2)
+
+    def test_upsert_updates_existing_games(self):
+        self.import_games(self.write_file(self.CSV_HEADER + self.csv_rows(3), ".csv"), "--upsert")
+        out, _ = self.import_games(
+            self.write_file(self.CSV_HEADER + self.csv_rows(4, price=900), ".csv"), "--upsert"
+        )
+
+        self.assertIn("1 created, 3 updated", out)
+        self.assertEqual(Game.objects.count(), 4)
+        self.assertEqual(set(Game.objects.values_list("price", flat=True)), {Decimal("900")})
+        self.assertEqual(Game.objects.get(title="Game 0").genre.count(), 2)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = self.csv_rows(1) + ",Hobby World,,,2020,500,,1,2-4,12+,Easy,30 min,,,\n" + (
+            "Broken,Hobby World,,,soon,500,,1,2-4,12+,Easy,30 min,,,\n"
+        )
+        out, err = self.import_games(self.write_file(self.CSV_HEADER + rows, ".csv"))
+
+        self.assertIn("1 created, 0 updated, 2 skipped", out)
+        self.assertIn("line 2: title is required", err)
+        self.assertIn("line 3: invalid or missing number", err)
+
+    def test_query_count_does_not_grow_with_chunk_size(self):
+        self.import_games(self.write_file(self.CSV_HEADER + self.csv_rows(1), ".csv"))
+        small = self.write_file(self.CSV_HEADER + self.csv_rows(2, start=10), ".csv")
+        large = self.write_file(self.CSV_HEADER + self.csv_rows(50, start=20), ".csv")
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.import_games(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            self.import_games(large)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_new_taxonomy_invalidates_categories_cache(self):
+        version = get_taxonomy_version()
+        self.import_games(self.write_file(self.CSV_HEADER + self.csv_rows(1), ".csv"))
+        self.assertNotEqual(get_taxonomy_version(), version)
+
+    def test_unknown_extension_requires_format(self):
+        with self.assertRaises(CommandError):
+            self.import_games(self.write_file("", ".txt"))
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.db.transaction import atomic
+from django.test import SimpleTestCase
+
+from config.db.base import DatabaseWrapper
+
+
+class TunedSQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+
+    def make_connection(self, **options):
+        settings_dict = {**connection.settings_dict, 'NAME': self.path, 'CONN_MAX_AGE': 0, 'OPTIONS': options}
+        wrapper = DatabaseWrapper(settings_dict, alias='tuned')
+        connections['tuned'] = wrapper
+        self.addCleanup(connections.__delitem__, 'tuned')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        wrapper = self.make_connection(pragmas={
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234, 'cache_size': -8000,
+        })
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -8000)
+        # Django's own connection setup still runs
+        self.assertEqual(self.pragma(wrapper, 'foreign_keys'), 1)
+
+        wrapper.close()
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    def test_immediate_transactions_take_the_write_lock_at_begin(self):
+        self.make_connection(transaction_mode='immediate')
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+
+        with atomic(using='tuned'):
+            with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+
+    def test_deferred_is_the_default(self):
+        self.make_connection()
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+
+        with atomic(using='tuned'):
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+
+    def test_unknown_transaction_mode(self):
+        wrapper = self.make_connection(transaction_mode='eventually')
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+
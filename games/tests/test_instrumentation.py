@@ -0,0 +1,81 @@
+from ddf import G
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from games.instrumentation import endpoint_stats, percentile
+from games.models import Game
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsMiddlewareTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = G(User, is_staff=True)
+        cls.game = G(Game)
+
+    def setUp(self):
+        cache.clear()
+        endpoint_stats.clear()
+        self.addCleanup(endpoint_stats.clear)
+
+    def server_timing(self, response):
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('games:game-list'))
+
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'serializer', 'view', 'total'})
+        self.assertRegex(metrics['db']['desc'], r'^"[1-9]\d* queries"$')
+        self.assertGreater(float(metrics['serializer']['dur']), 0)
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['view']['dur']))
+
+    def test_it_logs_a_structured_line(self):
+        with self.assertLogs('games.instrumentation', level='INFO') as logs:
+            self.client.get(reverse('games:game-detail', args=[self.game.pk]))
+
+        record = logs.records[0]
+        self.assertEqual(record.endpoint, 'GET games:game-detail')
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+        self.assertIn('endpoint=GET games:game-detail', record.getMessage())
+
+    def test_stats_endpoint_aggregates_per_endpoint(self):
+        for _ in range(3):
+            self.client.get(reverse('games:game-list'))
+        self.client.get(reverse('games:game-detail', args=[self.game.pk]))
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('request-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        endpoints = {row['endpoint']: row for row in response.data['endpoints']}
+        self.assertEqual(endpoints['GET games:game-list']['count'], 3)
+        self.assertEqual(endpoints['GET games:game-detail']['count'], 1)
+        row = endpoints['GET games:game-list']
+        self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+        self.assertLessEqual(row['p95_ms'], row['p99_ms'])
+
+    def test_stats_endpoint_is_admin_only(self):
+        response = self.client.get(reverse('request-stats'))
+        self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled_by_setting(self):
+        response = self.client.get(reverse('games:game-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 95), 0.0)
@@ -108,10 +108,46 @@ class GameTest(TestCase):
     def test_get_average_rating_with_reviews(self):
         user = G(User)
         G(Review, game=self.game, user=user, rating=Decimal("3.0"))
-        G(Review, game=self.game, user=user, rating=Decimal("5.0"))
+        G(Review, game=self.game, user=G(User), rating=Decimal("5.0"))
         self.assertEqual(self.game.get_average_rating, 4.0)
 
 
+class GameRatingAggregateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+        cls.user = G(User)
+
+    def test_review_create_updates_aggregate(self):
+        G(Review, game=self.game, user=self.user, rating=Decimal("3.0"))
+        G(Review, game=self.game, user=G(User), rating=Decimal("4.5"))
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 2)
+        self.assertAlmostEqual(self.game.rating_avg, 3.75)
+
+    def test_review_update_updates_aggregate(self):
+        review = G(Review, game=self.game, user=self.user, rating=Decimal("2.0"))
+        G(Review, game=self.game, user=G(User), rating=Decimal("4.0"))
+        review.rating = Decimal("5.0")
+        review.save()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 2)
+        self.assertAlmostEqual(self.game.rating_avg, 4.5)
+
+    def test_review_delete_updates_aggregate(self):
+        first = G(Review, game=self.game, user=self.user, rating=Decimal("2.0"))
+        second = G(Review, game=self.game, user=G(User), rating=Decimal("4.0"))
+        first.delete()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 1)
+        self.assertAlmostEqual(self.game.rating_avg, 4.0)
+
+        second.delete()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.review_count, 0)
+        self.assertEqual(self.game.rating_avg, 0.0)
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class ImageTest(TestCase):
     @classmethod
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from ddf import G
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from games.models import Game
+
+
+class KeysetPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Few distinct prices and ratings so pages have to break ties on id
+        for i in range(40):
+            G(Game, title=f'Game {i}', price=Decimal('50.00'), discount_price=Decimal(10 + i % 3),
+              rating_avg=float(i % 4))
+        cls.list_url = reverse('games:game-list')
+
+    def walk(self, query):
+        url = f"{self.list_url}?pagination=cursor&{query}"
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            titles.extend(game['title'] for game in response.data['results'])
+            url = response.data['next']
+        return titles
+
+    def test_it_walks_every_supported_ordering_without_gaps_or_duplicates(self):
+        orderings = {
+            '': ('-created_at', '-id'),
+            'ordering=discount_price': ('discount_price', 'id'),
+            'ordering=-discount_price': ('-discount_price', '-id'),
+            'ordering=rating': ('rating_avg', 'id'),
+            'ordering=-rating': ('-rating_avg', '-id'),
+        }
+        for query, order_by in orderings.items():
+            with self.subTest(query=query):
+                expected = list(Game.objects.order_by(*order_by).values_list('title', flat=True))
+                self.assertEqual(self.walk(query), expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get(f"{self.list_url}?pagination=cursor&ordering=discount_price")
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_deep_page_runs_without_count_query(self):
+        response = self.client.get(f"{self.list_url}?pagination=cursor")
+        response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_invalid_cursor_returns_not_found(self):
+        response = self.client.get(f"{self.list_url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_remains_default(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data['count'], 40)
@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from ddf import G
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+from rest_framework.test import APITestCase
+
+from games.models import Game, Image, ImageRendition
+from games.renditions import build_renditions
+from games.tests.test_utils import create_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RENDITION_SETTINGS = {
+    "MEDIA_ROOT": TEMP_MEDIA_ROOT,
+    "IMAGE_RENDITION_SIZES": {"thumbnail": 100, "card": 300},
+    "IMAGE_RENDITION_FORMATS": {"webp": 80, "jpeg": 85},
+    "IMAGE_RENDITIONS_SYNC": True,
+}
+
+
+def create_png(width: int, height: int) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    PILImage.new("RGBA", (width, height), (255, 0, 0, 128)).save(buffer, format="PNG")
+    return SimpleUploadedFile("cover.png", buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(**RENDITION_SETTINGS)
+class BuildRenditionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+
+    def create_image(self, upload):
+        with self.captureOnCommitCallbacks(execute=False):
+            return Image.objects.create(game=self.game, path=upload)
+
+    def test_it_builds_every_size_and_format(self):
+        image = self.create_image(create_image(1200, 600))
+        build_renditions(image)
+
+        renditions = {(r.name, r.format): r for r in image.renditions.all()}
+        self.assertEqual(set(renditions), {
+            ("thumbnail", "webp"), ("thumbnail", "jpeg"), ("card", "webp"), ("card", "jpeg"),
+        })
+        self.assertEqual((renditions["card", "jpeg"].width, renditions["card", "jpeg"].height), (300, 150))
+        self.assertEqual((renditions["thumbnail", "webp"].width, renditions["thumbnail", "webp"].height), (100, 50))
+        with PILImage.open(renditions["card", "webp"].file.path) as stored:
+            self.assertEqual(stored.format, "WEBP")
+            self.assertEqual(stored.size, (300, 150))
+
+    def test_small_images_are_not_upscaled(self):
+        image = self.create_image(create_image(80, 60))
+        build_renditions(image)
+
+        self.assertEqual(set(image.renditions.values_list("width", "height")), {(80, 60)})
+
+    def test_transparent_images_are_flattened_for_jpeg(self):
+        image = self.create_image(create_png(400, 400))
+        build_renditions(image)
+
+        jpeg = image.renditions.get(name="card", format="jpeg")
+        with PILImage.open(jpeg.file.path) as stored:
+            self.assertEqual(stored.mode, "RGB")
+        with PILImage.open(image.renditions.get(name="card", format="webp").file.path) as stored:
+            self.assertEqual(stored.mode, "RGBA")
+
+    def test_rebuilding_replaces_renditions(self):
+        image = self.create_image(create_image(400, 400))
+        build_renditions(image)
+        build_renditions(image)
+
+        self.assertEqual(image.renditions.count(), 4)
+
+    def test_renditions_are_built_after_upload_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(game=self.game, path=create_image(400, 200))
+
+        self.assertEqual(image.renditions.count(), 4)
+
+    def test_unreadable_original_is_logged(self):
+        with self.assertLogs("games.renditions", level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = Image.objects.create(
+                    game=self.game, path=SimpleUploadedFile("broken.png", b"data", content_type="image/png")
+                )
+
+        self.assertFalse(image.renditions.exists())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(**RENDITION_SETTINGS)
+class ImageSrcsetTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+        for size in (400, 500):
+            image = Image.objects.create(game=cls.game, path=create_image(size, size))
+            build_renditions(image)
+
+    def test_images_endpoint_returns_srcset(self):
+        url = reverse('games:game-images', args=[self.game.pk])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        srcset = response.data[0]['srcset']
+        self.assertEqual(len(srcset), 4)
+        self.assertEqual([entry['width'] for entry in srcset], [100, 100, 300, 300])
+        self.assertTrue(srcset[0]['url'].startswith('http://testserver/media/'))
+        self.assertEqual(set(srcset[0]), {'name', 'format', 'url', 'width', 'height'})
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(**RENDITION_SETTINGS)
+class BuildImageRenditionsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+        cls.done = Image.objects.create(game=cls.game, path=create_image(400, 400))
+        build_renditions(cls.done)
+        cls.missing = Image.objects.create(game=cls.game, path=create_image(400, 400))
+
+    def test_it_backfills_missing_renditions(self):
+        out = StringIO()
+        call_command("build_image_renditions", "--workers", "1", stdout=out)
+
+        self.assertIn("Built renditions for 1 images (0 failed)", out.getvalue())
+        self.assertEqual(self.missing.renditions.count(), 4)
+
+    def test_all_rebuilds_every_image(self):
+        out = StringIO()
+        call_command("build_image_renditions", "--all", "--workers", "1", stdout=out)
+
+        self.assertIn("Built renditions for 2 images", out.getvalue())
+        self.assertEqual(ImageRendition.objects.count(), 8)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from ddf import G
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from games.models import Game, Genre
+from games.replicas import PIN_COOKIE, ReplicaRouter, read_from, reset_reads
+
+
+class ReplicationLagSimulator:
+    """
+    A replica in its own SQLite file that only catches up with the primary
+    when told to: catch_up() copies the primary's current contents over
+    with SQLite's online backup. Until then every write since the last
+    catch-up is "in flight".
+
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.directory = tempfile.TemporaryDirectory()
+        primary = connections[DEFAULT_DB_ALIAS]
+        settings_dict = {
+            **primary.settings_dict, 'NAME': os.path.join(self.directory.name, f'{alias}.sqlite3'), 'CONN_MAX_AGE': 0,
+        }
+        self.connection = primary.__class__(settings_dict, alias)
+        connections[alias] = self.connection
+
+    def catch_up(self):
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        self.connection.ensure_connection()
+        primary.connection.backup(self.connection.connection)
+
+    def close(self):
+        self.connection.close()
+        del connections[self.alias]
+        self.directory.cleanup()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTest(APITransactionTestCase):
+    # Transaction test case: the backup can't read the primary while a test transaction is open
+
+    def setUp(self):
+        cache.clear()
+        self.admin_user = G(User, is_staff=True)
+        self.genre = G(Genre, name='strategy')
+        self.game = G(Game, title='Replicated', genre=[self.genre])
+        self.replica = ReplicationLagSimulator('replica')
+        self.addCleanup(self.replica.close)
+        self.replica.catch_up()
+
+        self.admin_client = APIClient()
+        self.admin_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin_user).access_token}')
+        self.list_url = reverse('games:game-list')
+        self.detail_url = reverse('games:game-detail', kwargs={'pk': self.game.pk})
+
+    def titles(self, client):
+        response = client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [game['title'] for game in response.data['results']]
+
+    def test_catalog_reads_are_served_by_the_replica(self):
+        G(Game, title='In flight')
+        self.assertEqual(self.titles(self.client), ['Replicated'])
+
+        self.replica.catch_up()
+        self.assertEqual(sorted(self.titles(self.client)), ['In flight', 'Replicated'])
+
+    def test_all_read_actions_use_the_replica(self):
+        Genre.objects.create(name='in flight')
+        Game.objects.filter(pk=self.game.pk).update(title='Renamed')
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['title'], 'Replicated')
+        response = self.client.get(reverse('games:game-all-categories'))
+        genres = next(category for category in response.data if category['name'] == 'genre')['values']
+        self.assertEqual([genre['name'] for genre in genres], ['strategy'])
+        self.assertEqual(self.client.get(reverse('games:game-images', kwargs={'pk': self.game.pk})).data, [])
+
+    def test_async_reads_are_routed_like_the_sync_ones(self):
+        Game.objects.filter(pk=self.game.pk).update(title='Renamed', updated_at=timezone.now())
+        url = reverse('games:async-game-detail', kwargs={'pk': self.game.pk})
+
+        async def title():
+            return (await self.async_client.get(url)).json()['title']
+
+        self.assertEqual(async_to_sync(title)(), 'Replicated')
+        # Pinned clients read from the primary
+        self.async_client.cookies[PIN_COOKIE] = str(time.time() + 30)
+        self.assertEqual(async_to_sync(title)(), 'Renamed')
+
+    def test_writes_go_to_the_primary(self):
+        response = self.admin_client.patch(self.detail_url, {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Game.objects.get(pk=self.game.pk).title, 'Renamed')
+        self.assertEqual(Game.objects.using('replica').get(pk=self.game.pk).title, 'Replicated')
+
+    def test_writer_reads_its_own_writes(self):
+        response = self.admin_client.patch(self.detail_url, {'title': 'Renamed'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        self.assertEqual(self.admin_client.get(self.detail_url).data['title'], 'Renamed')
+        # The JWT user stays pinned without the cookie, e.g. on another device
+        other_device = APIClient()
+        other_device.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin_user).access_token}')
+        self.assertEqual(other_device.get(self.detail_url).data['title'], 'Renamed')
+        # Everyone else keeps reading the lagging replica
+        self.assertEqual(self.client.get(self.detail_url).data['title'], 'Replicated')
+
+    def test_pin_expires_after_the_window(self):
+        self.admin_client.patch(self.detail_url, {'title': 'Renamed'})
+        with mock.patch('games.replicas.time.time', return_value=10 ** 10):
+            cache.clear()
+            self.assertEqual(self.admin_client.get(self.detail_url).data['title'], 'Replicated')
+
+    def test_reads_without_writes_do_not_pin(self):
+        response = self.client.get(self.list_url)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_from_the_primary(self):
+        G(Game, title='In flight')
+        self.assertEqual(sorted(self.titles(self.client)), ['In flight', 'Replicated'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(APITestCase):
+    def test_routing(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Game))
+        token = read_from('replica')
+        try:
+            self.assertEqual(router.db_for_read(Game), 'replica')
+            self.assertEqual(router.db_for_write(Game), DEFAULT_DB_ALIAS)
+        finally:
+            reset_reads(token)
+        self.assertIsNone(router.db_for_read(Game))
+
+    def test_migrations_skip_replicas(self):
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica', 'games'))
+        self.assertIsNone(router.allow_migrate(DEFAULT_DB_ALIAS, 'games'))
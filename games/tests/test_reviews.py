@@ -0,0 +1,163 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from ddf import G
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from games.models import Game, RatingBucket, Review, rating_bucket
+
+
+def histogram(game):
+    return {
+        str(bucket): count
+        for bucket, count in RatingBucket.objects.filter(game=game, count__gt=0).values_list('bucket', 'count')
+    }
+
+
+class RatingHistogramTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+
+    def test_buckets(self):
+        self.assertEqual(
+            [str(rating_bucket(Decimal(rating))) for rating in ['0.0', '0.4', '0.5', '3.7', '4.9', '5.0', '6.0']],
+            ['0.0', '0.0', '0.5', '3.5', '4.5', '5.0', '5.0'],
+        )
+
+    def test_signals_keep_the_histogram_current(self):
+        first = G(Review, game=self.game, user=G(User), rating=Decimal('3.7'))
+        G(Review, game=self.game, user=G(User), rating=Decimal('3.5'))
+        G(Review, game=self.game, user=G(User), rating=Decimal('5.0'))
+        self.assertEqual(histogram(self.game), {'3.5': 2, '5.0': 1})
+
+        first.rating = Decimal('3.9')
+        first.save()
+        self.assertEqual(histogram(self.game), {'3.5': 2, '5.0': 1})
+        first.rating = Decimal('1.0')
+        first.save()
+        self.assertEqual(histogram(self.game), {'1.0': 1, '3.5': 1, '5.0': 1})
+
+        first.delete()
+        self.assertEqual(histogram(self.game), {'3.5': 1, '5.0': 1})
+
+    def test_deleting_the_game(self):
+        G(Review, game=self.game, user=G(User), rating=Decimal('4.0'))
+        self.game.delete()
+        self.assertFalse(RatingBucket.objects.exists())
+
+
+class ReviewAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = G(Game)
+        cls.other_game = G(Game)
+        cls.author = G(User, username='author')
+        start = timezone.now() - timedelta(days=1)
+        cls.reviews = []
+        for index in range(20):
+            review = G(Review, game=cls.game, user=G(User), rating=Decimal('4.0'), comment=f'Review {index}')
+            # Pairs with the same timestamp, so pages break ties on id
+            Review.objects.filter(pk=review.pk).update(created_at=start + timedelta(minutes=index // 2))
+            cls.reviews.append(review)
+        G(Review, game=cls.other_game, user=cls.author, rating=Decimal('2.0'))
+        cls.list_url = reverse('games:game-review-list', kwargs={'game_pk': cls.game.pk})
+
+    def test_list_is_keyset_paginated_newest_first(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        comments = [review['comment'] for review in response.data['results']]
+        self.assertEqual(len(comments), 16)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        comments += [review['comment'] for review in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(comments, [f'Review {index}' for index in reversed(range(20))])
+
+    def test_list_uses_the_game_created_index(self):
+        queryset = Review.objects.filter(game=self.game).order_by('-created_at', '-id')[:17]
+        self.assertIn('review_game_created_idx', queryset.explain())
+        self.assertNotIn('TEMP B-TREE', queryset.explain())
+
+    def test_create(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(self.list_url, {'rating': '4.5', 'comment': 'Great'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            {key: response.data[key] for key in ('game', 'user', 'rating', 'comment')},
+            {'game': self.game.pk, 'user': 'author', 'rating': '4.5', 'comment': 'Great'},
+        )
+        self.assertEqual(Game.objects.get(pk=self.game.pk).review_count, 21)
+        self.assertEqual(histogram(self.game), {'4.0': 20, '4.5': 1})
+
+        response = self.client.post(self.list_url, {'rating': '1.0'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_validation(self):
+        self.assertEqual(self.client.post(self.list_url, {'rating': '4.0'}).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.post(self.list_url, {'rating': '5.5'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        missing_game = reverse('games:game-review-list', kwargs={'game_pk': 0})
+        self.assertEqual(self.client.post(missing_game, {'rating': '4.0'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_only_the_author_changes_a_review(self):
+        review = self.reviews[0]
+        url = reverse('games:game-review-detail', kwargs={'game_pk': self.game.pk, 'pk': review.pk})
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.patch(url, {'rating': '1.0'}).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(review.user)
+        response = self.client.patch(url, {'rating': '1.0'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(histogram(self.game), {'1.0': 1, '4.0': 19})
+
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(histogram(self.game), {'4.0': 19})
+
+    def test_reviews_of_other_games_are_not_found(self):
+        url = reverse('games:game-review-detail', kwargs={'game_pk': self.game.pk, 'pk': self.reviews[0].pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        url = reverse('games:game-review-detail', kwargs={'game_pk': self.other_game.pk, 'pk': self.reviews[0].pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RatingSummaryTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.games = [G(Game) for _ in range(3)]
+        for rating in ['4.0', '4.2', '5.0']:
+            G(Review, game=cls.games[0], user=G(User), rating=Decimal(rating))
+        G(Review, game=cls.games[1], user=G(User), rating=Decimal('0.5'))
+        cls.url = reverse('games:game-rating-summary')
+
+    def test_summaries_in_one_query(self):
+        ids = [self.games[2].pk, self.games[0].pk, 0, self.games[1].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual([summary['id'] for summary in response.data], [ids[0], ids[1], ids[3]])
+
+        unrated, rated, single = response.data
+        self.assertEqual((unrated['review_count'], set(unrated['histogram'].values())), (0, {0}))
+        self.assertEqual(list(rated['histogram']), ['0.0', '0.5', '1.0', '1.5', '2.0', '2.5', '3.0', '3.5',
+                                                    '4.0', '4.5', '5.0'])
+        self.assertEqual({bucket: count for bucket, count in rated['histogram'].items() if count},
+                         {'4.0': 2, '5.0': 1})
+        self.assertEqual(rated['review_count'], 3)
+        self.assertAlmostEqual(rated['rating_avg'], 4.4)
+        self.assertEqual(single['histogram']['0.5'], 1)
+
+    def test_invalid_ids(self):
+        for ids in ['', 'a,b', ','.join(str(pk) for pk in range(1, 102))]:
+            with self.subTest(ids=ids[:10]):
+                self.assertEqual(self.client.get(self.url, {'ids': ids}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from ddf import G
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from games.models import Game, Review
+from games.search import FTS_TABLE, GameSearchFilter, SEARCH_RANK
+
+
+class GameSearchFilterTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_match = G(Game, title='Dungeon Crawler', description='Explore and fight')
+        cls.description_match = G(Game, title='Castle Siege', description='Storm the dungeon gates')
+        cls.no_match = G(Game, title='Chess', description='Classic strategy')
+        cls.list_url = reverse('games:game-list')
+
+    def search(self, term, **params):
+        response = self.client.get(self.list_url, {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [game['title'] for game in response.data['results']]
+
+    def test_it_uses_the_full_text_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('dungeon')
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertIn(FTS_TABLE, sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_it_orders_by_relevance(self):
+        self.assertEqual(self.search('dungeon'), ['Dungeon Crawler', 'Castle Siege'])
+
+    def test_explicit_ordering_overrides_relevance(self):
+        self.assertEqual(self.search('dungeon', ordering='-created_at'), ['Castle Siege', 'Dungeon Crawler'])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search('dung'), ['Dungeon Crawler', 'Castle Siege'])
+        self.assertEqual(self.search('cast sieg'), ['Castle Siege'])
+
+    def test_special_characters_are_not_query_syntax(self):
+        self.assertEqual(self.search('"chess" ('), ['Chess'])
+        self.assertEqual(self.search('*'), ['Chess', 'Castle Siege', 'Dungeon Crawler'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.no_match.title = 'Dungeon Chess'
+        self.no_match.save()
+        self.assertIn('Dungeon Chess', self.search('dungeon'))
+
+        self.title_match.delete()
+        self.assertEqual(self.search('dungeon'), ['Dungeon Chess', 'Castle Siege'])
+
+    def test_search_with_keyset_pagination(self):
+        response = self.client.get(self.list_url, {'search': 'dungeon', 'pagination': 'cursor'})
+        self.assertEqual([game['title'] for game in response.data['results']], ['Dungeon Crawler', 'Castle Siege'])
+
+    def search_queryset(self, queryset, term):
+        request = Request(APIRequestFactory().get(self.list_url, {'search': term}))
+        return GameSearchFilter().filter_queryset(request, queryset, view=None)
+
+    def test_search_combines_with_other_queryset_features(self):
+        queryset = Game.objects.only('title').annotate(discount=F('price') - F('discount_price'))
+        results = self.search_queryset(queryset, 'dungeon').order_by(SEARCH_RANK)
+        self.assertEqual([game.title for game in results], ['Dungeon Crawler', 'Castle Siege'])
+        self.assertEqual(results.count(), 2)
+        # As a subquery, where the FTS table gets an alias
+        self.assertEqual(
+            set(Game.objects.filter(pk__in=results.values('pk'))), {self.title_match, self.description_match}
+        )
+
+    def test_aggregated_querysets_are_filtered_without_rank(self):
+        G(Review, game=self.description_match, rating=4)
+        results = self.search_queryset(Game.objects.annotate(review_total=Count('reviews')), 'dungeon')
+        self.assertNotIn(SEARCH_RANK, results.query.annotations)
+        self.assertEqual(
+            {game.title: game.review_total for game in results}, {'Dungeon Crawler': 0, 'Castle Siege': 1}
+        )
+
+    def test_search_with_facets(self):
+        response = self.client.get(reverse('games:game-facets'), {'search': 'dungeon'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(bucket['count'] for bucket in response.data['price']), 2)
+
+class RebuildSearchIndexCommandTest(APITestCase):
+    def test_it_rebuilds_rows_written_around_the_triggers(self):
+        game = G(Game, title='Forgotten Realms')
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        list_url = reverse('games:game-list')
+        self.assertEqual(self.client.get(list_url, {'search': 'forgotten'}).data['count'], 0)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        response = self.client.get(list_url, {'search': 'forgotten'})
+        self.assertEqual(response.data['results'][0]['id'], game.id)
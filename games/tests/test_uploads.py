@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+
+from ddf import G
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from games.models import Game, Image
+from games.tests.test_utils import create_image
+from games.uploads import ImageUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PNG_HEADER = b'\x89PNG\r\n\x1a\n'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MAX_IMAGE_FILE_SIZE=1024)
+class ImageUploadHandlerTest(TestCase):
+    def start(self, file_name):
+        handler = ImageUploadHandler()
+        handler.new_file('images', file_name, 'image/png', None)
+        return handler
+
+    def test_it_rejects_disallowed_extensions_before_reading_data(self):
+        handler = ImageUploadHandler()
+        with self.assertRaises(SkipFile):
+            handler.new_file('images', 'script.svg', 'image/svg+xml', None)
+        self.assertEqual(handler.errors[0]['file'], 'script.svg')
+
+    def test_it_rejects_content_not_matching_the_extension(self):
+        handler = self.start('cover.png')
+        with self.assertRaises(SkipFile):
+            handler.receive_data_chunk(b'GIF89a not a png', 0)
+
+    def test_it_rejects_files_once_they_grow_past_the_limit(self):
+        handler = self.start('cover.png')
+        handler.receive_data_chunk(PNG_HEADER + b'x' * 500, 0)
+        with self.assertRaises(SkipFile):
+            handler.receive_data_chunk(b'x' * 600, 508)
+        self.assertIn('maximum file size', str(handler.errors[0]['error']))
+
+    def test_it_streams_accepted_files_to_a_temporary_file(self):
+        handler = self.start('cover.png')
+        handler.receive_data_chunk(PNG_HEADER, 0)
+        uploaded = handler.file_complete(len(PNG_HEADER))
+        self.addCleanup(uploaded.close)
+        self.assertTrue(os.path.exists(uploaded.temporary_file_path()))
+        self.assertEqual(handler.errors, [])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_RENDITIONS_SYNC=True)
+class UploadImagesViewTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = G(User, is_staff=True)
+        cls.game = G(Game)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('games:game-upload-images', args=[self.game.pk])
+
+    def test_it_attaches_images_in_one_insert(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {'images': [create_image(400, 300), create_image(300, 300)]}, format='multipart'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        images = Image.objects.filter(game=self.game)
+        self.assertEqual(images.count(), 2)
+        for image in images:
+            self.assertTrue(os.path.exists(image.path.path))
+            self.assertTrue(image.renditions.exists())
+
+    def test_query_count_does_not_grow_with_file_count(self):
+        with self.assertNumQueries(6):
+            self.client.post(self.url, {'images': [create_image(10, 10)]}, format='multipart')
+        with self.assertNumQueries(6):
+            self.client.post(self.url, {'images': [create_image(10, 10) for _ in range(3)]}, format='multipart')
+
+    def test_the_list_thumbnail_follows_uploads_and_renditions(self):
+        list_url = reverse('games:game-list')
+        thumbnails = {}
+        for params in ({}, {'fields': 'id,thumbnail'}):
+            response = self.client.get(list_url, params)
+            thumbnails[response['ETag']] = params
+            self.assertEqual(response.data['results'][0]['thumbnail'], None)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(self.url, {'images': [create_image(400, 300)]}, format='multipart')
+        for etag, params in thumbnails.items():
+            response = self.client.get(list_url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['results'][0]['thumbnail'], None)
+            thumbnails[etag] = (params, response['ETag'])
+
+        # The renditions are built after the upload commits
+        for callback in callbacks:
+            callback()
+        for params, etag in thumbnails.values():
+            response = self.client.get(list_url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.data['results'][0]['thumbnail'].endswith('_thumbnail.webp'))
+
+    def test_it_rejects_the_request_if_any_file_is_invalid(self):
+        fake_png = SimpleUploadedFile('cover.png', b'plain text', content_type='image/png')
+        response = self.client.post(self.url, {'images': [create_image(10, 10), fake_png]}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['images'][0]['file'], 'cover.png')
+        self.assertFalse(Image.objects.exists())
+
+    def test_it_rejects_disallowed_extensions(self):
+        upload = SimpleUploadedFile('cover.gif', b'GIF89a', content_type='image/gif')
+        response = self.client.post(self.url, {'images': [upload]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_it_requires_files(self):
+        response = self.client.post(self.url, {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_admin_users_cannot_upload(self):
+        self.client.force_authenticate(user=G(User))
+        response = self.client.post(self.url, {'images': [create_image(10, 10)]}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
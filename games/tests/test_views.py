@@ -1,8 +1,14 @@
 import io
+import time
 from ddf import G
 from PIL import Image
 
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -298,6 +304,18 @@ class GameViewSetTest(APITestCase):
         self.assertEqual(response.data['results'][0]['title'], 'Family Card Game')  # 18.00
         self.assertEqual(response.data['results'][1]['title'], 'Strategy Game')  # 45.00
 
+    def test_rating_ordering_and_filter(self):
+        """Test ordering and filtering by the denormalized rating"""
+        response = self.client.get(f"{self.list_url}?ordering=rating")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['title'], 'Strategy Game')
+        self.assertAlmostEqual(response.data['results'][1]['rating_avg'], 4.8)
+
+        response = self.client.get(f"{self.list_url}?min_rating=4")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Family Card Game')
+
     def test_combined_filters(self):
         """Test combinations of filters, search, and ordering"""
         # Filter by price range + search + ordering
@@ -363,3 +381,403 @@ class GameViewSetTest(APITestCase):
                 path = next_url.split('http://testserver')[1]
                 response = self.client.get(path)
                 self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class GameQueryCountTest(APITestCase):
+    """
+    Query budget for the read endpoints: the number of queries must not
+    grow with the page size or the size of the catalog.
+
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = G(Publisher)
+        cls.player_count = G(PlayerCount)
+        cls.age_group = G(AgeGroup)
+        cls.difficulty = G(DifficultyLevel)
+        cls.duration = G(Duration)
+        cls.genres = [G(Genre) for _ in range(3)]
+        cls.types = [G(Type) for _ in range(2)]
+        cls.mechanics = [G(Mechanic) for _ in range(2)]
+        cls.list_url = reverse('games:game-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_games(self, count):
+        games = []
+        for i in range(count):
+            game = Game.objects.create(
+                title=f'Game {i}',
+                price='30.00',
+                publisher=self.publisher,
+                player_count=self.player_count,
+                age_group=self.age_group,
+                difficulty=self.difficulty,
+                duration=self.duration,
+                release_year=2023
+            )
+            game.genre.set(self.genres)
+            game.type.set(self.types)
+            game.mechanic.set(self.mechanics)
+            games.append(game)
+        return games
+
+    def test_list_query_count_is_constant(self):
+        # validator aggregate (doubling as the count) + page with the thumbnail subquery
+        self.create_games(2)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_games(30)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data['results']), 16)
+
+    def test_expanded_list_query_count_is_constant(self):
+        url = f'{self.list_url}?expand=publisher,genre,type,mechanic'
+        # validator aggregate + page joining the publisher + 3 M2M prefetches
+        self.create_games(2)
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+        self.create_games(30)
+        cache.clear()
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 16)
+        self.assertEqual(len(response.data['results'][0]['genre']), 3)
+
+    def test_filtered_list_query_count_is_constant(self):
+        self.create_games(20)
+        url = f"{self.list_url}?difficulty={self.difficulty.id}&min_price=10&ordering=discount_price"
+        # difficulty choice validation + validator aggregate + page
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 16)
+
+    def test_retrieve_query_count(self):
+        # game with joined FKs + 3 M2M prefetches
+        game = self.create_games(1)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('games:game-detail', kwargs={'pk': game.pk}))
+        self.assertEqual(response.data['publisher']['id'], self.publisher.id)
+        self.assertEqual(len(response.data['genre']), 3)
+
+
+class AllCategoriesCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = G(Genre, name='strategy')
+        cls.url = reverse('games:game-all-categories')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response.data, response.data)
+
+    def test_it_returns_not_modified_for_matching_etag(self):
+        response = self.client.get(self.url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_taxonomy_write_invalidates_cache(self):
+        response = self.client.get(self.url)
+        G(Genre, name='family')
+        response_after_write = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response_after_write.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response_after_write['ETag'], response['ETag'])
+        genres = next(c for c in response_after_write.data if c['name'] == 'genre')['values']
+        self.assertEqual({genre['name'] for genre in genres}, {'strategy', 'family'})
+
+        self.genre.delete()
+        response_after_delete = self.client.get(self.url)
+        genres = next(c for c in response_after_delete.data if c['name'] == 'genre')['values']
+        self.assertEqual({genre['name'] for genre in genres}, {'family'})
+
+
+class GameFacetsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.publisher = G(Publisher)
+        cls.player_count = G(PlayerCount)
+        cls.age_group = G(AgeGroup)
+        cls.duration = G(Duration)
+        cls.easy = G(DifficultyLevel, name='easy')
+        cls.hard = G(DifficultyLevel, name='hard')
+        cls.strategy = G(Genre, name='strategy')
+        cls.family = G(Genre, name='family')
+        cls.board = G(Type, name='board')
+        cls.mechanic = G(Mechanic)
+
+        def create_game(title, price, difficulty, genres):
+            game = Game.objects.create(
+                title=title, price=price, publisher=cls.publisher, player_count=cls.player_count,
+                age_group=cls.age_group, difficulty=difficulty, duration=cls.duration, release_year=2023
+            )
+            game.genre.set(genres)
+            game.type.set([cls.board])
+            game.mechanic.set([cls.mechanic])
+
+        create_game('Easy Strategy', '100.00', cls.easy, [cls.strategy])
+        create_game('Easy Family', '600.00', cls.easy, [cls.family, cls.strategy])
+        create_game('Hard Strategy', '700.00', cls.hard, [cls.strategy])
+        cls.url = reverse('games:game-facets')
+
+    def counts(self, facet):
+        return {row['id']: row['count'] for row in facet}
+
+    def test_unfiltered_counts(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(response.data['difficulty']), {self.easy.id: 2, self.hard.id: 1})
+        self.assertEqual(self.counts(response.data['genre']), {self.strategy.id: 3, self.family.id: 1})
+        self.assertEqual(self.counts(response.data['type']), {self.board.id: 3})
+        self.assertEqual(
+            [(bucket['min'], bucket['count']) for bucket in response.data['price']],
+            [(0, 1), (500, 2)],
+        )
+
+    def test_facet_ignores_its_own_filter(self):
+        response = self.client.get(f"{self.url}?difficulty={self.easy.id}")
+        # difficulty counts stay unfiltered so the sidebar can offer alternatives
+        self.assertEqual(self.counts(response.data['difficulty']), {self.easy.id: 2, self.hard.id: 1})
+        # other facets are narrowed down by the difficulty filter
+        self.assertEqual(self.counts(response.data['genre']), {self.strategy.id: 2, self.family.id: 1})
+
+    def test_price_histogram_ignores_price_filters(self):
+        response = self.client.get(f"{self.url}?min_price=500&price_bucket=250")
+        self.assertEqual(self.counts(response.data['difficulty']), {self.easy.id: 1, self.hard.id: 1})
+        self.assertEqual(
+            [(bucket['min'], bucket['count']) for bucket in response.data['price']],
+            [(0, 1), (500, 2)],
+        )
+
+    def test_it_runs_a_fixed_number_of_queries(self):
+        # one grouped query per facet plus the price histogram
+        with self.assertNumQueries(8):
+            self.client.get(f"{self.url}?genre={self.strategy.id}&search=strategy")
+
+    def test_invalid_price_bucket(self):
+        response = self.client.get(f"{self.url}?price_bucket=0")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GameConditionalGetTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.genre = G(Genre)
+        cls.game = G(Game, genre=[cls.genre])
+        cls.other_game = G(Game)
+        cls.list_url = reverse('games:game-list')
+        cls.detail_url = reverse('games:game-detail', kwargs={'pk': cls.game.pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_list_sends_validators_and_cache_control(self):
+        response = self.client.get(self.list_url)
+
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+    def test_list_returns_304_after_one_query(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.revalidate(self.list_url, etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+    def test_list_etag_depends_on_query_parameters(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.revalidate(f'{self.list_url}?ordering=discount_price', etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_with_the_catalog(self):
+        changes = [
+            lambda: self.other_game.save(),
+            lambda: G(Review, game=self.other_game, user=self.user, rating='4.0'),
+            lambda: self.other_game.genre.add(self.genre),
+            lambda: Genre.objects.filter(pk=self.genre.pk).first().save(),
+            lambda: self.other_game.delete(),
+        ]
+        for change in changes:
+            etag = self.client.get(self.list_url)['ETag']
+            change()
+            self.assertEqual(self.revalidate(self.list_url, etag).status_code, status.HTTP_200_OK)
+
+    def test_list_honours_if_modified_since(self):
+        last_modified = self.client.get(self.list_url)['Last-Modified']
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cursor_pages_are_revalidated_without_counting(self):
+        url = f'{self.list_url}?pagination=cursor'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.game.save()
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_200_OK)
+
+    def test_retrieve_returns_304_after_one_query(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.revalidate(self.detail_url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_is_validated_by_etag_only(self):
+        response = self.client.get(self.detail_url)
+        self.assertNotIn('Last-Modified', response)
+
+        # A reservation: the stock fields change but updated_at doesn't, so
+        # If-Modified-Since alone can't revalidate the cached detail
+        Game.objects.filter(pk=self.game.pk).update(stock=5, reserved_stock=2)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['reserved_stock'], response.data['available_stock']), (2, 3))
+
+    def test_retrieve_etag_changes_with_the_game(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.game.publisher.name = 'Renamed'
+        self.game.publisher.save()
+
+        response = self.revalidate(self.detail_url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['publisher']['name'], 'Renamed')
+
+    def test_unknown_game_is_still_404(self):
+        response = self.client.get(reverse('games:game-detail', kwargs={'pk': 0}), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(GAMES_CACHE_CONTROL={'retrieve': 'public, max-age=30'})
+    def test_cache_control_is_configurable_per_action(self):
+        self.assertEqual(self.client.get(self.detail_url)['Cache-Control'], 'public, max-age=30')
+        self.assertNotIn('Cache-Control', self.client.get(self.list_url))
+
+
+class GameObjectCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.genre = G(Genre, name='strategy')
+        cls.games = [G(Game, genre=[cls.genre]) for _ in range(3)]
+        cls.list_url = reverse('games:game-list')
+        cls.detail_url = reverse('games:game-detail', kwargs={'pk': cls.games[0].pk})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hot_list_page_skips_prefetch_and_serialization(self):
+        url = f'{self.list_url}?expand=genre'
+        first = self.client.get(url)
+        # validator aggregate + page, every game served from one multi-get
+        with self.assertNumQueries(2):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+
+    def test_only_misses_are_rendered(self):
+        url = f'{self.list_url}?expand=genre'
+        self.client.get(url)
+        self.games[1].title = 'Renamed'
+        self.games[1].save()
+
+        # validator aggregate + page + genre prefetch for the one stale game
+        with self.assertNumQueries(3) as queries:
+            response = self.client.get(url)
+        self.assertTrue(queries.captured_queries[2]['sql'].endswith(f'IN ({self.games[1].pk})'))
+        titles = [game['title'] for game in response.data['results']]
+        self.assertIn('Renamed', titles)
+
+    def test_field_selections_are_cached_separately(self):
+        self.client.get(self.list_url)
+        response = self.client.get(f'{self.list_url}?fields=title')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_retrieve_is_read_through(self):
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['id'], self.games[0].pk)
+
+    def test_cache_follows_related_changes(self):
+        self.client.get(self.detail_url)
+        G(Review, game=self.games[0], user=self.user, rating='5.0')
+        self.assertEqual(self.client.get(self.detail_url).data['review_count'], 1)
+
+        self.games[0].genre.clear()
+        self.assertEqual(self.client.get(self.detail_url).data['genre'], [])
+
+        self.games[0].genre.add(self.genre)
+        self.genre.name = 'euro'
+        self.genre.save()
+        self.assertEqual(self.client.get(self.detail_url).data['genre'][0]['name'], 'euro')
+
+
+class GameListSerializerTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = G(Genre, name='strategy')
+        cls.game = G(Game, genre=[cls.genre], description='x' * 5000)
+        cls.list_url = reverse('games:game-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_returns_compact_cards(self):
+        response = self.client.get(self.list_url)
+        self.assertEqual(
+            set(response.data['results'][0]),
+            {'id', 'title', 'price', 'discount_price', 'rating_avg', 'review_count', 'thumbnail'},
+        )
+        self.assertIsNone(response.data['results'][0]['thumbnail'])
+
+    def test_retrieve_keeps_the_full_representation(self):
+        response = self.client.get(reverse('games:game-detail', kwargs={'pk': self.game.pk}))
+        self.assertIn('description', response.data)
+        self.assertEqual(response.data['genre'][0]['name'], 'strategy')
+
+    def test_fields_and_expand_select_the_output(self):
+        response = self.client.get(f'{self.list_url}?fields=title,release_year&expand=genre')
+        game = response.data['results'][0]
+        self.assertEqual(set(game), {'id', 'title', 'release_year', 'genre'})
+        self.assertEqual(game['genre'][0]['name'], 'strategy')
+
+    def test_unselected_columns_are_not_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'{self.list_url}?fields=title')
+        page_query = queries.captured_queries[-1]['sql']
+        self.assertIn('"games_game"."title"', page_query)
+        self.assertNotIn('"games_game"."description"', page_query)
+        self.assertNotIn('"games_game"."rules_summary"', page_query)
+        self.assertNotIn('thumbnail', page_query)
+
+    def test_cursor_pagination_works_with_sparse_fields(self):
+        G(Game)
+        response = self.client.get(f'{self.list_url}?pagination=cursor&fields=title&ordering=-rating')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(f'{self.list_url}?fields=title,password&expand=reviews')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+        self.assertIn('expand', response.data)
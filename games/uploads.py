@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.core.validators import FileExtensionValidator
+from django.utils.translation import gettext_lazy as _
+
+from .models import FileSizeValidator
+
+# File signatures of the formats in ALLOWED_IMAGE_FILE_EXTENSIONS
+IMAGE_SIGNATURES = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "bmp": (b"BM",),
+}
+SIGNATURE_LENGTH = max(len(signature) for signatures in IMAGE_SIGNATURES.values() for signature in signatures)
+
+
+def matches_signature(extension: str, header: bytes) -> bool:
+    return any(header.startswith(signature) for signature in IMAGE_SIGNATURES.get(extension, ()))
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream uploaded images to temporary files chunk by chunk, validating
+    them while they arrive instead of after the whole request is buffered.
+
+    The extension is checked against ALLOWED_IMAGE_FILE_EXTENSIONS when a
+    file starts, the first bytes against the signature of that format and
+    the running size against MAX_IMAGE_FILE_SIZE on every chunk. A rejected
+    file is skipped right away, its temporary file is removed and the
+    reason is collected in `errors`; the other files are still read.
+
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = []
+        self.extension_validator = FileExtensionValidator(settings.ALLOWED_IMAGE_FILE_EXTENSIONS)
+        self.size_validator = FileSizeValidator(settings.MAX_IMAGE_FILE_SIZE)
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        # Open the temporary file first, so a skip closes this file and not the previous one
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.header = b""
+        self.extension = file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+        try:
+            self.extension_validator(File(None, name=file_name))
+        except ValidationError as error:
+            self.reject(error)
+
+    def receive_data_chunk(self, raw_data, start):
+        if len(self.header) < SIGNATURE_LENGTH:
+            self.header += raw_data[:SIGNATURE_LENGTH - len(self.header)]
+            if len(self.header) >= SIGNATURE_LENGTH and not matches_signature(self.extension, self.header):
+                self.reject(ValidationError(_("The file content does not match its extension.")))
+        try:
+            self.size_validator.validate_size(start + len(raw_data))
+        except ValidationError as error:
+            self.reject(error)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if len(self.header) < SIGNATURE_LENGTH and not matches_signature(self.extension, self.header):
+            self.file.close()
+            self.errors.append({"file": self.file_name, "error": _("The file content does not match its extension.")})
+            return None
+        return super().file_complete(file_size)
+
+    def reject(self, error: ValidationError):
+        self.errors.append({"file": self.file_name, "error": error.messages[0]})
+        raise SkipFile
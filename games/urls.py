@@ -1,11 +1,24 @@
 from django.urls import path, include
 from rest_framework import routers
-from .views import GameModelViewSet
+from .async_views import AsyncCategoriesView, AsyncGameDetailView, AsyncGameImagesView, AsyncGameListView
+from .views import GameModelViewSet, ReviewViewSet
 
 app_name = "games"
 router = routers.DefaultRouter()
 router.register(r'games', GameModelViewSet, basename='game')
 
+review_list = ReviewViewSet.as_view({"get": "list", "post": "create"})
+review_detail = ReviewViewSet.as_view(
+    {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+)
+
 urlpatterns = [
     path("", include(router.urls)),
-]
\ No newline at end of file
+    path("games/<int:game_pk>/reviews/", review_list, name="game-review-list"),
+    path("games/<int:game_pk>/reviews/<int:pk>/", review_detail, name="game-review-detail"),
+    # Async-native variants of the catalog reads, for deployments served over ASGI
+    path("async/games/", AsyncGameListView.as_view(), name="async-game-list"),
+    path("async/games/all_categories/", AsyncCategoriesView.as_view(), name="async-game-all-categories"),
+    path("async/games/<int:pk>/", AsyncGameDetailView.as_view(), name="async-game-detail"),
+    path("async/games/<int:pk>/images/", AsyncGameImagesView.as_view(), name="async-game-images"),
+]
@@ -1,7 +1,6 @@
 import os
 import sys
 import django
-from django.db import transaction
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -9,9 +8,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", 'config.settings') # Укажи
 django.setup()
 
 
-from games.models import (
-    Type, PlayerCount, AgeGroup, DifficultyLevel, Genre, Mechanic, Duration, Game, Publisher
-)
+from games.importer import GameImporter
+from games.models import AgeGroup, DifficultyLevel, Duration, Genre, Mechanic, PlayerCount, Type
 
 # Додавання основних категорій
 TYPES = ["Стратегічні", "Кооперативні", "Економічні", "Військові", "Детективні"]
@@ -22,26 +20,6 @@ GENRES = ["Фентезі", "Наукова фантастика", "Жахи", "
 MECHANICS = ["Кидання кубиків", "Колодобудівля", "Контроль територій", "Блеф", "Дедукція"]
 DURATIONS = ["15-30 хвилин", "30-60 хвилин", "1-2 години"]
 
-
-with transaction.atomic():
-    for name in TYPES:
-        Type.objects.get_or_create(name=name)
-    for name in PLAYER_COUNTS:
-        PlayerCount.objects.get_or_create(name=name)
-    for name in AGE_GROUPS:
-        AgeGroup.objects.get_or_create(name=name)
-    for name in DIFFICULTIES:
-        DifficultyLevel.objects.get_or_create(name=name)
-    for name in GENRES:
-        Genre.objects.get_or_create(name=name)
-    for name in MECHANICS:
-        Mechanic.objects.get_or_create(name=name)
-    for name in DURATIONS:
-        Duration.objects.get_or_create(name=name)
-
-# Створення видавця
-publisher, _ = Publisher.objects.get_or_create(name="GameMasters")
-
 # Додавання ігор
 GAMES = [
     {"title": "Magic Quest", "type": ["Стратегічні"], "genres": ["Фентезі", "Детективи"], "mechanics": ["Кидання кубиків"]},
@@ -56,23 +34,33 @@ GAMES = [
     {"title": "Galactic Empires", "type": ["Стратегічні", "Кооперативні"], "genres": ["Жахи", "Детективи"], "mechanics": ["Контроль територій", "Колодобудівля"]},
 ]
 
-with transaction.atomic():
-    for game_data in GAMES:
-        game = Game.objects.create(
-            title=game_data["title"],
-            description=f"Гра {game_data['title']} - захоплююча гра у жанрі {', '.join(game_data['genres'])}",
-            rules_summary="Правила гри будуть додані пізніше.",
-            release_year=2023,
-            price=500,
-            discount_price=450,
-            stock=10,
-            publisher=publisher,
-            player_count=PlayerCount.objects.get(name="Для 3-4 гравців"),
-            age_group=AgeGroup.objects.get(name="Для підлітків і дорослих (12+)"),
-            difficulty=DifficultyLevel.objects.get(name="Середньої складності"),
-            duration=Duration.objects.get(name="30-60 хвилин"),
-        )
-        print(Genre.objects.filter(name__in=game_data["genres"]))
-        game.genre.set(Genre.objects.filter(name__in=game_data["genres"]))
-        game.mechanic.set(Mechanic.objects.filter(name__in=game_data["mechanics"]))
-        game.type.set(Type.objects.filter(name__in=game_data["type"]))
+importer = GameImporter(upsert=True)
+
+# Категорії без ігор створюються одним bulk insert на модель
+for model, names in (
+    (Type, TYPES), (PlayerCount, PLAYER_COUNTS), (AgeGroup, AGE_GROUPS), (DifficultyLevel, DIFFICULTIES),
+    (Genre, GENRES), (Mechanic, MECHANICS), (Duration, DURATIONS),
+):
+    importer.ensure_names(model, names)
+
+stats = importer.run(
+    {
+        "title": game_data["title"],
+        "publisher": "GameMasters",
+        "description": f"Гра {game_data['title']} - захоплююча гра у жанрі {', '.join(game_data['genres'])}",
+        "rules_summary": "Правила гри будуть додані пізніше.",
+        "release_year": 2023,
+        "price": 500,
+        "discount_price": 450,
+        "stock": 10,
+        "player_count": "Для 3-4 гравців",
+        "age_group": "Для підлітків і дорослих (12+)",
+        "difficulty": "Середньої складності",
+        "duration": "30-60 хвилин",
+        "genres": game_data["genres"],
+        "types": game_data["type"],
+        "mechanics": game_data["mechanics"],
+    }
+    for game_data in GAMES
+)
+print(f"Created {stats.created} games, updated {stats.updated}")
@@ -1,25 +1,71 @@
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, prefetch_related_objects
 from django_filters import NumberFilter, BaseInFilter
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.utils.translation import gettext_lazy as _
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from .serializers import GameSerializer, ImageSerializer, TypeSerializer, PlayerCountSerializer, AgeGroupSerializer, \
+from .serializers import GameListSerializer, GameSerializer, ImageSerializer, ReviewSerializer, TypeSerializer, PlayerCountSerializer, AgeGroupSerializer, \
     DifficultyLevelSerializer, GenreSerializer, MechanicSerializer, DurationSerializer
 from rest_framework import permissions
-from .models import Game, Image, Duration, Mechanic, Genre, DifficultyLevel, AgeGroup, PlayerCount, Type
-from rest_framework.filters import SearchFilter, OrderingFilter
+from .cache import (
+    all_categories_key, cache_games, game_list_variant, get_cached_games, get_games_cache, get_taxonomy_version,
+    invalidate_games,
+)
+from .facets import compute_facets
+from .pagination import CountedPageNumberPagination, KeysetPagination
+from .renditions import schedule_renditions
+from .replicas import ReplicaReadMixin
+from .search import GameSearchFilter, SEARCH_RANK
+from .uploads import ImageUploadHandler
+from .models import Game, Image, RATING_BUCKETS, Review, touch_games
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
+from django_filters.utils import translate_validation
 
 
 class NumberInFilter(BaseInFilter, NumberFilter):
     pass
 
 
+class GameOrderingFilter(OrderingFilter):
+    """
+    Ordering filter that maps public ordering names to model fields,
+    e.g. `rating` is served from the denormalized `rating_avg` column.
+    Search results without an explicit ordering are ordered by relevance.
+
+    """
+    field_aliases = {'rating': 'rating_avg'}
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and SEARCH_RANK in queryset.query.annotations:
+            return [SEARCH_RANK]
+        return super().get_ordering(request, queryset, view)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid_fields = super().remove_invalid_fields(queryset, fields, view, request)
+        return [self._resolve_alias(term) for term in valid_fields]
+
+    def _resolve_alias(self, term):
+        prefix = '-' if term.startswith('-') else ''
+        name = term.lstrip('-')
+        return prefix + self.field_aliases.get(name, name)
+
+
 class GameFilter(FilterSet):
     min_price = NumberFilter(field_name="price", lookup_expr="gte")
     max_price = NumberFilter(field_name="price", lookup_expr="lte")
+    min_rating = NumberFilter(field_name="rating_avg", lookup_expr="gte")
     genre = NumberInFilter(field_name="genre", lookup_expr="in")
     type = NumberInFilter(field_name="type", lookup_expr="in")
     mechanic = NumberInFilter(field_name="mechanic", lookup_expr="in")
@@ -50,17 +96,232 @@ class GameFilter(FilterSet):
         ]
 
 
-class GameModelViewSet(viewsets.ModelViewSet):
+class GameModelViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
-    filter_backends = [SearchFilter, DjangoFilterBackend, OrderingFilter]
+    filter_backends = [GameSearchFilter, DjangoFilterBackend, GameOrderingFilter]
     filterset_class = GameFilter
     ordering = ('-created_at',)
-    ordering_fields = ['discount_price, created_at, rating']
+    ordering_fields = ['discount_price', 'created_at', 'rating']
     search_fields = ['title', 'description']
+    facet_price_bucket_size = Decimal('500')
+    pagination_class = CountedPageNumberPagination
+    prefetch_relations = ('genre', 'type', 'mechanic')
+    replica_actions = ('list', 'retrieve', 'images', 'all_categories', 'facets', 'rating_summary')
+    rating_summary_max_ids = 100
+    category_serializers = (
+        ('type', _('Game type'), TypeSerializer),
+        ('player_count', _('Player count'), PlayerCountSerializer),
+        ('age_group', _('Age group'), AgeGroupSerializer),
+        ('difficulty', _('Difficulty level'), DifficultyLevelSerializer),
+        ('genre', _('Genres'), GenreSerializer),
+        ('mechanic', _('Mechanics'), MechanicSerializer),
+        ('duration', _('Duration'), DurationSerializer),
+    )
+
+    @property
+    def paginator(self):
+        """
+        Page numbers by default; keyset pagination when the client opts in
+        with `?pagination=cursor` (or follows a link carrying a `cursor`).
+
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def get_queryset(self):
+        """
+        Return a queryset shaped for the current action, joining the FK
+        relations and prefetching the M2M relations GameSerializer nests
+        so that list and retrieve run a fixed number of queries.
+
+        """
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return GameListSerializer.setup_queryset(queryset, *self.get_field_selection())
+        if self.action in ['retrieve', 'update', 'partial_update']:
+            queryset = queryset.select_related(
+                'publisher', 'difficulty', 'player_count', 'age_group', 'duration'
+            )
+        # list and retrieve prefetch only once the conditional request check has passed
+        if self.action in ['update', 'partial_update']:
+            queryset = queryset.prefetch_related(*self.prefetch_relations)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        List games, answering conditional requests with 304 before the
+        M2M relations are prefetched or anything is serialized. Pages are
+        assembled from the per-game cache (see _serialize_games).
+
+        Page-number validators come from one aggregate over the filtered
+        queryset (latest updated_at and row count, so deletions change
+        them too); the count is handed to the paginator, which then skips
+        its COUNT(*). Keyset pages never count, so their validators are
+        taken from the ids and updated_at of the fetched page instead.
+
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        version = get_taxonomy_version()
+        if isinstance(self.paginator, KeysetPagination):
+            page = self.paginate_queryset(queryset)
+            last_modified, state = self._page_validator_state(page)
+        else:
+            page = None
+            aggregate = queryset.order_by().aggregate(**self._validator_aggregates(queryset))
+            last_modified, state = aggregate['last_modified'], aggregate['count']
+
+        etag = self._weak_etag(request.build_absolute_uri(), last_modified, state, version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=self._timestamp(last_modified))
+        if not_modified is not None:
+            return not_modified
+
+        if page is None:
+            self.paginator.known_count = state
+            page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self._serialize_games(page, version))
+        return self._set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a game, answering conditional requests with 304 before
+        its M2M relations are prefetched or anything is serialized.
+
+        The detail is validated by its ETag only: reservations change its
+        stock fields without moving updated_at, so it sends no Last-Modified
+        and If-Modified-Since alone never yields a 304.
+
+        """
+        instance = self.get_object()
+        version = get_taxonomy_version()
+        etag = self._detail_etag(instance, version)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(self._serialize_games([instance], version)[0])
+        return self._set_validators(response, etag, None)
+
+    def _serialize_games(self, games, version):
+        """
+        Return the serialized `games` in order, read through the per-game
+        cache: hits come from a single multi-get, and only the misses get
+        their M2M relations prefetched and are serialized. List entries are
+        cached per field selection, next to the full detail representation.
+
+        """
+        variant = self.get_cache_variant()
+        data = get_cached_games(games, version, variant)
+        misses = [game for game in games if game.pk not in data]
+        if misses:
+            data.update(self._render_games(misses, version, variant))
+        return self._add_live_fields(games, [data[game.pk] for game in games])
+
+    def _add_live_fields(self, games, rendered):
+        """
+        Overlay the fields that change without updated_at on the cached
+        representations: stock reservations only move the detail's
+        reserved_stock and available_stock, so they are read from the game
+        row every time.
+
+        """
+        if self.get_cache_variant() != 'detail':
+            return rendered
+        return [
+            {**game_data, 'reserved_stock': game.reserved_stock, 'available_stock': game.available_stock}
+            for game, game_data in zip(games, rendered)
+        ]
+
+    def get_cache_variant(self):
+        if self.action == 'list':
+            return game_list_variant(*self.get_field_selection())
+        return 'detail'
+
+    def _render_games(self, games, version, variant):
+        """
+        Prefetch the M2M relations of `games`, serialize them and cache the
+        result. Returns pk -> representation.
+
+        """
+        if self.action == 'list':
+            prefetch_relations = GameListSerializer.prefetch_relations(self.get_field_selection()[1])
+        else:
+            prefetch_relations = self.prefetch_relations
+        prefetch_related_objects(games, *prefetch_relations)
+        rendered = self.get_serializer(games, many=True).data
+        data = {game.pk: dict(game_data) for game, game_data in zip(games, rendered)}
+        cache_games(games, data, version, variant)
+        return data
+
+    @staticmethod
+    def _validator_aggregates(queryset):
+        return {'last_modified': Max('updated_at'), 'count': Count('id', distinct=queryset.query.distinct)}
+
+    def _detail_etag(self, instance, version):
+        # updated_at doesn't move with reservations, reserved_stock does
+        return self._weak_etag(instance.pk, instance.updated_at, instance.reserved_stock, version)
+
+    @staticmethod
+    def _page_validator_state(page):
+        return max((game.updated_at for game in page), default=None), [(game.pk, game.updated_at) for game in page]
+
+    def _weak_etag(self, *parts):
+        # The renderer is part of the key: the browsable API and JSON differ
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        key = '|'.join(str(part) for part in (self.action, getattr(renderer, 'format', ''), *parts))
+        return 'W/' + quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+    @staticmethod
+    def _timestamp(value):
+        return int(value.timestamp()) if value is not None else None
+
+    def _set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(self._timestamp(last_modified))
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_control = settings.GAMES_CACHE_CONTROL.get(self.action)
+        if cache_control and request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            response.setdefault('Cache-Control', cache_control)
+        return response
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return GameListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs['fields'], kwargs['expand'] = self.get_field_selection()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_field_selection(self):
+        """
+        The validated `fields` / `expand` query parameters of the list action.
+
+        """
+        if not hasattr(self, '_field_selection'):
+            params = self.request.query_params
+            self._field_selection = GameListSerializer.parse_selection(params.get('fields'), params.get('expand'))
+        return self._field_selection
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Uploads are streamed through ImageUploadHandler, which has to be
+        # installed before anything (e.g. the CSRF check) reads the body.
+        if self.action_map.get(request.method.lower()) == 'upload_images':
+            request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'images', 'all_categories']:
+        if self.action in ['list', 'retrieve', 'images', 'all_categories', 'facets', 'rating_summary']:
             permission_classes =  [permissions.AllowAny]
         else:
             permission_classes = [permissions.IsAdminUser]
@@ -72,59 +333,191 @@ class GameModelViewSet(viewsets.ModelViewSet):
         Custom action to retrieve all images for a specific game
         """
         game = self.get_object()
-        images = game.images.all()
-        print(Image.objects.all())
+        images = game.images.prefetch_related('renditions')
         serializer = ImageSerializer(images, many=True, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'], url_path='images/upload', parser_classes=[MultiPartParser])
+    def upload_images(self, request, pk=None):
+        """
+        Attach the files of the multipart `images` field to a game.
+
+        Files are validated while they stream to temporary storage (see
+        ImageUploadHandler), so nothing is buffered in memory and Pillow
+        never decodes them here. If any file is rejected none are attached;
+        otherwise the files are moved into storage and inserted at once.
+
+        """
+        game = self.get_object()
+        uploads = request.FILES.getlist('images')
+        errors = [error for handler in request.upload_handlers for error in getattr(handler, 'errors', [])]
+        if errors or not uploads:
+            for upload in uploads:
+                upload.close()
+            raise ValidationError({'images': errors or [_('No images were uploaded.')]})
+
+        images = []
+        for upload in uploads:
+            image = Image(game=game)
+            image.path.save(upload.name, upload, save=False)
+            images.append(image)
+        with transaction.atomic():
+            Image.objects.bulk_create(images)
+            # bulk_create sends no post_save, so touch the game and schedule the renditions here
+            touch_games(pk=game.pk)
+            for image in images:
+                schedule_renditions(image.pk)
+        invalidate_games([game.pk])
+
+        prefetch_related_objects(images, 'renditions')
+        serializer = ImageSerializer(images, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def facets(self, request):
+        """
+        Return per-value game counts for every category under the current
+        search and filter parameters, plus a price histogram.
+
+        Each facet is counted with its own filter left out, so the counts
+        show how many games each alternative value would return.
+
+        """
+        try:
+            price_bucket_size = Decimal(request.query_params.get('price_bucket', self.facet_price_bucket_size))
+        except InvalidOperation:
+            raise ValidationError({'price_bucket': _('Price bucket should be a number.')})
+        if not price_bucket_size.is_finite() or price_bucket_size <= 0:
+            raise ValidationError({'price_bucket': _('Price bucket should be greater than zero.')})
+
+        queryset = GameSearchFilter().filter_queryset(request, Game.objects.all(), self)
+        filterset = self.filterset_class(request.query_params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return Response(compute_facets(filterset, queryset, price_bucket_size))
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def rating_summary(self, request):
+        """
+        Return the rating average, review count and rating histogram (review
+        counts per 0.5 bucket) of the games in `?ids=1,2,3`, for catalog
+        cards. One query however many games are asked for; unknown ids are
+        left out.
+
+        """
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params.get('ids', '').split(',') if pk))
+        except ValueError:
+            raise ValidationError({'ids': _('Ids should be comma separated integers.')})
+        if not ids:
+            raise ValidationError({'ids': _('This parameter is required.')})
+        if len(ids) > self.rating_summary_max_ids:
+            raise ValidationError({'ids': _('At most %d ids per request.') % self.rating_summary_max_ids})
+
+        rows = Game.objects.filter(pk__in=ids).order_by().values_list(
+            'pk', 'rating_avg', 'review_count', 'rating_buckets__bucket', 'rating_buckets__count'
+        )
+        summaries = {}
+        for pk, rating_avg, review_count, bucket, count in rows:
+            summary = summaries.setdefault(pk, {
+                'id': pk, 'rating_avg': rating_avg, 'review_count': review_count,
+                'histogram': {str(bucket): 0 for bucket in RATING_BUCKETS},
+            })
+            if bucket is not None:
+                summary['histogram'][str(bucket)] = count
+        return Response([summaries[pk] for pk in ids if pk in summaries])
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def all_categories(self, request):
         """
         Return all categories and all sub categories
 
+        The payload is cached under the current taxonomy version, which is
+        bumped whenever a taxonomy model is saved or deleted. The version also
+        drives the ETag and Last-Modified headers, so a matching conditional
+        request is answered with 304 without touching the database.
+
         """
+        version = get_taxonomy_version()
+        etag, last_modified = self._categories_validators(version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache = get_games_cache()
+        cache_key = all_categories_key(version)
+        categories = cache.get(cache_key)
+        if categories is None:
+            categories = self._build_categories()
+            cache.set(cache_key, categories, settings.CATEGORIES_CACHE_TIMEOUT)
+
+        response = Response(categories)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @staticmethod
+    def _categories_validators(version):
+        return quote_etag(f"categories-{version}"), int(version)
+
+    def _build_categories(self, values=None):
+        """
+        Build the all_categories payload from `values`, category name ->
+        instances, loading every category from the database when omitted.
+
+        """
+        if values is None:
+            values = {name: serializer_class.Meta.model.objects.all()
+                      for name, _display_name, serializer_class in self.category_serializers}
         categories = [
             {
-                'name': 'type',
-                'display_name': _('Game type'),
-                'values': TypeSerializer(Type.objects.all(), many=True).data
-            },
-            {
-                'name': 'player_count',
-                'display_name': _('Player count'),
-                'values': PlayerCountSerializer(PlayerCount.objects.all(), many=True).data
-            },
-            {
-                'name': 'age_group',
-                'display_name': _('Age group'),
-                'values': AgeGroupSerializer(AgeGroup.objects.all(), many=True).data
-            },
-            {
-                'name': 'difficulty',
-                'display_name': _('Difficulty level'),
-                'values': DifficultyLevelSerializer(DifficultyLevel.objects.all(), many=True).data
-            },
-            {
-                'name': 'genre',
-                'display_name': _('Genres'),
-                'values': GenreSerializer(Genre.objects.all(), many=True).data
-            },
-            {
-                'name': 'mechanic',
-                'display_name': _('Mechanics'),
-                'values': MechanicSerializer(Mechanic.objects.all(), many=True).data
-            },
-            {
-                'name': 'duration',
-                'display_name': _('Duration'),
-                'values': DurationSerializer(Duration.objects.all(), many=True).data
+                'name': name,
+                'display_name': str(display_name),
+                'values': serializer_class(values[name], many=True).data
             }
+            for name, display_name, serializer_class in self.category_serializers
         ]
 
         # Опционально: добавляем URL для фильтрации к каждому значению
-        base_url = request.build_absolute_uri('/api/games/?')
         for category in categories:
             for value in category['values']:
                 value['filter_url'] = f"?{category['name']}={value['id']}"
 
-        return Response(categories)
+        return categories
+
+
+class IsAuthorOrReadOnly(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.method in permissions.SAFE_METHODS or request.user.is_authenticated
+
+    def has_object_permission(self, request, view, obj):
+        return (
+            request.method in permissions.SAFE_METHODS
+            or obj.user_id == request.user.pk
+            or request.user.is_staff
+        )
+
+
+class ReviewViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    """
+    The reviews of a game, nested under games/<game_pk>/reviews/, newest
+    first with keyset pagination over the (game, -created_at, -id) index.
+    One review per user and game; authors (and staff) can change theirs.
+
+    """
+    serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthorOrReadOnly]
+    replica_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        return Review.objects.filter(game_id=self.kwargs['game_pk']).select_related('user').only(
+            'game_id', 'rating', 'comment', 'created_at', 'user__username'
+        )
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'game_id': self.kwargs['game_pk']}
+
+    def perform_create(self, serializer):
+        game = get_object_or_404(Game.objects.only('id'), pk=self.kwargs['game_pk'])
+        serializer.save(game=game, user=self.request.user)
@@ -0,0 +1,118 @@
+"""
+Checkout: turn a cart into an order.
+
+Everything happens in one transaction: the stock of every line is taken
+with a conditional UPDATE (enough stock left besides what other carts
+have reserved), so two checkouts can never sell the same unit, and the
+order is only written when every line could be fulfilled. Otherwise the
+transaction is rolled back and the failing lines are reported. The cart's
+own reservations (carts.reservations) are turned into the sale.
+
+Games are always locked in primary key order, whatever the order of the
+cart, so concurrent checkouts of overlapping carts can't deadlock. On
+backends with row locks (PostgreSQL) the games are locked up front with
+SELECT ... FOR UPDATE; on SQLite the IMMEDIATE transaction already takes
+the database write lock at BEGIN.
+
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from carts.models import Cart
+from carts.reservations import held_quantities, release
+from games.cache import invalidate_games
+from games.models import Game
+
+from .models import Order, OrderItem
+
+
+@dataclass
+class LineFailure:
+    game_id: int
+    title: str
+    requested: int
+    available: int
+
+
+@dataclass
+class CheckoutResult:
+    order: Optional[Order] = None
+    failures: List[LineFailure] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.order is not None
+
+
+def take_stock(game_id: int, quantity: int, held: int = 0, using: str = DEFAULT_DB_ALIAS) -> bool:
+    """
+    Decrement the game's stock by `quantity` if that much is left once the
+    reservations of other carts are set aside. `held` units of it were
+    reserved by this cart and stop being reserved.
+
+    """
+    return bool(
+        Game.objects.using(using)
+        .filter(pk=game_id, stock__gte=F("reserved_stock") - held + quantity)
+        .update(stock=F("stock") - quantity, reserved_stock=F("reserved_stock") - held, updated_at=timezone.now())
+    )
+
+
+def checkout(cart: Cart) -> CheckoutResult:
+    """
+    Create an order with the items of `cart` at their current selling
+    price, take their stock and empty the cart, all or nothing.
+
+    Returns the order, or the lines that are short of stock with what is
+    available to the cart. Raises ValidationError for an empty cart.
+
+    """
+    using = router.db_for_write(Order)
+    with transaction.atomic(using=using):
+        requested = dict(
+            cart.cart_items.using(using).filter(quantity__gt=0)
+            .order_by()
+            .values_list("game")
+            .annotate(quantity=Sum("quantity"))
+        )
+        if not requested:
+            raise ValidationError("Cart is empty.")
+
+        held = held_quantities(cart, using)
+        games = Game.objects.using(using).filter(pk__in=requested).only(
+            "title", "discount_price", "stock", "reserved_stock"
+        )
+        if connections[using].features.has_select_for_update:
+            games = games.select_for_update()
+        games = list(games.order_by("pk"))
+
+        failures = [
+            LineFailure(game.pk, game.title, requested[game.pk], game.available_stock + held.get(game.pk, 0))
+            for game in games
+            if not take_stock(game.pk, requested[game.pk], held.get(game.pk, 0), using)
+        ]
+        if failures:
+            transaction.set_rollback(True)
+            return CheckoutResult(failures=failures)
+
+        order = Order(user_id=cart.user_id)
+        items = [
+            OrderItem(order=order, game=game, quantity=requested[game.pk], price=game.discount_price)
+            for game in games
+        ]
+        order.set_totals(items)
+        order.save()
+        OrderItem.objects.bulk_create(items)
+        cart.cart_items.using(using).delete()
+        cart.reservations.using(using).filter(game__in=requested).delete()
+        # Reservations of games no longer in the cart
+        release(cart, using)
+
+        game_ids = [game.pk for game in games]
+        transaction.on_commit(lambda: invalidate_games(game_ids), using=using)
+    return CheckoutResult(order=order)
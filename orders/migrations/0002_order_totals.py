@@ -0,0 +1,54 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:36
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    money = DecimalField(max_digits=12, decimal_places=2)
+    items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    line_total = ExpressionWrapper(F("quantity") * F("price"), output_field=money)
+    Order.objects.update(
+        total=Coalesce(
+            Subquery(items.annotate(total=Sum(line_total)).values("total"), output_field=money),
+            Value(Decimal("0.00")),
+        ),
+        item_count=Coalesce(
+            Subquery(items.annotate(count=Sum("quantity")).values("count"), output_field=IntegerField()),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=12
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="order_user_created_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
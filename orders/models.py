@@ -1,12 +1,62 @@
 import re
+from decimal import Decimal
 
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from rest_framework.exceptions import ValidationError
 
 from games.models import Game
 
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def order_totals(prefix: str = "") -> dict:
+    """
+    Aggregates of the order items at `prefix`, from their price snapshots.
+
+    """
+    line_total = ExpressionWrapper(F(f"{prefix}quantity") * F(f"{prefix}price"), output_field=MONEY)
+    return {
+        "computed_total": Coalesce(Sum(line_total), Value(Decimal("0.00")), output_field=MONEY),
+        "computed_item_count": Coalesce(Sum(f"{prefix}quantity"), 0),
+    }
+
+
+class OrderQuerySet(models.QuerySet):
+    def history(self, user):
+        """
+        The orders of `user`, newest first, with their stored totals and
+        the number of lines, for order history lists. Runs as one query.
+
+        """
+        return (
+            self.filter(user=user)
+            .annotate(line_count=Count("order_items"))
+            .order_by("-created_at", "-id")
+        )
+
+    def with_items(self):
+        """
+        Prefetch the items with the id and title of their games.
+
+        """
+        items = OrderItem.objects.select_related("game").only(
+            "order_id", "quantity", "price", "game__id", "game__title"
+        ).order_by("id")
+        return self.prefetch_related(models.Prefetch("order_items", queryset=items))
+
+    def with_computed_totals(self):
+        """
+        Annotate `computed_total` and `computed_item_count` from the items,
+        e.g. to check the stored totals.
+
+        """
+        return self.annotate(**order_totals("order_items__"))
+
+
 class Order(models.Model):
     ORDER_STATUS_CHOICES = (
         ("pending", "Pending"),
@@ -19,18 +69,41 @@ class Order(models.Model):
     status = models.CharField(max_length=20, default='pending', choices=ORDER_STATUS_CHOICES)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Snapshots of the items' prices and quantities, written at checkout
+    total = models.DecimalField(decimal_places=2, max_digits=12, default=Decimal("0.00"))
+    item_count = models.PositiveIntegerField(default=0)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_created_idx"),
+        ]
+
+    def set_totals(self, items) -> None:
+        """
+        Set `total` and `item_count` from in-memory order items, without saving.
+
+        """
+        self.total = sum((item.get_total for item in items), Decimal("0.00"))
+        self.item_count = sum(item.quantity for item in items)
+
+    def update_totals(self) -> None:
+        """
+        Recompute `total` and `item_count` from the stored items and save them.
+
+        """
+        totals = self.order_items.aggregate(**order_totals())
+        self.total, self.item_count = totals["computed_total"], totals["computed_item_count"]
+        self.save(update_fields=["total", "item_count"])
 
     @property
     def get_order_total(self):
-        items = self.order_items.all()
-        total = sum([item.get_total for item in items])
-        return total
+        return self.total
 
     @property
     def get_order_quantity_items(self):
-        items = self.order_items.all()
-        total = sum([item.quantity for item in items])
-        return total
+        return self.item_count
 
 
 class OrderItem(models.Model):
@@ -41,7 +114,7 @@ class OrderItem(models.Model):
 
     @property
     def get_total(self):
-        return self.game.price * self.quantity
+        return self.price * self.quantity
 
 
 class Shipment(models.Model):
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+from .models import Order, OrderItem
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='game.title', read_only=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, source='get_total', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'game', 'title', 'quantity', 'price', 'total']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True, source='order_items')
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'created_at', 'total', 'item_count', 'items']
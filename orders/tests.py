@@ -1,3 +1,281 @@
-from django.test import TestCase
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+from decimal import Decimal
+from random import Random
 
-# Create your tests here.
+from ddf import G
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from carts.models import Cart, CartItem, StockReservation
+from carts.reservations import reserve
+from config.db.base import DatabaseWrapper
+from games.models import Game
+from orders.checkout import LineFailure, checkout
+from orders.models import Order, OrderItem
+
+
+class OrderTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.game = G(Game, price=Decimal('50.00'), discount_price=Decimal('45.00'))
+        cls.order = G(Order, user=cls.user)
+        cls.items = [
+            G(OrderItem, order=cls.order, game=cls.game, quantity=2, price=Decimal('45.00')),
+            G(OrderItem, order=cls.order, game=G(Game), quantity=1, price=Decimal('9.99')),
+        ]
+
+    def test_line_total_uses_the_price_snapshot(self):
+        Game.objects.filter(pk=self.game.pk).update(price=Decimal('80.00'), discount_price=Decimal('80.00'))
+        item = OrderItem.objects.get(pk=self.items[0].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(item.get_total, Decimal('90.00'))
+
+    def test_set_totals_from_items(self):
+        order = Order(user=self.user)
+        order.set_totals(self.items)
+        self.assertEqual((order.total, order.item_count), (Decimal('99.99'), 3))
+
+    def test_update_totals(self):
+        self.order.update_totals()
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.get_order_total, self.order.get_order_quantity_items), (Decimal('99.99'), 3))
+
+        computed = Order.objects.with_computed_totals().get(pk=self.order.pk)
+        self.assertEqual((computed.computed_total, computed.computed_item_count), (Decimal('99.99'), 3))
+
+    def test_history_is_one_query(self):
+        self.order.update_totals()
+        for _ in range(100):
+            order = G(Order, user=self.user)
+            G(OrderItem, order=order, game=self.game, quantity=1, price=Decimal('45.00'))
+        G(Order, user=G(User))
+
+        with self.assertNumQueries(1):
+            history = [
+                (order.pk, order.get_order_total, order.get_order_quantity_items, order.line_count)
+                for order in Order.objects.history(self.user)
+            ]
+        self.assertEqual(len(history), 101)
+        self.assertEqual(history[-1], (self.order.pk, Decimal('99.99'), 3, 2))
+        self.assertEqual(history[0][3], 1)
+
+
+class OrderHistoryAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.games = [G(Game, title=f'Game {index}') for index in range(3)]
+        cls.orders = []
+        for _ in range(20):
+            order = G(Order, user=cls.user)
+            items = [G(OrderItem, order=order, game=game, quantity=2, price=Decimal('5.00')) for game in cls.games]
+            order.set_totals(items)
+            order.save()
+            cls.orders.append(order)
+        cls.other_order = G(Order, user=G(User))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_history_page_in_three_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('orders:order-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual([order['id'] for order in response.data['results']],
+                         [order.pk for order in reversed(self.orders)][:16])
+        first = response.data['results'][0]
+        self.assertEqual((first['total'], first['item_count']), ('30.00', 6))
+        self.assertEqual(first['items'][0], {
+            'id': first['items'][0]['id'], 'game': self.games[0].pk, 'title': 'Game 0',
+            'quantity': 2, 'price': '5.00', 'total': '10.00',
+        })
+
+    def test_only_own_orders(self):
+        self.assertEqual(self.client.get(reverse('orders:order-detail', args=[self.orders[0].pk])).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('orders:order-detail', args=[self.other_order.pk])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('orders:order-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CheckoutTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = G(User)
+        cls.game = G(Game, title='Azul', price=Decimal('40.00'), discount_price=Decimal('35.00'), stock=5)
+        cls.other = G(Game, title='Catan', price=Decimal('30.00'), discount_price=Decimal('30.00'), stock=2)
+
+    def make_cart(self, *lines):
+        cart = G(Cart, user=self.user)
+        for game, quantity in lines:
+            G(CartItem, cart=cart, game=game, quantity=quantity)
+        return cart
+
+    def stock(self, game):
+        return Game.objects.values_list('stock', flat=True).get(pk=game.pk)
+
+    def test_checkout_creates_the_order_and_takes_the_stock(self):
+        cart = self.make_cart((self.game, 2), (self.other, 1))
+        result = checkout(cart)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.failures, [])
+        order = Order.objects.get()
+        self.assertEqual((order.user, order.total, order.item_count), (self.user, Decimal('100.00'), 3))
+        self.assertEqual(
+            sorted(order.order_items.values_list('game', 'quantity', 'price')),
+            [(self.game.pk, 2, Decimal('35.00')), (self.other.pk, 1, Decimal('30.00'))],
+        )
+        self.assertEqual((self.stock(self.game), self.stock(self.other)), (3, 1))
+        self.assertFalse(cart.cart_items.exists())
+
+    def test_short_lines_are_reported_and_nothing_is_written(self):
+        cart = self.make_cart((self.game, 1), (self.other, 3))
+        result = checkout(cart)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(result.failures, [LineFailure(self.other.pk, 'Catan', 3, 2)])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual((self.stock(self.game), self.stock(self.other)), (5, 2))
+        self.assertEqual(cart.cart_items.count(), 2)
+
+    def test_empty_cart(self):
+        with self.assertRaises(ValidationError):
+            checkout(self.make_cart())
+
+    def test_reservations_of_other_carts_are_not_sold(self):
+        reserve(G(Cart, user=G(User)), self.other.pk, 1)
+        result = checkout(self.make_cart((self.other, 2)))
+        self.assertEqual(result.failures, [LineFailure(self.other.pk, 'Catan', 2, 1)])
+
+    def test_the_carts_own_reservations_are_sold(self):
+        reserve(G(Cart, user=G(User)), self.game.pk, 2)
+        cart = self.make_cart((self.game, 3))
+        reserve(cart, self.game.pk, 3)
+        reserve(cart, self.other.pk, 1)  # no longer in the cart
+
+        self.assertTrue(checkout(cart).ok)
+        game = Game.objects.get(pk=self.game.pk)
+        self.assertEqual((game.stock, game.reserved_stock), (2, 2))
+        self.assertEqual(Game.objects.get(pk=self.other.pk).reserved_stock, 0)
+        self.assertFalse(StockReservation.objects.filter(cart=cart).exists())
+
+    def test_stock_is_taken_in_primary_key_order(self):
+        cart = self.make_cart((self.other, 1), (self.game, 1))
+        with CaptureQueriesContext(connection) as queries:
+            checkout(cart)
+        updated = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "games_game"')]
+        self.assertEqual(len(updated), 2)
+        self.assertIn(f'"id" = {min(self.game.pk, self.other.pk)}', updated[0])
+
+
+class CheckoutStressTest(TransactionTestCase):
+    """
+    Thousands of checkouts competing for a few games from many threads,
+    on a file database with the project's SQLite configuration (the
+    in-memory test database can't be written to from several threads).
+
+    """
+    checkouts = 2000
+    threads = 16
+    stock = 100
+
+    def setUp(self):
+        rng = Random(21)
+        self.games = [
+            G(Game, price=Decimal('20.00'), discount_price=Decimal('15.00'), stock=self.stock) for _ in range(5)
+        ]
+        users = [G(User) for _ in range(10)]
+        carts = Cart.objects.bulk_create(Cart(user=rng.choice(users)) for _ in range(self.checkouts))
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, game=game, quantity=rng.randint(1, 3))
+            for cart in carts
+            for game in rng.sample(self.games, rng.randint(1, 3))
+        )
+        self.carts = carts
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {
+            **connection.settings_dict, 'NAME': os.path.join(directory.name, 'stress.sqlite3'), 'CONN_MAX_AGE': 0,
+        }
+        self.settings_dict['OPTIONS'] = {
+            **self.settings_dict['OPTIONS'],
+            'pragmas': {**self.settings_dict['OPTIONS']['pragmas'], 'busy_timeout': 60000},
+        }
+        target = sqlite3.connect(self.settings_dict['NAME'])
+        connection.ensure_connection()
+        connection.connection.backup(target)
+        # Switched once up front: changing the journal mode needs the database to itself
+        target.execute('PRAGMA journal_mode=WAL')
+        target.close()
+
+    def run_checkouts(self):
+        pending = queue.SimpleQueue()
+        for cart in self.carts:
+            pending.put(cart)
+        results, errors = [], []
+
+        def work():
+            # Thread local: this thread's default database is the file copy
+            connections[DEFAULT_DB_ALIAS] = DatabaseWrapper(self.settings_dict, DEFAULT_DB_ALIAS)
+            try:
+                while True:
+                    try:
+                        cart = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    results.append((cart.pk, checkout(cart)))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections[DEFAULT_DB_ALIAS].close()
+
+        workers = [threading.Thread(target=work) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_no_oversell(self):
+        results = self.run_checkouts()
+        self.assertEqual(len(results), self.checkouts)
+
+        connections['stress'] = DatabaseWrapper(self.settings_dict, 'stress')
+        self.addCleanup(connections.__delitem__, 'stress')
+        self.addCleanup(connections['stress'].close)
+        stock = dict(Game.objects.using('stress').values_list('pk', 'stock'))
+        sold = dict(
+            OrderItem.objects.using('stress').order_by().values_list('game').annotate(sold=Sum('quantity'))
+        )
+        for game in self.games:
+            self.assertGreaterEqual(stock[game.pk], 0)
+            self.assertEqual(stock[game.pk] + sold.get(game.pk, 0), self.stock)
+        # Demand is several times the stock: nearly all of it is sold
+        self.assertGreater(sum(sold.values()), len(self.games) * self.stock * 0.9)
+
+        placed = [result.order.pk for _, result in results if result.ok]
+        self.assertEqual(Order.objects.using('stress').count(), len(placed))
+        self.assertTrue(all(result.failures for _, result in results if not result.ok))
+        totals = Order.objects.using('stress').aggregate(total=Sum('total'), items=Sum('item_count'))
+        self.assertEqual(totals['items'], sum(sold.values()))
+        self.assertEqual(totals['total'], Decimal('15.00') * sum(sold.values()))
+        # Carts are only emptied by a successful checkout
+        remaining = set(CartItem.objects.using('stress').values_list('cart', flat=True))
+        self.assertEqual(remaining, {cart_pk for cart_pk, result in results if not result.ok})
@@ -0,0 +1,9 @@
+from rest_framework import routers
+
+from .views import OrderViewSet
+
+app_name = "orders"
+router = routers.SimpleRouter()
+router.register(r'orders', OrderViewSet, basename='order')
+
+urlpatterns = router.urls
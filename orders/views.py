@@ -1,3 +1,17 @@
-from django.shortcuts import render
+from rest_framework import permissions, viewsets
 
-# Create your views here.
+from .models import Order
+from .serializers import OrderSerializer
+
+
+class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    The order history of the current user, newest first, with the items
+    and their games prefetched: three queries per page, count included.
+
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.history(self.request.user).with_items()